@@ -0,0 +1,443 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Alertas por Rango Normal
+
+Evalúa cada lectura que entra por el módulo de ingesta contra el rango_normal
+de su parámetro (parametros.py) y lleva, por serie, la excursión en curso: el
+intervalo en que el parámetro está por encima o por debajo de su rango.
+    - Histéresis: una excursión empieza cuando el valor sale del rango y solo
+      termina cuando vuelve a entrar con un margen de config.alert_hysteresis
+      veces el ancho del rango, así que un valor que oscila en el límite no abre
+      y cierra alertas en cada lectura.
+    - Duración mínima: la alerta se abre cuando la excursión lleva al menos
+      config.alert_min_duration_hours; las más cortas se descartan sin aviso.
+
+El estado de cada serie tiene tamaño fijo (excursión en curso y contadores) y
+se guarda en Datos/alertas.json, así que evaluar un anexo cuesta O(lecturas
+nuevas). Las lecturas marcadas como anómalas (módulo anomalias) no cuentan.
+Las lecturas se evalúan en orden de fecha: un anexo se ordena antes de evaluarlo
+y, si trae lecturas anteriores a la última evaluada, se evalúa de nuevo la
+serie completa.
+
+Los eventos (apertura y cierre de cada alerta, con la recomendación del
+parámetro) se registran en Datos/alertas.log, una línea JSON por evento.
+"""
+import os
+import json
+import threading
+from pathlib import Path
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import config
+from parametros import PARAMETROS_CALIDAD, claveParametro
+import almacenamiento
+import anomalias
+from resumen import firmaSerie
+from metricas import medir
+#========================
+#Fin de las importaciones (os, json, threading, pathlib, datetime, numpy, pandas)
+
+#Nombres del índice de estados y del registro de eventos dentro de la carpeta de datos
+NOMBRE_INDICE = "alertas.json"
+NOMBRE_REGISTRO = "alertas.log"
+
+#Versión del contenido de los estados; los de otra versión se recalculan
+VERSION_ALERTAS = 2
+
+#Dirección de una excursión
+ENCIMA = 1
+DEBAJO = -1
+DIRECCIONES = {ENCIMA: "encima", DEBAJO: "debajo"}
+
+#Protege la lectura-modificación-escritura del índice y del registro
+_bloqueo = threading.RLock()
+
+#Parámetros con rango normal, por su nombre canónico: (nombre, datos)
+_PARAMETROS = {claveParametro(nombre): (nombre, datos) for nombre, datos in PARAMETROS_CALIDAD.items()
+               if datos.get("rango_normal")}
+
+
+def datosParametro(parametro):
+    #(nombre en PARAMETROS_CALIDAD, datos) del parámetro, o (None, {}) si no tiene rango normal
+    return _PARAMETROS.get(claveParametro(parametro), (None, {}))
+
+def rutaRegistro(rutaDatos):
+    return Path(rutaDatos) / NOMBRE_REGISTRO
+
+def _fechaISO(nanosegundos):
+    return pd.Timestamp(int(nanosegundos), unit="ns").isoformat()
+
+# ======================
+# Evaluación
+# ======================
+
+def estadoInicial():
+    return {"n": 0, "excursion": None, "alertas": 0, "descartadas": 0, "ultima": None}
+
+def _fechasAnteriores(estado, bloque):
+    #True si el bloque tiene lecturas anteriores a la última que se evaluó
+    return (estado["ultima"] is not None and len(bloque) > 0
+            and int(bloque["Fecha"].to_numpy().astype("datetime64[ns]").view("int64").min()) < estado["ultima"])
+
+def evaluar(estado, fechas, valores, rango):
+    #Evalúa las lecturas contra el rango a partir del estado de la serie; se ordenan por fecha
+    #y no pueden ser anteriores a la última evaluada (estado["ultima"]).
+    #Retorna (eventos, estado actualizado). Los eventos son diccionarios con "evento"
+    #("apertura" o "cierre"), "direccion" y las fechas en nanosegundos
+    tiempos = np.asarray(fechas).astype("datetime64[ns]").view("int64")
+    valores = np.asarray(valores, dtype="float64")
+    m = len(valores)
+    if m == 0:
+        return [], estado
+    if (tiempos[1:] < tiempos[:-1]).any():
+        orden = np.argsort(tiempos, kind="stable")
+        tiempos, valores = tiempos[orden], valores[orden]
+    if estado["ultima"] is not None and tiempos[0] < estado["ultima"]:
+        raise ValueError("Hay lecturas anteriores a la última evaluada; la serie debe evaluarse completa")
+    minimo, maximo = rango
+    #El margen no puede pasar de la mitad del rango o las dos excursiones se solaparían
+    margen = min(config.alert_hysteresis, 0.49) * (maximo - minimo)
+    duracion = int(config.alert_min_duration_hours * 3.6e12)
+    excursion = estado["excursion"]
+    previa = excursion["direccion"] if excursion else 0
+
+    # Histéresis: cada dirección se activa al salir del rango y se desactiva al volver a
+    # entrar con margen; entre ambos límites se mantiene lo anterior (relleno hacia adelante)
+    def activa(entra, sale, inicial):
+        marcas = np.full(m + 1, np.nan)
+        marcas[0] = inicial
+        marcas[1:][sale] = 0
+        marcas[1:][entra] = 1
+        return pd.Series(marcas).ffill().to_numpy()[1:] == 1
+
+    encima = activa(valores > maximo, valores <= maximo - margen, previa == ENCIMA)
+    debajo = activa(valores < minimo, valores >= minimo + margen, previa == DEBAJO)
+    direccion = encima.astype(np.int8) - debajo.astype(np.int8)
+
+    # Tramos de lecturas con la misma dirección
+    anteriores = np.concatenate(([previa], direccion[:-1]))
+    inicios = np.flatnonzero(direccion != anteriores)
+    if not len(inicios) or inicios[0] != 0:
+        inicios = np.concatenate(([0], inicios))
+    fines = np.concatenate((inicios[1:], [m]))
+    sentidos = direccion[inicios]
+    maximos = np.maximum.reduceat(valores, inicios)
+    minimos = np.minimum.reduceat(valores, inicios)
+    extremos = np.where(sentidos == ENCIMA, maximos, minimos)
+    desde = tiempos[inicios].copy()
+    confirmadas = np.zeros(len(inicios), dtype=bool)
+    lecturas = fines - inicios
+    #El primer tramo continúa la excursión en curso si va en la misma dirección
+    continua = excursion is not None and sentidos[0] == previa
+    if continua:
+        desde[0] = excursion["inicio"]
+        confirmadas[0] = excursion["confirmada"]
+        extremos[0] = max(extremos[0], excursion["extremo"]) if previa == ENCIMA else min(extremos[0], excursion["extremo"])
+        lecturas[0] += excursion["lecturas"]
+
+    # Primera lectura de cada tramo con la que la excursión alcanza la duración mínima
+    confirmacion = np.maximum(np.searchsorted(tiempos, desde + duracion, side="left"), inicios)
+    seConfirma = (sentidos != 0) & ~confirmadas & (confirmacion < fines)
+    cerrados = (sentidos != 0) & (fines < m)
+
+    eventos = []
+    aperturas = descartadas = 0
+    if excursion is not None and not continua and not excursion["confirmada"]:
+        descartadas += 1
+    if excursion is not None and not continua and excursion["confirmada"]:
+        #La excursión en curso terminó con la primera lectura del bloque
+        eventos.append(_evento("cierre", excursion["direccion"], excursion["inicio"], excursion["extremo"],
+                               excursion["lecturas"], fin=tiempos[0]))
+    for i in np.flatnonzero(seConfirma | cerrados):
+        if seConfirma[i]:
+            j = confirmacion[i]
+            #Lecturas hasta la confirmación, incluidas las de bloques anteriores
+            hastaConfirmar = lecturas[i] - (fines[i] - j) + 1
+            eventos.append(_evento("apertura", sentidos[i], desde[i], valores[j], hastaConfirmar, fecha=tiempos[j]))
+            aperturas += 1
+        if cerrados[i]:
+            if confirmadas[i] or seConfirma[i]:
+                eventos.append(_evento("cierre", sentidos[i], desde[i], extremos[i], lecturas[i], fin=tiempos[fines[i]]))
+            else:
+                descartadas += 1
+
+    # Estado tras el bloque: la excursión del último tramo, si sigue abierta
+    excursion = None
+    if sentidos[-1] != 0:
+        excursion = {"direccion": int(sentidos[-1]), "inicio": int(desde[-1]),
+                     "confirmada": bool(confirmadas[-1] or seConfirma[-1]), "extremo": float(extremos[-1]),
+                     "lecturas": int(lecturas[-1]), "ultima": int(tiempos[-1])}
+    return eventos, {
+        "n": estado["n"] + m,
+        "excursion": excursion,
+        "alertas": estado["alertas"] + aperturas,
+        "descartadas": estado["descartadas"] + descartadas,
+        "ultima": int(tiempos[-1])
+    }
+
+def _evento(tipo, direccion, inicio, valor, lecturas, fecha=None, fin=None):
+    evento = {"evento": tipo, "direccion": int(direccion), "inicio": int(inicio), "valor": float(valor),
+              "lecturas": int(lecturas)}
+    if tipo == "apertura":
+        evento["fecha"] = int(fecha)
+    else:
+        evento["fecha"] = evento["fin"] = int(fin)
+    return evento
+
+def _registros(parametro, eventos):
+    #Eventos de evaluar() como líneas del registro, con el rango y la recomendación del parámetro
+    nombre, datos = datosParametro(parametro)
+    minimo, maximo = datos["rango_normal"]
+    registrado = datetime.now().isoformat(timespec="seconds")
+    registros = []
+    for evento in eventos:
+        registro = {
+            "evento": evento["evento"],
+            "parametro": parametro,
+            "direccion": DIRECCIONES[evento["direccion"]],
+            "limite": maximo if evento["direccion"] == ENCIMA else minimo,
+            "unidades": datos.get("unidades", ""),
+            "inicio": _fechaISO(evento["inicio"]),
+            "fecha": _fechaISO(evento["fecha"]),
+            #En la apertura es el valor que confirmó la alerta; en el cierre, el extremo de la excursión
+            "valor": evento["valor"],
+            "lecturas": evento["lecturas"]
+        }
+        if evento["evento"] == "cierre":
+            registro["fin"] = _fechaISO(evento["fin"])
+            registro["duracionHoras"] = round((evento["fin"] - evento["inicio"]) / 3.6e12, 2)
+        registro["recomendacion"] = datos.get("recomendacion", "")
+        registro["registrado"] = registrado
+        registros.append(registro)
+    return registros
+
+def formatearAlerta(registro):
+    #Texto de un evento del registro para mostrarlo
+    fecha = almacenamiento.formatearFecha(datetime.fromisoformat(registro["fecha"]))
+    inicio = almacenamiento.formatearFecha(datetime.fromisoformat(registro["inicio"]))
+    limite = f"{registro['direccion']} de {registro['limite']} {registro['unidades']}".rstrip()
+    if registro["evento"] == "apertura":
+        return (f"{fecha} ALERTA: {registro['parametro']} por {limite} desde {inicio} "
+                f"(valor {registro['valor']:g}). Recomendación: {registro['recomendacion']}")
+    return (f"{fecha} Fin de alerta: {registro['parametro']} estuvo por {limite} desde {inicio} "
+            f"({registro['duracionHoras']:g} h, extremo {registro['valor']:g})")
+
+# ======================
+# Registro de Eventos
+# ======================
+
+def leerAlertas(rutaDatos, parametro=None, desde=None):
+    #Eventos del registro de un cuerpo de agua, del más antiguo al más reciente. parametro
+    #filtra por nombre; desde, por la fecha del evento (datetime)
+    ruta = rutaRegistro(rutaDatos)
+    if not ruta.exists():
+        return []
+    clave = claveParametro(parametro) if parametro else None
+    registros = []
+    with open(ruta, "r", encoding="utf-8") as archivo:
+        for linea in archivo:
+            try:
+                registro = json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+            if clave and claveParametro(registro["parametro"]) != clave:
+                continue
+            if desde and datetime.fromisoformat(registro["fecha"]) < desde:
+                continue
+            registros.append(registro)
+    return registros
+
+def _anexarRegistros(rutaDatos, registros):
+    if not registros:
+        return
+    with open(rutaRegistro(rutaDatos), "a", encoding="utf-8") as archivo:
+        archivo.writelines(json.dumps(registro, ensure_ascii=False) + "\n" for registro in registros)
+
+def _reemplazarRegistros(rutaDatos, parametro, registros):
+    #Reemplaza los eventos de un parámetro (tras evaluar su serie completa). Retorna los que no
+    #estaban ya en el registro
+    anteriores = leerAlertas(rutaDatos)
+    propios = {(r["evento"], r["direccion"], r["inicio"]) for r in anteriores if r["parametro"] == parametro}
+    conservados = [r for r in anteriores if r["parametro"] != parametro]
+    ruta = rutaRegistro(rutaDatos)
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        archivo.writelines(json.dumps(registro, ensure_ascii=False) + "\n" for registro in conservados + registros)
+    os.replace(temporal, ruta)
+    return [r for r in registros if (r["evento"], r["direccion"], r["inicio"]) not in propios]
+
+# ======================
+# Índice de Estados
+# ======================
+
+def rutaIndice(rutaDatos):
+    return Path(rutaDatos) / NOMBRE_INDICE
+
+def leerIndice(rutaDatos):
+    #Lee el índice de estados de un cuerpo de agua (vacío si no existe o está dañado)
+    try:
+        with open(rutaIndice(rutaDatos), "r", encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def guardarIndice(rutaDatos, indice):
+    #Guarda el índice a un temporal y luego lo reemplaza
+    ruta = rutaIndice(rutaDatos)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(indice, archivo, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+def _fijarEntrada(indice, rutaArchivo, estado):
+    indice[rutaArchivo.name] = {
+        "version": VERSION_ALERTAS,
+        "parametro": almacenamiento.obtenerNombreParametro(rutaArchivo.name),
+        "firma": firmaSerie(rutaArchivo),
+        "estado": estado
+    }
+
+def _evaluarBloques(rutaArchivo, bloques):
+    #Evalúa una serie completa desde el estado inicial y reemplaza sus eventos en el registro.
+    #Retorna (estado final, eventos nuevos), o (None, []) si el parámetro no tiene rango normal
+    rutaArchivo = Path(rutaArchivo)
+    parametro = almacenamiento.obtenerNombreParametro(rutaArchivo.name)
+    _, datos = datosParametro(parametro)
+    if not datos:
+        return None, []
+    validas = anomalias.filtroAnomalias(anomalias.leerMarcas(rutaArchivo))
+    estado = estadoInicial()
+    eventos = []
+    desordenada = False
+    with medir("evaluarAlertas") as medicion:
+        for bloque in bloques:
+            bloque = validas(bloque)
+            if _fechasAnteriores(estado, bloque):
+                desordenada = True
+                break
+            nuevos, estado = evaluar(estado, bloque["Fecha"].to_numpy(), bloque["Valor"].to_numpy(),
+                                     datos["rango_normal"])
+            eventos += nuevos
+            medicion["filas"] += len(bloque)
+    if desordenada:
+        #La serie no está guardada en orden de fecha: se evalúa entera, ordenada
+        serie = almacenamiento.leerSerie(rutaArchivo).sort_values("Fecha", kind="stable")
+        return _evaluarBloques(rutaArchivo, [serie])
+    return estado, _reemplazarRegistros(rutaArchivo.parent, parametro, _registros(parametro, eventos))
+
+# ======================
+# Actualización desde la Ingesta
+# ======================
+
+def evaluarCompleta(rutaArchivo, df):
+    #Se llama tras escribir la serie completa (crear o editar) y revisar sus anomalías.
+    #Retorna los eventos que no estaban ya en el registro
+    rutaArchivo = Path(rutaArchivo)
+    with _bloqueo:
+        estado, registros = _evaluarBloques(rutaArchivo, [almacenamiento.normalizarSerie(df)])
+        indice = leerIndice(rutaArchivo.parent)
+        _fijarEntrada(indice, rutaArchivo, estado)
+        guardarIndice(rutaArchivo.parent, indice)
+    return registros
+
+def evaluarAnexo(rutaArchivo, dfNuevos, marcadas):
+    #Se llama tras anexar registros y revisar sus anomalías (marcadas); solo se evalúan los
+    #nuevos. Retorna los eventos que generaron
+    rutaArchivo = Path(rutaArchivo)
+    parametro = almacenamiento.obtenerNombreParametro(rutaArchivo.name)
+    _, datos = datosParametro(parametro)
+    nuevos = anomalias.filtroAnomalias(marcadas)(almacenamiento.normalizarSerie(dfNuevos))
+    with _bloqueo:
+        indice = leerIndice(rutaArchivo.parent)
+        entrada = indice.get(rutaArchivo.name)
+        if (entrada is None or entrada.get("version") != VERSION_ALERTAS
+                or (datos and _fechasAnteriores(entrada["estado"], nuevos))):
+            #Sin estado previo, o con lecturas anteriores a las ya evaluadas, se evalúa
+            #la serie completa en orden de fecha, que ya incluye los nuevos
+            estado, registros = _evaluarBloques(rutaArchivo, almacenamiento.iterarSerie(rutaArchivo))
+        elif not datos:
+            estado, registros = None, []
+        else:
+            with medir("evaluarAlertas", filas=len(nuevos)):
+                eventos, estado = evaluar(entrada["estado"], nuevos["Fecha"].to_numpy(), nuevos["Valor"].to_numpy(),
+                                          datos["rango_normal"])
+                registros = _registros(parametro, eventos)
+            _anexarRegistros(rutaArchivo.parent, registros)
+        _fijarEntrada(indice, rutaArchivo, estado)
+        guardarIndice(rutaArchivo.parent, indice)
+    return registros
+
+def refrescarFirma(rutaArchivo):
+    #La compactación cambia los archivos pero no los datos: solo se actualiza la firma
+    rutaArchivo = Path(rutaArchivo)
+    with _bloqueo:
+        indice = leerIndice(rutaArchivo.parent)
+        if rutaArchivo.name in indice:
+            indice[rutaArchivo.name]["firma"] = firmaSerie(rutaArchivo)
+            guardarIndice(rutaArchivo.parent, indice)
+
+# ======================
+# Consultas
+# ======================
+
+def obtenerEstados(rutaDatos, archivos=None):
+    #Retorna {parametro: estado} para los archivos indicados (o todos los de la carpeta); None
+    #para los parámetros sin rango normal. Las series sin estado, o cuyo estado no coincide
+    #con los archivos en disco, se evalúan completas una vez
+    rutaDatos = Path(rutaDatos)
+    if archivos is None:
+        archivos = almacenamiento.listarArchivos(rutaDatos)
+    #Las lecturas anómalas se excluyen: su revisión tiene que estar al día
+    anomalias.obtenerEstados(rutaDatos, archivos)
+
+    estados = {}
+    with _bloqueo:
+        indice = leerIndice(rutaDatos)
+        modificado = False
+        for archivo in archivos:
+            rutaArchivo = rutaDatos / archivo
+            entrada = indice.get(archivo)
+            if (entrada is None or entrada.get("version") != VERSION_ALERTAS
+                    or entrada["firma"] != firmaSerie(rutaArchivo)):
+                estado, _ = _evaluarBloques(rutaArchivo, almacenamiento.iterarSerie(rutaArchivo))
+                _fijarEntrada(indice, rutaArchivo, estado)
+                entrada = indice[archivo]
+                modificado = True
+            estados[entrada["parametro"]] = entrada["estado"]
+        #Se quitan las entradas de series que ya no existen
+        for archivo in [a for a in indice if not (rutaDatos / a).exists()]:
+            del indice[archivo]
+            modificado = True
+        if modificado:
+            guardarIndice(rutaDatos, indice)
+    return estados
+
+def alertasAbiertas(rutaDatos, archivos=None, pendientes=False):
+    #Excursiones en curso: {parametro: {"direccion", "limite", "unidades", "inicio", "ultima",
+    #"extremo", "lecturas", "confirmada", "recomendacion"}}. Sin pendientes, solo las que ya
+    #alcanzaron la duración mínima
+    abiertas = {}
+    for parametro, estado in obtenerEstados(rutaDatos, archivos).items():
+        excursion = estado and estado["excursion"]
+        if not excursion or not (excursion["confirmada"] or pendientes):
+            continue
+        _, datos = datosParametro(parametro)
+        minimo, maximo = datos["rango_normal"]
+        abiertas[parametro] = {
+            "direccion": DIRECCIONES[excursion["direccion"]],
+            "limite": maximo if excursion["direccion"] == ENCIMA else minimo,
+            "unidades": datos.get("unidades", ""),
+            "inicio": pd.Timestamp(excursion["inicio"], unit="ns").to_pydatetime(),
+            "ultima": pd.Timestamp(excursion["ultima"], unit="ns").to_pydatetime(),
+            "extremo": excursion["extremo"],
+            "lecturas": excursion["lecturas"],
+            "confirmada": excursion["confirmada"],
+            "recomendacion": datos.get("recomendacion", "")
+        }
+    return abiertas
+
+
+#La compactación de almacenamiento avisa al índice para que no evalúe la serie de nuevo
+almacenamiento.observadoresCompactacion.append(refrescarFirma)
@@ -0,0 +1,603 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Almacenamiento de Series de Parámetros
+
+Cada parámetro de un cuerpo de agua se guarda como una serie con dos columnas
+tipadas: 'Fecha' (datetime64) y 'Valor' (float). El formato físico depende del
+backend activo (config.storage_backend). El backend por defecto es Parquet
+(requiere pyarrow); Excel queda solo como formato de importación/exportación.
+
+Las fechas se convierten una sola vez, al capturarlas (convertirFecha), y
+pueden incluir la hora para sensores con varias lecturas al día. La lectura
+nunca vuelve a interpretar texto: Parquet guarda la columna tipada y el
+registro de anexos guarda nanosegundos desde 1970.
+
+Los datos nuevos no reescriben el archivo: se anexan a un registro de texto
+junto a él (DATOS_<param>.<ext>.log) y se compactan en segundo plano cuando el
+registro supera config.log_max_bytes. Las lecturas combinan archivo y registro,
+por lo que siempre ven una sola serie. El archivo compactado guarda en sus
+metadatos el nombre, tamaño y huella del registro que incorporó: si el proceso
+se interrumpe antes de borrar ese registro, las lecturas lo descartan y la
+siguiente compactación lo elimina, sin duplicar lecturas. Un libro de Excel no
+tiene dónde guardar esos metadatos, así que con ese backend no se usa el
+registro: cada anexo reescribe el libro completo.
+
+Las series leídas se guardan en la caché compartida (cache.cacheSeries); toda
+escritura de este módulo invalida la entrada de la serie que modifica.
+
+Las series de más de config.large_series_rows registros se leen en formato
+compacto: 'Valor' en float32, llenado por bloques (grupos de filas de Parquet
+de config.read_chunk_rows registros) en arreglos reservados de antemano, sin
+copia para la caché y con un techo de config.memory_limit_bytes. iterarSerie()
+recorre una serie por bloques para los cálculos que no necesitan tenerla entera
+en memoria (el índice de resumen se calcula así).
+
+Uso de la herramienta de migración (desde la raíz del proyecto):
+    python "Calidad del agua/almacenamiento.py" [--eliminar-originales]
+    python "Calidad del agua/almacenamiento.py" --convertir-fechas
+"""
+from datetime import datetime
+import os
+import json
+import hashlib
+import sys
+import argparse
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import config
+from cache import cacheSeries, firmaArchivos
+from metricas import medir, instrumentar
+#========================
+#Fin de las importaciones (datetime, os, json, hashlib, sys, argparse, threading, pathlib, numpy, pandas)
+
+# ======================
+# Constantes
+# ======================
+
+#Columnas que forman una serie de parámetro, en el orden en el que se guardan
+COLUMNAS = ["Fecha", "Valor"]
+
+#Formato de fecha que se usaba al capturar datos en los archivos de Excel
+FORMATO_FECHA = "%d/%m/%y"
+
+#Formatos aceptados al capturar una fecha, con hora opcional y año de dos o cuatro cifras
+FORMATOS_CAPTURA = ("%d/%m/%y", "%d/%m/%Y", "%d/%m/%y %H:%M", "%d/%m/%Y %H:%M")
+
+#Candado que serializa lecturas, anexos y compactaciones de las series.
+#Es reentrante porque la compactación lee la serie mientras lo tiene tomado
+_bloqueo = threading.RLock()
+
+#Funciones que se llaman con la ruta de una serie cuando termina de compactarse
+observadoresCompactacion = []
+
+#Clave de los metadatos del archivo Parquet con el registro de anexos que incorporó
+CLAVE_REGISTRO = b"registroCompactado"
+
+#Bytes por registro de una serie compacta: Fecha datetime64 (8) y Valor float32 (4)
+BYTES_REGISTRO_COMPACTO = 12
+
+
+class LimiteMemoriaExcedido(ValueError):
+    #La serie no cabe en config.memory_limit_bytes ni en formato compacto
+    pass
+
+# ======================
+# Backends
+# ======================
+
+class BackendExcel:
+    #Backend de libros de Excel (.xlsx). Se conserva para importar y exportar
+    extension = ".xlsx"
+    #No guarda metadatos: no puede recordar qué registro de anexos incorporó
+    registraCompactacion = False
+
+    def leer(self, ruta):
+        return pd.read_excel(ruta)
+
+    def escribir(self, ruta, df):
+        df.to_excel(ruta, index=False)
+
+    def escribirBloques(self, ruta, bloques, metadatos=None):
+        #Un libro no se puede escribir por partes: se juntan los bloques y se escribe entero.
+        #Los metadatos se ignoran (ver registraCompactacion)
+        partes = list(bloques)
+        self.escribir(ruta, pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS))
+
+    def contarFilas(self, ruta):
+        #Un libro de Excel no permite contar sin leerlo
+        return None
+
+    def leerMetadatos(self, ruta):
+        return {}
+
+    def abrirBloques(self, ruta):
+        #Retorna (filas, generador de bloques); el libro se lee entero
+        df = self.leer(ruta)
+        return len(df), iter([df])
+
+    def leerFinal(self, ruta, filas):
+        #Retorna (filas del libro, últimos registros); el libro se lee entero
+        df = self.leer(ruta)
+        return len(df), df.tail(filas)
+
+class BackendParquet:
+    #Backend columnar en Parquet con columnas tipadas
+    extension = ".parquet"
+    #Guarda en los metadatos del archivo el registro de anexos que incorporó
+    registraCompactacion = True
+
+    def leer(self, ruta):
+        return pd.read_parquet(ruta, columns=COLUMNAS)
+
+    def escribir(self, ruta, df):
+        #Los grupos de filas del tamaño de un bloque permiten leer la serie por partes
+        df.to_parquet(ruta, index=False, row_group_size=config.read_chunk_rows)
+
+    def escribirBloques(self, ruta, bloques, metadatos=None):
+        #Escribe una serie que llega por bloques ya normalizados sin tenerla entera en
+        #memoria; cada bloque queda en sus propios grupos de filas de config.read_chunk_rows
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        esquema = pa.schema([("Fecha", pa.timestamp("ns")), ("Valor", pa.float64())], metadata=metadatos)
+        with pq.ParquetWriter(ruta, esquema) as escritor:
+            for bloque in bloques:
+                escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False),
+                                     row_group_size=config.read_chunk_rows)
+
+    def contarFilas(self, ruta):
+        #La cantidad de filas está en los metadatos del archivo
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(ruta).metadata.num_rows
+
+    def leerMetadatos(self, ruta):
+        #Metadatos clave-valor del esquema, sin leer datos
+        import pyarrow.parquet as pq
+        return pq.read_schema(ruta).metadata or {}
+
+    def abrirBloques(self, ruta):
+        #Retorna (filas, generador de bloques). Se lee un grupo de filas a la vez
+        #(iter_batches lee por adelantado y no acota la memoria). El archivo queda
+        #abierto, así que los bloques siguen siendo los de esta versión aunque se compacte
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(ruta, pre_buffer=False)
+        grupos = range(archivo.metadata.num_row_groups)
+        return archivo.metadata.num_rows, (archivo.read_row_group(i, columns=COLUMNAS).to_pandas() for i in grupos)
+
+    def leerFinal(self, ruta, filas):
+        #Retorna (filas del archivo, al menos los últimos registros pedidos). Solo se leen
+        #los grupos de filas del final que hacen falta (siempre al menos el último)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(ruta, pre_buffer=False)
+        grupos = []
+        indice = archivo.metadata.num_row_groups
+        while indice > 0 and (not grupos or sum(grupo.num_rows for grupo in grupos) < filas):
+            indice -= 1
+            grupos.insert(0, archivo.read_row_group(indice, columns=COLUMNAS))
+        datos = pa.concat_tables(grupos) if grupos else archivo.read(columns=COLUMNAS)
+        return archivo.metadata.num_rows, datos.to_pandas()
+
+#Diccionario con los backends disponibles, indexados por su nombre en la configuración
+BACKENDS = {
+    "xlsx": BackendExcel(),
+    "parquet": BackendParquet()
+}
+
+def obtenerBackend(nombre=None):
+    #Retorna el backend indicado o, si no se indica, el configurado
+    nombre = nombre or config.storage_backend
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend de almacenamiento desconocido: {nombre}")
+    return BACKENDS[nombre]
+
+def backendPorRuta(ruta):
+    #Retorna el backend que corresponde a la extensión de un archivo
+    for backend in BACKENDS.values():
+        if Path(ruta).suffix == backend.extension:
+            return backend
+    raise ValueError(f"Formato de archivo no soportado: {ruta}")
+
+# ======================
+# Nombres de Archivos
+# ======================
+
+def formatearNombreArchivo(parametro, backend=None):
+    #Convierte un nombre de parámetro a nombre de archivo con la extensión del backend
+    backend = backend or obtenerBackend()
+    return f"DATOS_{parametro.replace(' ', '_').replace('(', '').replace(')', '')}{backend.extension}"
+
+def obtenerNombreParametro(archivo):
+    #Operación inversa: obtiene el nombre del parámetro a partir del nombre del archivo
+    return Path(archivo).stem.replace("DATOS_", "").replace("_", " ")
+
+def listarArchivos(rutaDatos):
+    #Lista los archivos de series del backend activo en la carpeta de datos
+    rutaDatos = Path(rutaDatos)
+    if not rutaDatos.exists():
+        return []
+    return sorted(archivo.name for archivo in rutaDatos.glob(f"DATOS_*{obtenerBackend().extension}"))
+
+# ======================
+# Fechas
+# ======================
+
+def convertirFecha(texto):
+    #Convierte una fecha capturada (dd/mm/aa, dd/mm/aaaa, con hh:mm opcional) a datetime
+    texto = texto.strip()
+    for formato in FORMATOS_CAPTURA:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida '{texto}'. Use dd/mm/aa o dd/mm/aa hh:mm")
+
+def formatearFecha(fecha):
+    #Texto de una fecha para mostrar; la hora solo aparece si la lectura la tiene
+    if fecha.hour or fecha.minute:
+        return fecha.strftime("%d/%m/%y %H:%M")
+    return fecha.strftime("%d/%m/%y")
+
+# ======================
+# Lectura y Escritura
+# ======================
+
+def normalizarSerie(df):
+    #Deja una serie con el esquema tipado (Fecha datetime64, Valor float)
+    #y descarta columnas que no forman parte de la serie
+    if "Fecha" not in df.columns or "Valor" not in df.columns:
+        raise ValueError("El archivo no tiene el formato correcto (debe contener 'Fecha' y 'Valor')")
+
+    with medir("interpretar", filas=len(df)):
+        fechas = df["Fecha"]
+        if not pd.api.types.is_datetime64_any_dtype(fechas):
+            #Fechas en texto: archivos antiguos (dd/mm/aa) o datos capturados sin convertir
+            try:
+                fechas = pd.to_datetime(fechas, format=FORMATO_FECHA)
+            except ValueError:
+                fechas = pd.to_datetime(fechas.astype(str).map(convertirFecha))
+
+        return pd.DataFrame({
+            "Fecha": fechas.astype("datetime64[ns]").to_numpy(),
+            "Valor": pd.to_numeric(df["Valor"]).astype("float64").to_numpy()
+        }, copy=False)
+
+def rutaRegistro(ruta, compactando=False):
+    #Retorna la ruta del registro de anexos de una serie
+    #(o la del registro que se está compactando)
+    ruta = Path(ruta)
+    return ruta.with_name(ruta.name + (".log.compactando" if compactando else ".log"))
+
+def leerRegistro(rutaLog):
+    #Lee un registro de anexos (líneas "nanosegundos,valor") como serie tipada.
+    #Los registros anteriores guardaban la fecha en ISO; esas líneas se interpretan aparte
+    if not rutaLog.exists() or rutaLog.stat().st_size == 0:
+        return None
+    df = pd.read_csv(rutaLog, header=None, names=COLUMNAS)
+    if pd.api.types.is_integer_dtype(df["Fecha"]):
+        df["Fecha"] = pd.to_datetime(df["Fecha"], unit="ns")
+    else:
+        textos = df["Fecha"].astype(str)
+        enteros = textos.str.fullmatch(r"-?\d+")
+        fechas = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+        fechas[enteros] = pd.to_datetime(textos[enteros].astype("int64"), unit="ns")
+        fechas[~enteros] = pd.to_datetime(textos[~enteros], format="ISO8601")
+        df["Fecha"] = fechas
+    return normalizarSerie(df)
+
+def rutasSerie(ruta):
+    #Archivos de los que se compone una serie: principal, registro en compactación y registro
+    ruta = Path(ruta)
+    return (ruta, rutaRegistro(ruta, compactando=True), rutaRegistro(ruta))
+
+def huellaRegistro(rutaLog):
+    #Identifica el contenido de un registro de anexos: nombre, tamaño y hash
+    contenido = rutaLog.read_bytes()
+    return {"registro": rutaLog.name, "bytes": len(contenido),
+            "huella": hashlib.blake2b(contenido, digest_size=16).hexdigest()}
+
+def registroIncorporado(ruta):
+    #True si el registro en compactación ya está dentro del archivo principal: una
+    #compactación reemplazó el archivo pero se interrumpió antes de borrar el registro
+    rutaCompactando = rutaRegistro(ruta, compactando=True)
+    if not ruta.exists() or not rutaCompactando.exists():
+        return False
+    registro = backendPorRuta(ruta).leerMetadatos(ruta).get(CLAVE_REGISTRO)
+    return registro is not None and json.loads(registro) == huellaRegistro(rutaCompactando)
+
+def registrosPendientes(ruta):
+    #Registros de anexos cuyos datos aún no están en el archivo principal
+    _, rutaCompactando, rutaLog = rutasSerie(ruta)
+    if registroIncorporado(ruta):
+        return [rutaLog]
+    return [rutaCompactando, rutaLog]
+
+def leerSerie(ruta, compacta=None):
+    #Lee una serie, pasando primero por la caché. Se retorna una copia
+    #para que quien la reciba pueda modificarla sin alterar la caché.
+    #compacta=None decide por el tamaño de la serie; quien vaya a reescribir
+    #la serie completa debe pedir compacta=False para no perder precisión
+    ruta = Path(ruta)
+    if compacta:
+        return leerSerieCompacta(ruta)
+    with _bloqueo:
+        firma = firmaArchivos(rutasSerie(ruta))
+        df = cacheSeries.obtener(str(ruta), firma)
+        if df is None:
+            if compacta is None and (contarFilas(ruta) or 0) > config.large_series_rows:
+                return leerSerieCompacta(ruta)
+            df = _leerSerieDisco(ruta)
+            cacheSeries.guardar(str(ruta), firma, df)
+    return df.copy()
+
+def _leerSerieDisco(ruta):
+    #Lee la serie de un archivo usando el backend correspondiente a su extensión,
+    #más los datos anexados que aún no se han compactado
+    with _bloqueo, medir("leer") as medicion:
+        partes = []
+        for rutaParte in rutasSerie(ruta):
+            if rutaParte.exists():
+                medicion["bytes"] += rutaParte.stat().st_size
+        if ruta.exists():
+            partes.append(normalizarSerie(backendPorRuta(ruta).leer(ruta)))
+        for rutaLog in registrosPendientes(ruta):
+            anexos = leerRegistro(rutaLog)
+            if anexos is not None:
+                partes.append(anexos)
+        medicion["filas"] = sum(len(parte) for parte in partes)
+
+    if not partes:
+        raise FileNotFoundError(f"No existe la serie {ruta}")
+    if len(partes) == 1:
+        return partes[0]
+    return pd.concat(partes, ignore_index=True)
+
+# ======================
+# Series Grandes
+# ======================
+
+def contarFilas(ruta):
+    #Registros de una serie sin leer sus datos, o None si el formato no lo permite
+    ruta = Path(ruta)
+    with _bloqueo:
+        if not ruta.exists():
+            return None
+        filas = backendPorRuta(ruta).contarFilas(ruta)
+        if filas is None:
+            return None
+        for rutaLog in registrosPendientes(ruta):
+            if rutaLog.exists():
+                with open(rutaLog, "rb") as registro:
+                    filas += registro.read().count(b"\n")
+        return filas
+
+def _abrirSerie(ruta):
+    #Toma una instantánea de la serie: (filas, bloques del archivo principal, anexos).
+    #Los anexos son pequeños (config.log_max_bytes) y se leen de una vez
+    with _bloqueo:
+        if not ruta.exists():
+            raise FileNotFoundError(f"No existe la serie {ruta}")
+        filas, bloques = backendPorRuta(ruta).abrirBloques(ruta)
+        anexos = [df for df in map(leerRegistro, registrosPendientes(ruta)) if df is not None]
+    return filas + sum(len(df) for df in anexos), bloques, anexos
+
+def iterarSerie(ruta):
+    #Recorre una serie por bloques: los grupos de filas del archivo (config.read_chunk_rows
+    #registros en las series que escribe el sistema) y luego los anexos
+    _, bloques, anexos = _abrirSerie(Path(ruta))
+    return _recorrer(bloques, anexos)
+
+def _recorrer(bloques, anexos):
+    for bloque in bloques:
+        yield normalizarSerie(bloque)
+    yield from anexos
+
+def leerSerieCompacta(ruta):
+    #Lee la serie con 'Valor' en float32 llenando por bloques dos arreglos reservados
+    #de antemano, de modo que el pico de memoria es la serie más un bloque.
+    #No pasa por la caché: la serie retornada es la única copia
+    ruta = Path(ruta)
+    with _bloqueo, medir("leerCompacta") as medicion:
+        filas, bloques, anexos = _abrirSerie(ruta)
+        if filas * BYTES_REGISTRO_COMPACTO > config.memory_limit_bytes:
+            raise LimiteMemoriaExcedido(
+                f"La serie {ruta.name} tiene {filas} registros "
+                f"({filas * BYTES_REGISTRO_COMPACTO / 2**20:.0f} MB) y supera el límite de memoria "
+                f"de {config.memory_limit_bytes / 2**20:.0f} MB")
+        fechas = np.empty(filas, dtype="datetime64[ns]")
+        valores = np.empty(filas, dtype="float32")
+        posicion = 0
+        for bloque in _recorrer(bloques, anexos):
+            fin = posicion + len(bloque)
+            fechas[posicion:fin] = bloque["Fecha"].to_numpy()
+            valores[posicion:fin] = bloque["Valor"].to_numpy()
+            posicion = fin
+        medicion["filas"] = posicion
+        medicion["bytes"] = sum(r.stat().st_size for r in rutasSerie(ruta) if r.exists())
+    return pd.DataFrame({"Fecha": fechas, "Valor": valores}, copy=False)
+
+def leerUltimos(ruta, cantidad=10):
+    #Retorna (registros de la serie, sus últimos registros) leyendo solo el final del
+    #archivo principal y los anexos, para mostrar el estado de una serie sin cargarla
+    ruta = Path(ruta)
+    with _bloqueo:
+        if not ruta.exists():
+            raise FileNotFoundError(f"No existe la serie {ruta}")
+        anexos = [df for df in map(leerRegistro, registrosPendientes(ruta)) if df is not None]
+        filasAnexos = sum(len(df) for df in anexos)
+        filas, final = backendPorRuta(ruta).leerFinal(ruta, max(cantidad - filasAnexos, 0))
+    ultimos = pd.concat([normalizarSerie(final), *anexos], ignore_index=True)
+    return filas + filasAnexos, ultimos.tail(cantidad).reset_index(drop=True)
+
+def escribirSerie(ruta, df):
+    #Escribe la serie completa. Se escribe primero a un temporal y luego se reemplaza,
+    #para que un fallo a mitad de escritura no deje el archivo corrupto.
+    #Como df es la serie completa, los registros de anexos dejan de ser necesarios
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    with _bloqueo, medir("guardar", filas=len(df)):
+        backendPorRuta(ruta).escribir(temporal, normalizarSerie(df))
+        os.replace(temporal, ruta)
+        for rutaLog in (rutaRegistro(ruta, compactando=True), rutaRegistro(ruta)):
+            rutaLog.unlink(missing_ok=True)
+        cacheSeries.invalidar(str(ruta))
+
+def anexarSerie(ruta, df):
+    #Anexa registros nuevos a una serie en O(registros nuevos), sin reescribir el archivo
+    #(salvo con los backends sin registraCompactacion).
+    #Retorna la cantidad de registros anexados
+    ruta = Path(ruta)
+    nuevos = normalizarSerie(df)
+    if nuevos.empty:
+        return 0
+
+    with _bloqueo:
+        #Si la serie todavía no existe, se crea directamente con los datos nuevos
+        if not ruta.exists():
+            escribirSerie(ruta, nuevos)
+            return len(nuevos)
+        #Sin metadatos (Excel) una compactación interrumpida aplicaría el registro dos veces:
+        #se reescribe la serie completa
+        if not backendPorRuta(ruta).registraCompactacion:
+            escribirSerie(ruta, pd.concat([_leerSerieDisco(ruta), nuevos], ignore_index=True))
+            return len(nuevos)
+
+        rutaLog = rutaRegistro(ruta)
+        with medir("anexar", filas=len(nuevos)):
+            nanosegundos = nuevos["Fecha"].to_numpy().view("int64")
+            lineas = [f"{fecha},{valor!r}\n" for fecha, valor in zip(nanosegundos.tolist(), nuevos["Valor"].tolist())]
+            with open(rutaLog, "a", encoding="utf-8") as registro:
+                registro.writelines(lineas)
+        tamanoRegistro = rutaLog.stat().st_size
+        cacheSeries.invalidar(str(ruta))
+
+    if tamanoRegistro > config.log_max_bytes:
+        compactarEnSegundoPlano(ruta)
+    return len(nuevos)
+
+@instrumentar("compactar")
+def compactarSerie(ruta):
+    #Incorpora el registro de anexos al archivo principal de la serie. El archivo se
+    #copia grupo de filas por grupo de filas, así que la memoria no crece con la serie
+    ruta = Path(ruta)
+    with _bloqueo:
+        rutaLog = rutaRegistro(ruta)
+        rutaCompactando = rutaRegistro(ruta, compactando=True)
+        if registroIncorporado(ruta):
+            rutaCompactando.unlink()
+        if not rutaLog.exists() and not rutaCompactando.exists():
+            return
+        if rutaLog.exists() and not rutaCompactando.exists():
+            #Se aparta el registro para que los anexos posteriores vayan a uno nuevo
+            os.replace(rutaLog, rutaCompactando)
+        backend = backendPorRuta(ruta)
+        _, bloques = backend.abrirBloques(ruta) if ruta.exists() else (0, iter(()))
+        temporal = ruta.with_name(ruta.name + ".tmp")
+        #El archivo nuevo recuerda qué registro incorporó (ver registroIncorporado)
+        metadatos = {CLAVE_REGISTRO: json.dumps(huellaRegistro(rutaCompactando))}
+        backend.escribirBloques(temporal, _unirAnexos(bloques, leerRegistro(rutaCompactando)), metadatos)
+        os.replace(temporal, ruta)
+        rutaCompactando.unlink(missing_ok=True)
+        cacheSeries.invalidar(str(ruta))
+
+    #Se avisa fuera del candado para no bloquear a quien espera la serie
+    for observador in observadoresCompactacion:
+        observador(ruta)
+
+def _unirAnexos(bloques, anexos):
+    #Bloques normalizados del archivo seguidos de los anexos. Si el último bloque no
+    #llena un grupo de filas se junta con los anexos para no acumular grupos pequeños
+    anterior = None
+    for bloque in bloques:
+        if anterior is not None:
+            yield anterior
+        anterior = normalizarSerie(bloque)
+    if anterior is not None and anexos is not None and len(anterior) < config.read_chunk_rows:
+        yield pd.concat([anterior, anexos], ignore_index=True)
+    else:
+        yield from (df for df in (anterior, anexos) if df is not None)
+
+def compactarEnSegundoPlano(ruta):
+    #Lanza la compactación en un hilo. No es daemon para que el intérprete
+    #espere a que termine antes de salir y no quede a medias
+    hilo = threading.Thread(target=compactarSerie, args=(ruta,), name=f"compactar-{Path(ruta).stem}")
+    hilo.start()
+    return hilo
+
+# ======================
+# Importación / Exportación
+# ======================
+
+def importarExcel(rutaExcel, rutaDatos, parametro=None):
+    #Importa un libro de Excel como serie del backend activo y retorna la ruta creada
+    rutaExcel = Path(rutaExcel)
+    parametro = parametro or obtenerNombreParametro(rutaExcel.name)
+    destino = Path(rutaDatos) / formatearNombreArchivo(parametro)
+    escribirSerie(destino, BACKENDS["xlsx"].leer(rutaExcel))
+    return destino
+
+def exportarExcel(ruta, rutaExcel=None):
+    #Exporta una serie a un libro de Excel y retorna la ruta del libro
+    ruta = Path(ruta)
+    rutaExcel = Path(rutaExcel) if rutaExcel else ruta.with_suffix(BACKENDS["xlsx"].extension)
+    BACKENDS["xlsx"].escribir(rutaExcel, leerSerie(ruta, compacta=False))
+    return rutaExcel
+
+# ======================
+# Migración
+# ======================
+
+def migrarCuerposDeAgua(rutaBase=Path("CuerposDeAgua"), eliminarOriginales=False):
+    #Convierte todos los DATOS_*.xlsx de todos los cuerpos de agua al backend activo.
+    #Retorna la lista de archivos creados
+    if obtenerBackend().extension == BACKENDS["xlsx"].extension:
+        raise ValueError("El backend activo ya es xlsx, no hay nada que migrar")
+
+    migrados = []
+    for rutaExcel in sorted(Path(rutaBase).glob(f"*/{config.data_folder}/DATOS_*.xlsx")):
+        destino = importarExcel(rutaExcel, rutaExcel.parent)
+        migrados.append(destino)
+        print(f"{rutaExcel} -> {destino.name}")
+        if eliminarOriginales:
+            rutaExcel.unlink()
+    return migrados
+
+def convertirFechas(rutaBase=Path("CuerposDeAgua")):
+    #Conversión única de las series existentes: reescribe con fechas tipadas las que
+    #las guardan como texto y compacta los registros de anexos (que pueden tener fechas ISO).
+    #Retorna la lista de series convertidas
+    convertidas = []
+    for ruta in sorted(Path(rutaBase).glob(f"*/{config.data_folder}/DATOS_*{obtenerBackend().extension}")):
+        df = backendPorRuta(ruta).leer(ruta)
+        if not pd.api.types.is_datetime64_any_dtype(df["Fecha"]):
+            #Se incluyen los anexos para no perderlos al reescribir la serie
+            escribirSerie(ruta, leerSerie(ruta, compacta=False))
+        elif any(rutaLog.exists() for rutaLog in rutasSerie(ruta)[1:]):
+            compactarSerie(ruta)
+        else:
+            continue
+        convertidas.append(ruta)
+        print(f"{ruta}: fechas tipadas")
+    return convertidas
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Migra las series de Excel al backend de almacenamiento activo")
+    parser.add_argument("--ruta", default="CuerposDeAgua", help="Carpeta con los cuerpos de agua")
+    parser.add_argument("--eliminar-originales", action="store_true", help="Elimina los .xlsx tras migrarlos")
+    parser.add_argument("--convertir-fechas", action="store_true",
+                        help="Convierte a fechas tipadas las series existentes en lugar de migrar")
+    args = parser.parse_args(argumentos)
+
+    if args.convertir_fechas:
+        convertidas = convertirFechas(Path(args.ruta))
+        print(f"\nSe convirtieron {len(convertidas)} series.")
+        return 0
+
+    migrados = migrarCuerposDeAgua(Path(args.ruta), args.eliminar_originales)
+    print(f"\nSe migraron {len(migrados)} archivos.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
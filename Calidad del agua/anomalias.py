@@ -0,0 +1,405 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Detección de Anomalías en la Ingesta
+
+Revisa las lecturas a medida que entran por el módulo de ingesta (crear,
+agregar y editar desde el menú, y la orden ingest de la línea de comandos) con
+tres pruebas:
+    - desviación EWMA: el valor se aparta de la media exponencial más de
+      config.anomaly_z_threshold desviaciones exponenciales,
+    - desviación robusta: el valor se aparta de la mediana de las LECTURAS_MAD
+      lecturas anteriores más de config.anomaly_mad_threshold veces su MAD,
+    - cambio brusco: el valor cambia respecto a la última lectura de
+      referencia más que el cambio_maximo por hora del parámetro (parametros.py).
+
+El estado de cada serie tiene tamaño fijo (media y varianza exponenciales,
+últimas LECTURAS_MAD lecturas, lectura de referencia y última lectura válida) y
+se guarda en Datos/anomalias.json, así que revisar un anexo cuesta O(lecturas
+nuevas). La desviación robusta y el cambio brusco se aplican al bloque completo
+con NumPy. La media y la varianza exponenciales se recorren lectura por lectura
+con números de Python: una lectura que la propia prueba EWMA marca no debe
+entrar en ellas, y eso depende de las lecturas anteriores del mismo bloque.
+
+Las lecturas marcadas se guardan junto a la serie, en <archivo>.anomalias
+(líneas "nanosegundos,valor,motivos"), y no llegan al ICA: el historial las
+descarta y la última lectura de cada parámetro es la última válida.
+"""
+import os
+import json
+import math
+import threading
+from pathlib import Path
+from collections import Counter
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from config import config
+from parametros import PARAMETROS_CALIDAD, claveParametro
+import almacenamiento
+from resumen import firmaSerie
+from metricas import medir
+#========================
+#Fin de las importaciones (os, json, math, threading, pathlib, collections, numpy, pandas)
+
+#Nombre del índice de estados dentro de la carpeta de datos
+NOMBRE_INDICE = "anomalias.json"
+
+#Versión del contenido de los estados; los de otra versión se recalculan
+VERSION_ANOMALIAS = 2
+
+#Lecturas anteriores sobre las que se calculan la mediana y la MAD
+LECTURAS_MAD = 32
+
+#Lecturas que debe tener la serie antes de aplicar la prueba EWMA (al menos anomaly_ewma_span,
+#para que la varianza exponencial se haya estabilizado)
+LECTURAS_MINIMAS = 10
+
+#Lecturas que se revisan de una vez: la mediana móvil ocupa LECTURAS_MAD veces el bloque
+LECTURAS_POR_BLOQUE = 16_384
+
+#Convierte la MAD en una estimación de la desviación estándar para datos normales
+FACTOR_MAD = 1.4826
+
+#Motivos de una marca (se combinan como bits)
+DESVIACION_EWMA = 1
+DESVIACION_ROBUSTA = 2
+CAMBIO_BRUSCO = 4
+MOTIVOS = {
+    DESVIACION_EWMA: "desviación EWMA",
+    DESVIACION_ROBUSTA: "desviación robusta (MAD)",
+    CAMBIO_BRUSCO: "cambio brusco"
+}
+
+#Protege la lectura-modificación-escritura del índice y de los archivos de marcas
+_bloqueo = threading.RLock()
+
+#Cambio máximo por hora de cada parámetro, por su nombre canónico
+_CAMBIOS_MAXIMOS = {claveParametro(nombre): datos.get("cambio_maximo") for nombre, datos in PARAMETROS_CALIDAD.items()}
+
+
+def cambioMaximo(parametro):
+    #Variación máxima creíble por hora del parámetro, o None si no tiene
+    return _CAMBIOS_MAXIMOS.get(claveParametro(parametro))
+
+def describirMotivos(motivos):
+    #Texto de los motivos de una marca, p. ej. "desviación EWMA, cambio brusco"
+    return ", ".join(texto for bit, texto in MOTIVOS.items() if int(motivos) & bit)
+
+def rutaMarcas(rutaArchivo):
+    #Archivo con las lecturas marcadas de una serie, junto a ella
+    rutaArchivo = Path(rutaArchivo)
+    return rutaArchivo.with_name(rutaArchivo.name + ".anomalias")
+
+# ======================
+# Detección
+# ======================
+
+def estadoInicial():
+    return {"n": 0, "media": None, "varianza": None, "previas": [], "referencia": None,
+            "ultimaValida": None, "marcadas": 0}
+
+def detectar(estado, fechas, valores, cambioMaximo=None):
+    #Aplica las tres pruebas a las lecturas (en el orden en que llegan) a partir del estado de
+    #la serie. Retorna (motivos de cada lectura, 0 si es válida; estado actualizado).
+    #Se revisan por bloques de LECTURAS_POR_BLOQUE para acotar la memoria
+    tiempos = np.asarray(fechas).astype("datetime64[ns]").view("int64")
+    valores = np.asarray(valores, dtype="float64")
+    motivos = np.zeros(len(valores), dtype=np.int8)
+    for inicio in range(0, len(valores), LECTURAS_POR_BLOQUE):
+        fin = inicio + LECTURAS_POR_BLOQUE
+        motivos[inicio:fin], estado = _detectarBloque(estado, tiempos[inicio:fin], valores[inicio:fin], cambioMaximo)
+    return motivos, estado
+
+def _detectarBloque(estado, tiempos, valores, cambioMaximo):
+    m = len(valores)
+    motivos = np.zeros(m, dtype=np.int8)
+    if m == 0:
+        return motivos, estado
+    posiciones = np.arange(m)
+
+    # Desviación robusta: mediana y MAD de las LECTURAS_MAD lecturas anteriores a cada una.
+    # Mientras no haya suficientes, la ventana tiene NaN y la prueba no marca
+    previas = np.asarray(estado["previas"], dtype="float64")
+    todas = np.concatenate((np.full(LECTURAS_MAD - len(previas), np.nan), previas, valores))
+    ventanas = sliding_window_view(todas, LECTURAS_MAD)[:m]
+    mediana = np.median(ventanas, axis=1)
+    mad = FACTOR_MAD * np.median(np.abs(ventanas - mediana[:, None]), axis=1)
+    # Con MAD 0 (lecturas repetidas) la prueba no aplica
+    with np.errstate(invalid="ignore", divide="ignore"):
+        robusta = (mad > 0) & (np.abs(valores - mediana) > config.anomaly_mad_threshold * mad)
+    motivos[robusta] |= DESVIACION_ROBUSTA
+
+    # Cambio brusco respecto a la última lectura anterior que no se apartó de la mediana
+    referencia = estado["referencia"]
+    if cambioMaximo:
+        anteriores = np.maximum.accumulate(np.where(robusta, -1, posiciones))
+        anteriores = np.concatenate(([-1], anteriores[:-1]))
+        tieneReferencia = anteriores >= 0
+        tiemposRef = tiempos[np.maximum(anteriores, 0)]
+        valoresRef = valores[np.maximum(anteriores, 0)]
+        if referencia is not None:
+            tiemposRef[~tieneReferencia] = referencia[0]
+            valoresRef[~tieneReferencia] = referencia[1]
+            tieneReferencia[:] = True
+        #Entre lecturas con menos de una hora de diferencia se permite el cambio de una hora
+        horas = np.maximum(np.abs(tiempos - tiemposRef) / 3.6e12, 1.0)
+        motivos[tieneReferencia & (np.abs(valores - valoresRef) > cambioMaximo * horas)] |= CAMBIO_BRUSCO
+
+    # Desviación EWMA respecto a la media y la varianza antes de cada lectura. Ni las lecturas
+    # marcadas por las otras pruebas ni las que marca esta actualizan la media y la varianza
+    ewma, media, varianza = _recorrerEwma(estado, valores, motivos != 0)
+    motivos[ewma] |= DESVIACION_EWMA
+
+    # Estado tras el bloque
+    ultimas = todas[-LECTURAS_MAD:]
+    noRobustas = np.flatnonzero(~robusta)
+    if len(noRobustas):
+        referencia = [int(tiempos[noRobustas[-1]]), float(valores[noRobustas[-1]])]
+    validas = np.flatnonzero(motivos == 0)
+    ultimaValida = estado["ultimaValida"]
+    if len(validas):
+        ultimaValida = [int(tiempos[validas[-1]]), float(valores[validas[-1]])]
+    return motivos, {
+        "n": estado["n"] + m,
+        "media": media,
+        "varianza": varianza,
+        "previas": ultimas[~np.isnan(ultimas)].tolist(),
+        "referencia": referencia,
+        "ultimaValida": ultimaValida,
+        "marcadas": estado["marcadas"] + int((motivos != 0).sum())
+    }
+
+def _recorrerEwma(estado, valores, marcadas):
+    #Recurrencia exponencial con compuerta: retorna (lecturas marcadas, media, varianza).
+    #Varianza exponencial: v = (1 - a) * (v_anterior + a * d^2) con d = valor - media anterior
+    alfa = 2 / (config.anomaly_ewma_span + 1)
+    umbral = config.anomaly_z_threshold ** 2
+    #Posición del bloque desde la que la serie tiene lecturas suficientes para la prueba
+    primera = max(LECTURAS_MINIMAS, config.anomaly_ewma_span) - estado["n"]
+    media, varianza = estado["media"], estado["varianza"]
+    ewma = np.zeros(len(valores), dtype=bool)
+    for i, (valor, marcada) in enumerate(zip(valores.tolist(), marcadas.tolist())):
+        if media is None:
+            if not marcada and not math.isnan(valor):
+                media = valor
+            continue
+        diferencia = valor - media
+        #Con varianza 0 (lecturas repetidas) la prueba no aplica
+        if i >= primera and varianza and diferencia * diferencia > umbral * varianza:
+            ewma[i] = True
+            continue
+        if marcada or math.isnan(diferencia):
+            continue
+        media += alfa * diferencia
+        termino = (1 - alfa) * diferencia * diferencia
+        varianza = termino if varianza is None else varianza + alfa * (termino - varianza)
+    return ewma, media, varianza
+
+def sinMarcas():
+    return pd.DataFrame({"Fecha": pd.Series(dtype="datetime64[ns]"), "Valor": pd.Series(dtype="float64"),
+                         "Motivos": pd.Series(dtype="int8")})
+
+def _marcadas(fechas, valores, motivos):
+    #DataFrame con las lecturas marcadas de un bloque
+    marcadas = motivos != 0
+    return pd.DataFrame({
+        "Fecha": np.asarray(fechas).astype("datetime64[ns]")[marcadas],
+        "Valor": np.asarray(valores, dtype="float64")[marcadas],
+        "Motivos": motivos[marcadas]
+    })
+
+# ======================
+# Archivos de Marcas
+# ======================
+
+def leerMarcas(rutaArchivo):
+    #Lecturas marcadas de una serie (Fecha, Valor, Motivos); vacío si no hay
+    ruta = rutaMarcas(rutaArchivo)
+    if not ruta.exists() or ruta.stat().st_size == 0:
+        return sinMarcas()
+    df = pd.read_csv(ruta, header=None, names=["Fecha", "Valor", "Motivos"])
+    df["Fecha"] = pd.to_datetime(df["Fecha"], unit="ns")
+    return df
+
+def _escribirMarcas(rutaArchivo, marcadas, anexar):
+    ruta = rutaMarcas(rutaArchivo)
+    if not anexar:
+        ruta.unlink(missing_ok=True)
+    if marcadas.empty:
+        return
+    nanosegundos = marcadas["Fecha"].to_numpy().view("int64").tolist()
+    lineas = [f"{fecha},{valor!r},{motivo}\n" for fecha, valor, motivo
+              in zip(nanosegundos, marcadas["Valor"].tolist(), marcadas["Motivos"].tolist())]
+    with open(ruta, "a", encoding="utf-8") as archivo:
+        archivo.writelines(lineas)
+
+def filtroAnomalias(marcas):
+    #Retorna una función que quita las lecturas marcadas de los bloques sucesivos de una serie.
+    #Una marca se identifica por (fecha, valor) y quita una sola lectura: varias lecturas del
+    #mismo día capturadas sin hora comparten fecha y las válidas deben conservarse. El valor se
+    #compara en float32 porque las series grandes se leen en formato compacto
+    fechas = marcas["Fecha"].to_numpy().astype("datetime64[ns]").view("int64")
+    pendientes = Counter(zip(fechas.tolist(), marcas["Valor"].to_numpy(dtype="float32").tolist()))
+    fechasMarcadas = np.unique(fechas)
+
+    def filtrar(df):
+        if not pendientes:
+            return df
+        tiempos = df["Fecha"].to_numpy().astype("datetime64[ns]").view("int64")
+        candidatas = np.flatnonzero(np.isin(tiempos, fechasMarcadas))
+        valores = df["Valor"].to_numpy(dtype="float32")[candidatas]
+        quitar = []
+        for posicion, clave in zip(candidatas.tolist(), zip(tiempos[candidatas].tolist(), valores.tolist())):
+            if pendientes[clave] > 0:
+                pendientes[clave] -= 1
+                quitar.append(posicion)
+        if not quitar:
+            return df
+        conservar = np.ones(len(df), dtype=bool)
+        conservar[quitar] = False
+        return df[conservar].reset_index(drop=True)
+    return filtrar
+
+def filtrarAnomalias(rutaArchivo, df):
+    #Quita de una serie las lecturas marcadas (ver filtroAnomalias)
+    return filtroAnomalias(leerMarcas(rutaArchivo))(df)
+
+# ======================
+# Índice de Estados
+# ======================
+
+def rutaIndice(rutaDatos):
+    return Path(rutaDatos) / NOMBRE_INDICE
+
+def leerIndice(rutaDatos):
+    #Lee el índice de estados de un cuerpo de agua (vacío si no existe o está dañado)
+    try:
+        with open(rutaIndice(rutaDatos), "r", encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def guardarIndice(rutaDatos, indice):
+    #Guarda el índice a un temporal y luego lo reemplaza
+    ruta = rutaIndice(rutaDatos)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(indice, archivo, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+def _fijarEntrada(indice, rutaArchivo, estado):
+    indice[rutaArchivo.name] = {
+        "version": VERSION_ANOMALIAS,
+        "parametro": almacenamiento.obtenerNombreParametro(rutaArchivo.name),
+        "firma": firmaSerie(rutaArchivo),
+        "estado": estado
+    }
+
+def _revisarBloques(rutaArchivo, bloques):
+    #Revisa una serie completa desde el estado inicial y reescribe su archivo de marcas.
+    #Retorna (estado final, lecturas marcadas)
+    rutaArchivo = Path(rutaArchivo)
+    limite = cambioMaximo(almacenamiento.obtenerNombreParametro(rutaArchivo.name))
+    estado = estadoInicial()
+    partes = []
+    with medir("detectarAnomalias") as medicion:
+        for bloque in bloques:
+            motivos, estado = detectar(estado, bloque["Fecha"].to_numpy(), bloque["Valor"].to_numpy(), limite)
+            partes.append(_marcadas(bloque["Fecha"].to_numpy(), bloque["Valor"].to_numpy(), motivos))
+            medicion["filas"] += len(bloque)
+    marcadas = pd.concat(partes, ignore_index=True) if partes else sinMarcas()
+    _escribirMarcas(rutaArchivo, marcadas, anexar=False)
+    return estado, marcadas
+
+# ======================
+# Actualización desde la Ingesta
+# ======================
+
+def revisarCompleta(rutaArchivo, df):
+    #Se llama tras escribir la serie completa (crear o editar). Retorna las lecturas marcadas
+    rutaArchivo = Path(rutaArchivo)
+    with _bloqueo:
+        estado, marcadas = _revisarBloques(rutaArchivo, [almacenamiento.normalizarSerie(df)])
+        indice = leerIndice(rutaArchivo.parent)
+        _fijarEntrada(indice, rutaArchivo, estado)
+        guardarIndice(rutaArchivo.parent, indice)
+    return marcadas
+
+def revisarAnexo(rutaArchivo, dfNuevos):
+    #Se llama tras anexar registros; solo se revisan los nuevos. Retorna los que se marcaron
+    rutaArchivo = Path(rutaArchivo)
+    nuevos = almacenamiento.normalizarSerie(dfNuevos)
+    with _bloqueo:
+        indice = leerIndice(rutaArchivo.parent)
+        entrada = indice.get(rutaArchivo.name)
+        if entrada is None or entrada.get("version") != VERSION_ANOMALIAS:
+            #Sin estado previo se revisa la serie completa, que ya incluye los nuevos
+            estado, marcadas = _revisarBloques(rutaArchivo, almacenamiento.iterarSerie(rutaArchivo))
+            marcadas = marcadas[marcadas["Fecha"].isin(nuevos["Fecha"])].reset_index(drop=True)
+        else:
+            limite = cambioMaximo(almacenamiento.obtenerNombreParametro(rutaArchivo.name))
+            with medir("detectarAnomalias", filas=len(nuevos)):
+                fechas, valores = nuevos["Fecha"].to_numpy(), nuevos["Valor"].to_numpy()
+                motivos, estado = detectar(entrada["estado"], fechas, valores, limite)
+                marcadas = _marcadas(fechas, valores, motivos)
+            _escribirMarcas(rutaArchivo, marcadas, anexar=True)
+        _fijarEntrada(indice, rutaArchivo, estado)
+        guardarIndice(rutaArchivo.parent, indice)
+    return marcadas
+
+def refrescarFirma(rutaArchivo):
+    #La compactación cambia los archivos pero no los datos: solo se actualiza la firma
+    rutaArchivo = Path(rutaArchivo)
+    with _bloqueo:
+        indice = leerIndice(rutaArchivo.parent)
+        if rutaArchivo.name in indice:
+            indice[rutaArchivo.name]["firma"] = firmaSerie(rutaArchivo)
+            guardarIndice(rutaArchivo.parent, indice)
+
+# ======================
+# Consultas
+# ======================
+
+def obtenerEstados(rutaDatos, archivos=None):
+    #Retorna {parametro: estado} para los archivos indicados (o todos los de la carpeta).
+    #Las series sin estado, o cuyo estado no coincide con los archivos en disco (por ejemplo,
+    #series anteriores a la detección), se revisan completas una vez
+    rutaDatos = Path(rutaDatos)
+    if archivos is None:
+        archivos = almacenamiento.listarArchivos(rutaDatos)
+
+    estados = {}
+    with _bloqueo:
+        indice = leerIndice(rutaDatos)
+        modificado = False
+        for archivo in archivos:
+            rutaArchivo = rutaDatos / archivo
+            entrada = indice.get(archivo)
+            if (entrada is None or entrada.get("version") != VERSION_ANOMALIAS
+                    or entrada["firma"] != firmaSerie(rutaArchivo)):
+                estado, _ = _revisarBloques(rutaArchivo, almacenamiento.iterarSerie(rutaArchivo))
+                _fijarEntrada(indice, rutaArchivo, estado)
+                entrada = indice[archivo]
+                modificado = True
+            estados[entrada["parametro"]] = entrada["estado"]
+        #Se quitan las entradas de series que ya no existen
+        for archivo in [a for a in indice if not (rutaDatos / a).exists()]:
+            del indice[archivo]
+            modificado = True
+        if modificado:
+            guardarIndice(rutaDatos, indice)
+    return estados
+
+def ultimasValidas(rutaDatos, archivos=None):
+    #Última lectura no marcada de cada parámetro: {parametro: {"fecha": datetime, "valor": float}}
+    validas = {}
+    for parametro, estado in obtenerEstados(rutaDatos, archivos).items():
+        if estado["ultimaValida"] is not None:
+            fecha, valor = estado["ultimaValida"]
+            validas[parametro] = {"fecha": pd.Timestamp(fecha, unit="ns").to_pydatetime(), "valor": valor}
+    return validas
+
+
+#La compactación de almacenamiento avisa al índice para que no revise la serie de nuevo
+almacenamiento.observadoresCompactacion.append(refrescarFirma)
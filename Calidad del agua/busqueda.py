@@ -0,0 +1,447 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Búsqueda en Reportes
+
+Índice invertido sobre el título y el texto de los reportes de todos los
+cuerpos de agua (CuerposDeAgua/<Cuerpo>/Reportes/*.txt). El índice se guarda en
+CuerposDeAgua/indiceReportes.json y se actualiza de forma incremental:
+    - al guardar un reporte (indexarReporte) se agrega solo ese reporte,
+    - la primera consulta de cada proceso revisa todos los reportes y vuelve a
+      leer los cuyo mtime o tamaño cambió (otro proceso pudo modificarlos),
+    - las consultas siguientes solo revisan el mtime de la carpeta de reportes
+      de cada cuerpo de agua, y recorren únicamente las carpetas que cambiaron
+      (reportes nuevos, borrados o renombrados por fuera del sistema), más los
+      reportes abiertos para editar (vigilarReporte).
+
+Las palabras se comparan sin mayúsculas ni acentos ("oxigeno" encuentra
+"Oxígeno"), sin palabras vacías del español y con una reducción simple de
+plurales ("nitratos" encuentra "nitrato", "reportes" encuentra "reporte"). Los resultados se ordenan por BM25,
+con más peso para las palabras del título, y se pueden filtrar por cuerpo de
+agua y por rango de fechas (la fecha del nombre del reporte).
+
+Para que una consulta tarde milisegundos con decenas de miles de reportes, el
+puntaje se calcula con numpy: cada término se convierte la primera vez que se
+consulta en dos arreglos (documentos y frecuencias), que se descartan cuando el
+índice cambia.
+"""
+import os
+import re
+import json
+import math
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+from config import config
+from metricas import medir
+#========================
+#Fin de las importaciones (os, re, json, math, threading, unicodedata, datetime, pathlib, numpy)
+
+#Nombre del archivo del índice dentro de la carpeta de cuerpos de agua
+NOMBRE_INDICE = "indiceReportes.json"
+
+#Versión del formato del índice; uno de otra versión se reconstruye
+VERSION_INDICE = 2
+
+#Parámetros de BM25 y peso de una palabra del título frente a una del texto
+K1 = 1.2
+B = 0.75
+PESO_TITULO = 3
+
+#Nombre de un reporte: Reporte_<titulo>_<dd-mm-yy_HH-MM-SS>.txt
+PATRON_NOMBRE = re.compile(r"^Reporte_(?P<titulo>.*)_(?P<fecha>\d{2}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.txt$")
+FORMATO_FECHA_NOMBRE = "%d-%m-%y_%H-%M-%S"
+
+#Palabras que no aportan a la búsqueda
+PALABRAS_VACIAS = frozenset("""
+a al algo ante antes como con contra cual cuando de del desde donde durante e el ella ellas ellos en entre era
+es esa ese eso esta este esto fue ha hay la las le les lo los mas me mi muy ni no nos o otra otro para pero por
+porque que se sea ser si sin sobre son su sus tambien te tiene u un una uno unos unas y ya
+""".split())
+
+# ======================
+# Normalización del Texto
+# ======================
+
+def normalizarTexto(texto):
+    #Minúsculas y sin acentos ni diéresis (la ñ queda como n)
+    descompuesto = unicodedata.normalize("NFD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def _raiz(palabra):
+    #Reducción de plurales: "nitratos" -> "nitrato", "metales" -> "metal". El plural en -es
+    #de las palabras terminadas en e pierde también la e ("reportes" -> "report"), así que
+    #la e final del singular se quita para que ambas formas den la misma raíz
+    if len(palabra) > 4 and palabra.endswith("es") and palabra[-3] not in "aeiou":
+        palabra = palabra[:-2]
+    elif len(palabra) > 3 and palabra.endswith("s"):
+        palabra = palabra[:-1]
+    if len(palabra) > 3 and palabra.endswith("e"):
+        palabra = palabra[:-1]
+    return palabra
+
+def tokenizar(texto):
+    #Lista de términos de un texto, en el mismo orden
+    return [_raiz(palabra) for palabra in re.findall(r"[a-z0-9]+", normalizarTexto(texto))
+            if palabra not in PALABRAS_VACIAS]
+
+def _frecuencias(terminos, peso=1):
+    frecuencias = {}
+    for termino in terminos:
+        frecuencias[termino] = frecuencias.get(termino, 0) + peso
+    return frecuencias
+
+def _leerTexto(ruta):
+    #Los reportes se guardan con la codificación del sistema: UTF-8 o, en Windows, cp1252
+    datos = Path(ruta).read_bytes()
+    try:
+        return datos.decode("utf-8")
+    except UnicodeDecodeError:
+        return datos.decode("cp1252", errors="replace")
+
+# ======================
+# Índice
+# ======================
+
+class IndiceReportes:
+    #Índice invertido de los reportes bajo una carpeta de cuerpos de agua
+
+    def __init__(self, rutaBase=Path("CuerposDeAgua")):
+        self.rutaBase = Path(rutaBase)
+        self._documentos = {}#ruta relativa -> datos del reporte y frecuencias de sus términos
+        self._invertido = {}#término -> {ruta relativa: frecuencia}
+        self._compilado = None#arreglos para puntuar; None cuando el índice cambió
+        self._carpetas = {}#cuerpo -> mtime de su carpeta de reportes cuando se recorrió
+        self._vigilados = set()#rutas relativas que se revisan en cada consulta
+        self._cargado = False
+        self._revisado = False#True tras revisar todos los reportes en este proceso
+        self._bloqueo = threading.Lock()
+
+    def rutaIndice(self):
+        return self.rutaBase / NOMBRE_INDICE
+
+    def _cargar(self):
+        try:
+            with open(self.rutaIndice(), "r", encoding="utf-8") as archivo:
+                contenido = json.load(archivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            contenido = {}
+        if contenido.get("version") == VERSION_INDICE:
+            for clave, documento in contenido["documentos"].items():
+                self._agregar(clave, documento)
+        self._cargado = True
+
+    def guardar(self):
+        #Guarda el índice a un temporal y luego lo reemplaza
+        ruta = self.rutaIndice()
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(ruta.name + ".tmp")
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"version": VERSION_INDICE, "documentos": self._documentos}, archivo, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def _agregar(self, clave, documento):
+        self._compilado = None
+        self._documentos[clave] = documento
+        for termino, frecuencia in documento["terminos"].items():
+            self._invertido.setdefault(termino, {})[clave] = frecuencia
+
+    def _quitar(self, clave):
+        self._compilado = None
+        documento = self._documentos.pop(clave)
+        for termino in documento["terminos"]:
+            publicaciones = self._invertido[termino]
+            del publicaciones[clave]
+            if not publicaciones:
+                del self._invertido[termino]
+
+    def _carpetasEnDisco(self):
+        #{cuerpo: mtime de su carpeta de reportes} de los cuerpos que tienen una
+        if not self.rutaBase.is_dir():
+            return {}
+        carpetas = {}
+        for cuerpo in os.scandir(self.rutaBase):
+            if not cuerpo.is_dir():
+                continue
+            try:
+                carpetas[cuerpo.name] = os.stat(Path(cuerpo.path) / config.report_folder).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        return carpetas
+
+    def _archivosEnDisco(self, cuerpos):
+        #{ruta relativa: (cuerpo, nombre, mtime, tamaño)} de los reportes de los cuerpos indicados
+        archivos = {}
+        for cuerpo in cuerpos:
+            try:
+                entradas = list(os.scandir(self.rutaBase / cuerpo / config.report_folder))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entrada in entradas:
+                if entrada.name.endswith(".txt") and entrada.is_file():
+                    estado = entrada.stat()
+                    archivos[f"{cuerpo}/{entrada.name}"] = (cuerpo, entrada.name, estado.st_mtime_ns, estado.st_size)
+        return archivos
+
+    def _leerDocumento(self, cuerpo, nombre, mtime, tamano):
+        texto = _leerTexto(self.rutaBase / cuerpo / config.report_folder / nombre)
+        coincidencia = PATRON_NOMBRE.match(nombre)
+        if coincidencia:
+            titulo = coincidencia["titulo"]
+            fecha = datetime.strptime(coincidencia["fecha"], FORMATO_FECHA_NOMBRE)
+        else:
+            #Reporte con otro nombre: se titula con el nombre y se fecha con su mtime
+            titulo = Path(nombre).stem
+            fecha = datetime.fromtimestamp(mtime // 10**9)
+        #El texto guardado empieza con el título; no se cuenta dos veces
+        cuerpoTexto = texto.split("\n", 1)[1] if texto.startswith(titulo + "\n") else texto
+        terminosTitulo = tokenizar(titulo)
+        terminosTexto = tokenizar(cuerpoTexto)
+        terminos = _frecuencias(terminosTexto)
+        for termino, frecuencia in _frecuencias(terminosTitulo, PESO_TITULO).items():
+            terminos[termino] = terminos.get(termino, 0) + frecuencia
+        return {
+            "cuerpo": cuerpo,
+            "archivo": nombre,
+            "titulo": titulo,
+            "fecha": fecha.isoformat(),
+            "mtime": mtime,
+            "tamano": tamano,
+            "longitud": len(terminosTexto) + PESO_TITULO * len(terminosTitulo),
+            "terminos": terminos
+        }
+
+    def _reindexar(self, clave, cuerpo, nombre, mtime, tamano):
+        #Vuelve a leer un reporte si cambió; retorna True si se reindexó
+        anterior = self._documentos.get(clave)
+        if anterior and anterior["mtime"] == mtime and anterior["tamano"] == tamano:
+            return False
+        if anterior:
+            self._quitar(clave)
+        try:
+            self._agregar(clave, self._leerDocumento(cuerpo, nombre, mtime, tamano))
+        except OSError:
+            #Reporte borrado o bloqueado mientras se indexaba: se verá en la próxima revisión
+            return False
+        return True
+
+    def _sincronizar(self, cuerpos, carpetas):
+        #Reindexa los reportes nuevos o modificados de los cuerpos indicados y quita sus
+        #reportes eliminados. Retorna (reindexados, eliminados)
+        cuerpos = set(cuerpos)
+        enDisco = self._archivosEnDisco(cuerpos)
+        eliminados = [clave for clave, documento in self._documentos.items()
+                      if documento["cuerpo"] in cuerpos and clave not in enDisco]
+        for clave in eliminados:
+            self._quitar(clave)
+        reindexados = sum(self._reindexar(clave, *datos) for clave, datos in enDisco.items())
+        for cuerpo in cuerpos:
+            if cuerpo in carpetas:
+                self._carpetas[cuerpo] = carpetas[cuerpo]
+            else:
+                self._carpetas.pop(cuerpo, None)
+        if reindexados or eliminados:
+            self.guardar()
+        return reindexados, len(eliminados)
+
+    def actualizar(self):
+        #Revisa todos los reportes: reindexa los nuevos o modificados y quita los eliminados.
+        #Retorna (reindexados, eliminados)
+        with self._bloqueo, medir("indexarReportes") as medicion:
+            if not self._cargado:
+                self._cargar()
+            #Las carpetas se leen antes que los archivos para no perder cambios durante el recorrido
+            carpetas = self._carpetasEnDisco()
+            cuerpos = set(carpetas) | {documento["cuerpo"] for documento in self._documentos.values()}
+            reindexados, eliminados = self._sincronizar(cuerpos, carpetas)
+            self._revisado = True
+            medicion["filas"] = reindexados
+            return reindexados, eliminados
+
+    def refrescar(self):
+        #Pone el índice al día antes de una consulta: la primera vez en el proceso se revisan
+        #todos los reportes; después, solo las carpetas cuyo mtime cambió y los vigilados
+        if not self._revisado:
+            return self.actualizar()
+        with self._bloqueo, medir("indexarReportes") as medicion:
+            carpetas = self._carpetasEnDisco()
+            cambiadas = {cuerpo for cuerpo in set(carpetas) | set(self._carpetas)
+                         if carpetas.get(cuerpo) != self._carpetas.get(cuerpo)}
+            reindexados, eliminados = self._sincronizar(cambiadas, carpetas) if cambiadas else (0, 0)
+            for clave in list(self._vigilados):
+                cuerpo, nombre = clave.split("/", 1)
+                try:
+                    estado = os.stat(self.rutaBase / cuerpo / config.report_folder / nombre)
+                except FileNotFoundError:
+                    self._vigilados.discard(clave)
+                    continue
+                if self._reindexar(clave, cuerpo, nombre, estado.st_mtime_ns, estado.st_size):
+                    reindexados += 1
+                    self.guardar()
+            medicion["filas"] = reindexados
+            return reindexados, eliminados
+
+    def _clave(self, ruta):
+        #(cuerpo, nombre, ruta relativa) de un reporte bajo esta carpeta, o None si no está en ella
+        ruta = Path(ruta).resolve()
+        if ruta.parent.name != config.report_folder or ruta.parent.parent.parent != self.rutaBase.resolve():
+            return None
+        cuerpo = ruta.parent.parent.name
+        return cuerpo, ruta.name, f"{cuerpo}/{ruta.name}"
+
+    def agregarReporte(self, ruta):
+        #Indexa un reporte recién guardado sin revisar los demás. Si el índice aún no se
+        #revisó en este proceso no hace falta: la primera consulta lo encontrará
+        partes = self._clave(ruta)
+        with self._bloqueo:
+            if partes is None or not self._revisado:
+                return
+            cuerpo, nombre, clave = partes
+            anteriorCarpeta = self._carpetas.get(cuerpo)
+            estado = os.stat(ruta)
+            if self._reindexar(clave, cuerpo, nombre, estado.st_mtime_ns, estado.st_size):
+                self.guardar()
+            #La carpeta cambió por este reporte; si estaba al día, lo sigue estando
+            if anteriorCarpeta is not None:
+                self._carpetas[cuerpo] = os.stat(Path(ruta).parent).st_mtime_ns
+
+    def vigilar(self, ruta):
+        #Revisa un reporte en cada consulta (se abrió para editarlo fuera del sistema)
+        partes = self._clave(ruta)
+        if partes is not None:
+            with self._bloqueo:
+                self._vigilados.add(partes[2])
+
+    def _compilar(self):
+        #Arreglos por documento: normalización de BM25, fecha y cuerpo de agua
+        if self._compilado is None:
+            claves = list(self._documentos)
+            documentos = [self._documentos[clave] for clave in claves]
+            longitudes = np.array([documento["longitud"] for documento in documentos], dtype="float64")
+            longitudMedia = longitudes.mean() if len(longitudes) else 0.0
+            self._compilado = {
+                "claves": claves,
+                "posicion": {clave: i for i, clave in enumerate(claves)},
+                "normalizacion": K1 * (1 - B + B * longitudes / longitudMedia) if longitudMedia else np.full(len(claves), K1),
+                "fechas": np.array([documento["fecha"] for documento in documentos], dtype="datetime64[s]"),
+                "cuerpos": np.array([documento["cuerpo"] for documento in documentos], dtype=object),
+                "terminos": {}
+            }
+        return self._compilado
+
+    def _publicaciones(self, termino):
+        #(documentos, frecuencias) de un término como arreglos
+        compilado = self._compilado
+        if termino not in compilado["terminos"]:
+            publicaciones = self._invertido.get(termino, {})
+            compilado["terminos"][termino] = (
+                np.fromiter((compilado["posicion"][clave] for clave in publicaciones), dtype="int64", count=len(publicaciones)),
+                np.fromiter(publicaciones.values(), dtype="float64", count=len(publicaciones)))
+        return compilado["terminos"][termino]
+
+    def buscar(self, consulta, cuerpo=None, desde=None, hasta=None, limite=20, actualizar=True):
+        #Reportes ordenados por relevancia. consulta puede estar vacía para filtrar solo
+        #por cuerpo y fechas (los más recientes primero). hasta es inclusive: una fecha
+        #sin hora incluye todo ese día
+        if actualizar:
+            self.refrescar()
+        if hasta is not None and hasta == datetime(hasta.year, hasta.month, hasta.day):
+            hasta = hasta + timedelta(days=1) - timedelta(seconds=1)
+
+        with self._bloqueo, medir("buscarReportes") as medicion:
+            if not self._cargado:
+                self._cargar()
+            compilado = self._compilar()
+            admitidos = np.ones(len(compilado["claves"]), dtype=bool)
+            if cuerpo is not None:
+                admitidos &= compilado["cuerpos"] == cuerpo
+            if desde is not None:
+                admitidos &= compilado["fechas"] >= np.datetime64(desde, "s")
+            if hasta is not None:
+                admitidos &= compilado["fechas"] <= np.datetime64(hasta, "s")
+
+            terminos = list(dict.fromkeys(tokenizar(consulta or "")))
+            if terminos:
+                puntajes = self._puntuar(terminos)
+                admitidos &= puntajes > 0
+            else:
+                #Sin palabras se ordena por fecha, los más recientes primero
+                puntajes = compilado["fechas"].astype("float64")
+            indices = np.flatnonzero(admitidos)
+            medicion["filas"] = len(indices)
+            if len(indices) > limite:
+                indices = indices[np.argpartition(-puntajes[indices], limite - 1)[:limite]]
+            indices = indices[np.argsort(-puntajes[indices], kind="stable")]
+
+            resultados = []
+            for indice in indices:
+                clave = compilado["claves"][indice]
+                puntaje = float(puntajes[indice]) if terminos else 0.0
+                documento = self._documentos[clave]
+                resultados.append({
+                    "cuerpo": documento["cuerpo"],
+                    "archivo": documento["archivo"],
+                    "titulo": documento["titulo"],
+                    "fecha": datetime.fromisoformat(documento["fecha"]),
+                    "puntaje": round(puntaje, 4),
+                    "ruta": self.rutaBase / documento["cuerpo"] / config.report_folder / documento["archivo"]
+                })
+        for resultado in resultados:
+            resultado["fragmento"] = fragmento(resultado["ruta"], terminos)
+        return resultados
+
+    def _puntuar(self, terminos):
+        #Puntaje BM25 de cada documento (0 en los que no contienen ningún término)
+        compilado = self._compilado
+        total = len(compilado["claves"])
+        puntajes = np.zeros(total)
+        for termino in terminos:
+            documentos, frecuencias = self._publicaciones(termino)
+            if not len(documentos):
+                continue
+            idf = math.log(1 + (total - len(documentos) + 0.5) / (len(documentos) + 0.5))
+            puntajes[documentos] += idf * frecuencias * (K1 + 1) / (frecuencias + compilado["normalizacion"][documentos])
+        return puntajes
+
+def fragmento(ruta, terminos, largo=120):
+    #Primera línea del reporte (sin el título) que contiene algún término de la búsqueda
+    try:
+        lineas = _leerTexto(ruta).splitlines()
+    except OSError:
+        return ""
+    lineas = [linea.strip() for linea in lineas[1:] if linea.strip()] or [""]
+    buscados = set(terminos)
+    for linea in lineas:
+        if buscados & set(tokenizar(linea)):
+            return linea[:largo]
+    return lineas[0][:largo]
+
+#Índices abiertos en este proceso, uno por carpeta de cuerpos de agua
+_indices = {}
+_bloqueoIndices = threading.Lock()
+
+def obtenerIndice(rutaBase=Path("CuerposDeAgua")):
+    #Índice de una carpeta de cuerpos de agua; se carga una vez por proceso
+    clave = str(Path(rutaBase).resolve())
+    with _bloqueoIndices:
+        if clave not in _indices:
+            _indices[clave] = IndiceReportes(rutaBase)
+        return _indices[clave]
+
+def indexarReporte(ruta):
+    #Agrega un reporte recién guardado a los índices abiertos en este proceso
+    with _bloqueoIndices:
+        indices = list(_indices.values())
+    for indice in indices:
+        indice.agregarReporte(ruta)
+
+def vigilarReporte(ruta):
+    #Pide a los índices abiertos que revisen un reporte en cada consulta (edición externa)
+    with _bloqueoIndices:
+        indices = list(_indices.values())
+    for indice in indices:
+        indice.vigilar(ruta)
+
+def buscarReportes(consulta, cuerpo=None, desde=None, hasta=None, limite=20, rutaBase=Path("CuerposDeAgua")):
+    return obtenerIndice(rutaBase).buscar(consulta, cuerpo, desde, hasta, limite)
@@ -0,0 +1,102 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Caché de Series en Memoria
+
+Guarda las series ya leídas para no volver a leer el mismo archivo en cada
+pantalla. Cada entrada se valida con la firma (ruta, mtime, tamaño) de los
+archivos de los que salió, y se desalojan las menos usadas (LRU) cuando se
+supera el presupuesto de memoria config.cache_max_bytes.
+"""
+import os
+import threading
+from collections import OrderedDict
+from config import config
+#========================
+#Fin de las importaciones (os, threading, collections)
+
+
+class CacheSeries:
+    #Caché LRU de DataFrames con presupuesto de memoria y contadores de uso
+
+    def __init__(self, presupuestoBytes=None):
+        self.presupuestoBytes = presupuestoBytes
+        self._entradas = OrderedDict()#clave -> (firma, df, bytes)
+        self._bloqueo = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.bytesUsados = 0
+
+    def _presupuesto(self):
+        #Si no se fijó uno propio, se usa el de la configuración
+        return self.presupuestoBytes if self.presupuestoBytes is not None else config.cache_max_bytes
+
+    def obtener(self, clave, firma):
+        #Retorna el DataFrame guardado si la firma coincide, o None si no está o es antiguo
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] != firma:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, firma, df):
+        #Guarda un DataFrame y desaloja las entradas más antiguas si se supera el presupuesto
+        tamano = int(df.memory_usage(deep=True).sum())
+        with self._bloqueo:
+            self._quitar(clave)
+            #Una serie más grande que todo el presupuesto no se guarda
+            if tamano > self._presupuesto():
+                return
+            self._entradas[clave] = (firma, df, tamano)
+            self.bytesUsados += tamano
+            while self.bytesUsados > self._presupuesto():
+                claveAntigua = next(iter(self._entradas))
+                self._quitar(claveAntigua)
+                self.desalojos += 1
+
+    def invalidar(self, clave=None):
+        #Elimina una entrada, o todas si no se indica clave
+        with self._bloqueo:
+            if clave is None:
+                self._entradas.clear()
+                self.bytesUsados = 0
+            else:
+                self._quitar(clave)
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is not None:
+            self.bytesUsados -= entrada[2]
+
+    def estadisticas(self):
+        #Retorna los contadores de uso de la caché
+        with self._bloqueo:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasaAciertos": self.aciertos / consultas if consultas else 0.0,
+                "bytesUsados": self.bytesUsados,
+                "presupuestoBytes": self._presupuesto()
+            }
+
+
+def firmaArchivos(rutas):
+    #Firma (ruta, mtime, tamaño) de los archivos que existen de una lista de rutas
+    firma = []
+    for ruta in rutas:
+        try:
+            datos = os.stat(ruta)
+        except FileNotFoundError:
+            continue
+        firma.append((str(ruta), datos.st_mtime_ns, datos.st_size))
+    return tuple(firma)
+
+
+#Instancia compartida por todos los módulos del proceso
+cacheSeries = CacheSeries()
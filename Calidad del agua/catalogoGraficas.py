@@ -0,0 +1,216 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Catálogo de Gráficas Guardadas
+
+Cada cuerpo de agua tiene en Graficas/catalogo.db (SQLite) una fila por imagen
+guardada: serie graficada, tipo, rango de fechas de los datos, registros, hash
+del contenido de la serie, tamaño del archivo y fecha de creación. generarGrafica
+y el historial del ICA registran cada imagen al guardarla, de modo que listar,
+filtrar y paginar las gráficas es una consulta indexada y no un stat() por
+archivo.
+
+El catálogo también sirve de caché de render: buscarGrafica() encuentra una
+imagen ya guardada de la misma serie, con el mismo contenido, tipo, inversión
+del eje y versión de estilo, para no volver a dibujarla.
+
+Las imágenes que ya existían antes del catálogo se registran la primera vez que
+se abre (con los datos que se pueden sacar del nombre del archivo).
+"""
+import re
+import sqlite3
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from contextlib import closing
+#========================
+#Fin de las importaciones (re, sqlite3, hashlib, pathlib, datetime, contextlib)
+
+#Nombre del catálogo dentro de la carpeta Graficas del cuerpo de agua
+NOMBRE_CATALOGO = "catalogo.db"
+
+#Nombre de una gráfica: <serie>-<dd-mm-yy_HH-MM-SS>.png
+PATRON_NOMBRE = re.compile(r"^(?P<serie>.*)-(?P<fecha>\d{2}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.png$")
+FORMATO_FECHA_NOMBRE = "%d-%m-%y_%H-%M-%S"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS graficas (
+    ruta TEXT PRIMARY KEY,
+    serie TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    desde TEXT,
+    hasta TEXT,
+    registros INTEGER,
+    hashDatos TEXT,
+    invertida INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL,
+    creada TEXT NOT NULL,
+    estilo TEXT
+);
+CREATE INDEX IF NOT EXISTS graficasTipo ON graficas (tipo, creada);
+CREATE INDEX IF NOT EXISTS graficasSerie ON graficas (serie, tipo, creada);
+CREATE INDEX IF NOT EXISTS graficasHash ON graficas (hashDatos, serie, tipo);
+"""
+
+
+def hashDatos(fechas, valores):
+    #Hash del contenido de una serie (arreglos de fechas y valores), independiente del archivo.
+    #Los valores se pasan siempre a float32 antes del hash: una serie grande se lee en formato
+    #compacto (float32) y una pequeña en float64, y ambas deben dar la misma huella
+    resumen = hashlib.blake2b(digest_size=16)
+    resumen.update(memoryview(fechas.astype("datetime64[ns]", copy=False).view("int64")).cast("B"))
+    resumen.update(memoryview(valores.astype("float32", copy=False)).cast("B"))
+    return resumen.hexdigest()
+
+# ======================
+# Conexión
+# ======================
+
+def abrirCatalogo(rutaGraficas):
+    #Conexión al catálogo de una carpeta Graficas; lo crea (y registra las imágenes
+    #que ya hubiera) la primera vez. Las filas se leen como diccionarios
+    rutaGraficas = Path(rutaGraficas)
+    rutaGraficas.mkdir(parents=True, exist_ok=True)
+    ruta = rutaGraficas / NOMBRE_CATALOGO
+    nuevo = not ruta.exists()
+    #Los procesos de graficasLote registran a la vez: WAL y espera en lugar de error
+    conexion = sqlite3.connect(ruta, timeout=30)
+    conexion.row_factory = sqlite3.Row
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(ESQUEMA)
+    #Los catálogos creados antes de la caché de render no tienen la columna estilo
+    if "estilo" not in [fila["name"] for fila in conexion.execute("PRAGMA table_info(graficas)")]:
+        conexion.execute("ALTER TABLE graficas ADD COLUMN estilo TEXT")
+    if nuevo:
+        importarExistentes(conexion, rutaGraficas)
+    return conexion
+
+def importarExistentes(conexion, rutaGraficas):
+    #Registra las imágenes guardadas antes de que existiera el catálogo. Retorna cuántas
+    filas = []
+    for imagen in Path(rutaGraficas).glob("*/*.png"):
+        coincidencia = PATRON_NOMBRE.match(imagen.name)
+        estado = imagen.stat()
+        if coincidencia:
+            serie = coincidencia["serie"]
+            creada = datetime.strptime(coincidencia["fecha"], FORMATO_FECHA_NOMBRE)
+        else:
+            serie, creada = imagen.stem, datetime.fromtimestamp(int(estado.st_mtime))
+        filas.append((imagen.relative_to(rutaGraficas).as_posix(), serie, imagen.parent.name,
+                      estado.st_size, creada.isoformat()))
+    with conexion:
+        conexion.executemany("INSERT OR IGNORE INTO graficas (ruta, serie, tipo, bytes, creada) VALUES (?, ?, ?, ?, ?)",
+                             filas)
+    return len(filas)
+
+# ======================
+# Registro
+# ======================
+
+def registrarGrafica(rutaImagen, serie, fechas=None, valores=None, invertida=False, huella=None, estilo=None):
+    #Agrega una imagen recién guardada en Graficas/<Tipo>/ al catálogo de su cuerpo de agua;
+    #el tipo es el nombre de la carpeta. fechas y valores son los datos graficados
+    #(sin reducir), para el rango y el hash (huella, si ya se calculó)
+    rutaImagen = Path(rutaImagen)
+    rutaGraficas = rutaImagen.parent.parent
+    desde = hasta = None
+    registros = 0
+    if fechas is not None and len(fechas):
+        desde = str(fechas.min())[:19]
+        hasta = str(fechas.max())[:19]
+        registros = len(fechas)
+        huella = huella or hashDatos(fechas, valores)
+    with closing(abrirCatalogo(rutaGraficas)) as conexion, conexion:
+        conexion.execute(
+            """INSERT OR REPLACE INTO graficas
+               (ruta, serie, tipo, desde, hasta, registros, hashDatos, invertida, bytes, creada, estilo)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (rutaImagen.relative_to(rutaGraficas).as_posix(), serie, rutaImagen.parent.name, desde, hasta, registros,
+             huella, int(invertida), rutaImagen.stat().st_size, datetime.now().isoformat(timespec="seconds"), estilo))
+
+def buscarGrafica(rutaTipo, serie, huella, invertida, estilo):
+    #Ruta de la imagen más reciente en rutaTipo (Graficas/<Tipo>) de la serie con ese contenido,
+    #inversión del eje y estilo, o None si hay que dibujarla
+    rutaTipo = Path(rutaTipo)
+    rutaGraficas = rutaTipo.parent
+    if not (rutaGraficas / NOMBRE_CATALOGO).exists():
+        return None
+    with closing(abrirCatalogo(rutaGraficas)) as conexion:
+        filas = conexion.execute(
+            """SELECT ruta FROM graficas
+               WHERE serie = ? AND tipo = ? AND hashDatos = ? AND invertida = ? AND estilo = ?
+               ORDER BY creada DESC, ruta DESC""",
+            (serie, rutaTipo.name, huella, int(invertida), estilo)).fetchall()
+        for fila in filas:
+            if (rutaGraficas / fila["ruta"]).exists():
+                return rutaGraficas / fila["ruta"]
+        if filas:
+            with conexion:
+                conexion.executemany("DELETE FROM graficas WHERE ruta = ?", [(fila["ruta"],) for fila in filas])
+    return None
+
+# ======================
+# Consultas
+# ======================
+
+def tiposDisponibles(rutaGraficas):
+    #[(tipo, cantidad de gráficas)] del catálogo
+    with closing(abrirCatalogo(rutaGraficas)) as conexion:
+        return [tuple(fila) for fila in conexion.execute(
+            "SELECT tipo, COUNT(*) FROM graficas GROUP BY tipo ORDER BY tipo")]
+
+def listarGraficas(rutaGraficas, tipo=None, serie=None, pagina=1, porPagina=20):
+    #Una página de gráficas, las más recientes primero, filtradas por tipo y por texto
+    #en el nombre de la serie. Retorna (filas como diccionarios, total que cumple el filtro).
+    #Las filas cuya imagen ya no existe se quitan del catálogo al mostrarlas
+    condiciones, parametros = [], []
+    if tipo:
+        condiciones.append("tipo = ?")
+        parametros.append(tipo)
+    if serie:
+        condiciones.append("serie LIKE ?")
+        parametros.append(f"%{serie.replace(' ', '_')}%")
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+    rutaGraficas = Path(rutaGraficas)
+    with closing(abrirCatalogo(rutaGraficas)) as conexion:
+        total = conexion.execute(f"SELECT COUNT(*) FROM graficas {donde}", parametros).fetchone()[0]
+        filas = [dict(fila) for fila in conexion.execute(
+            f"SELECT * FROM graficas {donde} ORDER BY creada DESC, ruta DESC LIMIT ? OFFSET ?",
+            [*parametros, porPagina, (pagina - 1) * porPagina])]
+        faltantes = [fila["ruta"] for fila in filas if not (rutaGraficas / fila["ruta"]).exists()]
+        if faltantes:
+            with conexion:
+                conexion.executemany("DELETE FROM graficas WHERE ruta = ?", [(ruta,) for ruta in faltantes])
+            return listarGraficas(rutaGraficas, tipo, serie, pagina, porPagina)
+    for fila in filas:
+        fila["rutaCompleta"] = rutaGraficas / fila["ruta"]
+    return filas, total
+
+def podarGraficas(rutaGraficas, conservar=None, anterioresA=None, tipo=None):
+    #Elimina imágenes antiguas y sus filas. conservar deja las N más recientes de cada
+    #serie y tipo; anterioresA elimina las creadas antes de esa fecha. Con ambos, solo se
+    #eliminan las que cumplen las dos condiciones. Retorna cuántas se eliminaron
+    rutaGraficas = Path(rutaGraficas)
+    condiciones, parametros = [], []
+    if conservar is not None:
+        condiciones.append("""ruta IN (SELECT ruta FROM (
+            SELECT ruta, ROW_NUMBER() OVER (PARTITION BY serie, tipo ORDER BY creada DESC, ruta DESC) AS orden
+            FROM graficas) WHERE orden > ?)""")
+        parametros.append(conservar)
+    if anterioresA is not None:
+        condiciones.append("creada < ?")
+        parametros.append(anterioresA.isoformat())
+    if not condiciones:
+        return 0
+    if tipo:
+        condiciones.append("tipo = ?")
+        parametros.append(tipo)
+
+    with closing(abrirCatalogo(rutaGraficas)) as conexion:
+        rutas = [fila[0] for fila in conexion.execute(
+            f"SELECT ruta FROM graficas WHERE {' AND '.join(condiciones)}", parametros)]
+        for ruta in rutas:
+            (rutaGraficas / ruta).unlink(missing_ok=True)
+        with conexion:
+            conexion.executemany("DELETE FROM graficas WHERE ruta = ?", [(ruta,) for ruta in rutas])
+    return len(rutas)
@@ -0,0 +1,457 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Línea de Comandos
+
+Permite ejecutar las operaciones del sistema sin menús, para usarlas desde
+scripts o cron. Todas las órdenes imprimen su resultado en JSON por la salida
+estándar; los errores van a la salida de errores con código de salida 1.
+
+Ejemplos (desde la raíz del proyecto):
+    python "Calidad del agua/main.py" ica "Lago de Bonanza"
+    python "Calidad del agua/main.py" predict "Lago de Bonanza" Temperatura --unidad semanas --periodos 4
+    python "Calidad del agua/main.py" ingest "Lago de Bonanza" pH --dato 01/06/25 7.3
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+from config import config
+#========================
+#Fin de las importaciones (sys, json, argparse, pathlib)
+
+#Nombres de las unidades de tiempo en la línea de comandos -> opción de prediccion
+UNIDADES = {"dias": 1, "semanas": 2, "meses": 3, "anios": 4}
+
+#Nombres de los tipos de gráfica en la línea de comandos -> opción de option2
+TIPOS = {"barras": 1, "dispersion": 2, "lineal": 3}
+
+#Ventanas de las estadísticas móviles (estadisticasMoviles.VENTANAS)
+VENTANAS = ["7d", "30d", "365d"]
+
+
+class ErrorCLI(Exception):
+    #Error de uso que se informa al usuario sin traza
+    pass
+
+# ======================
+# Utilidades
+# ======================
+
+def imprimirJSON(datos):
+    print(json.dumps(datos, ensure_ascii=False, indent=2, default=str))
+
+def activarCuerpo(nombre):
+    #Valida el cuerpo de agua y lo deja activo en la configuración
+    if not (Path("CuerposDeAgua") / nombre).is_dir():
+        raise ErrorCLI(f"No existe el cuerpo de agua '{nombre}'")
+    config.activeWaterBody = nombre
+    return Path("CuerposDeAgua") / nombre / config.data_folder
+
+def rutaParametro(rutaDatos, parametro, debeExistir=True):
+    #Ruta de la serie de un parámetro; acepta el nombre del parámetro o del archivo
+    import almacenamiento
+    nombre = almacenamiento.obtenerNombreParametro(parametro) if parametro.startswith("DATOS_") else parametro
+    ruta = rutaDatos / almacenamiento.formatearNombreArchivo(nombre)
+    if debeExistir and not ruta.exists():
+        raise ErrorCLI(f"No hay datos de '{nombre}' en {rutaDatos}")
+    return ruta
+
+def tablaJSON(df):
+    #Convierte un DataFrame a una lista de registros serializable
+    return json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+# ======================
+# Órdenes
+# ======================
+
+def ordenCuerpos(args):
+    import lote
+    imprimirJSON([ruta.name for ruta in lote.listarCuerposAgua()])
+
+def ordenICA(args):
+    import ica
+    rutaDatos = activarCuerpo(args.cuerpo)
+    if args.historial:
+        tolerancia = f"{args.tolerancia_dias}D" if args.tolerancia_dias is not None else None
+        imprimirJSON(tablaJSON(ica.calcularHistorialICA(rutaDatos, tolerancia)))
+        return
+    valores = ica.ultimasLecturas(rutaDatos)
+    evaluacion = ica.evaluarUltimasLecturas(valores)
+    imprimirJSON({"cuerpo": args.cuerpo, **evaluacion})
+
+def ordenPareto(args):
+    import ica
+    rutaDatos = activarCuerpo(args.cuerpo)
+    if args.desde or args.hasta:
+        #Impacto medio del período, sobre la tabla ancha del cuerpo de agua
+        impactos = ica.impactosPeriodo(filtrarTabla(rutaDatos, args))
+    else:
+        impactos = ica.calcularImpactosNegativos(ica.ultimasLecturas(rutaDatos))
+    imprimirJSON({
+        "cuerpo": args.cuerpo,
+        "impactos": impactos,
+        "porcentajesAcumulados": dict(zip(impactos, ica.porcentajesAcumulados(impactos))),
+        "principales": ica.principalesPareto(impactos)
+    })
+
+def filtrarTabla(rutaDatos, args):
+    #Tabla ancha del cuerpo de agua entre --desde y --hasta, con --tolerancia-dias si se indica
+    import tablaAncha
+    from almacenamiento import convertirFecha
+    tolerancia = f"{args.tolerancia_dias}D" if args.tolerancia_dias is not None else None
+    desde = convertirFecha(args.desde) if args.desde else None
+    hasta = convertirFecha(args.hasta) if args.hasta else None
+    return tablaAncha.filtrarPeriodo(tablaAncha.obtenerTabla(rutaDatos, tolerancia), desde, hasta)
+
+def ordenCorrelacion(args):
+    import tablaAncha
+    rutaDatos = activarCuerpo(args.cuerpo)
+    tabla = filtrarTabla(rutaDatos, args)
+    matriz = tablaAncha.correlaciones(tabla, args.metodo)
+    imprimirJSON({
+        "cuerpo": args.cuerpo,
+        "filas": len(tabla),
+        "metodo": args.metodo,
+        #Las parejas con pocas lecturas en común son NaN, que no es JSON válido
+        "correlaciones": {parametro: {otro: None if valor != valor else valor for otro, valor in fila.items()}
+                          for parametro, fila in matriz.to_dict(orient="index").items()},
+        "destacadas": [{"parametros": [a, b], "correlacion": r}
+                       for a, b, r in tablaAncha.parejasDestacadas(matriz, args.umbral)]
+    })
+
+def ordenPredict(args):
+    import prediccion
+    import resumen
+    rutaDatos = activarCuerpo(args.cuerpo)
+    datos = resumen.obtenerResumen(rutaParametro(rutaDatos, args.parametro))
+    resultado = prediccion.prediccionesDesdeResumen(datos, UNIDADES[args.unidad], args.periodos, args.ponderada)
+    resultado["predicciones"] = tablaJSON(resultado["predicciones"])
+    imprimirJSON({"cuerpo": args.cuerpo, "parametro": args.parametro, **resultado})
+
+def ordenForecast(args):
+    import lote
+    import pronostico
+    if args.cuerpo:
+        cuerpos = [activarCuerpo(nombre).parent for nombre in args.cuerpo]
+    else:
+        cuerpos = lote.listarCuerposAgua()
+    tabla, cantidad, lectura, ajuste = pronostico.pronosticarCuerpos(cuerpos, UNIDADES[args.unidad],
+                                                                     args.periodos, args.modelos)
+    imprimirJSON({
+        "series": cantidad,
+        "tiempoLectura": lectura,
+        "tiempoAjuste": ajuste,
+        "pronosticos": tablaJSON(tabla)
+    })
+
+def ordenPlot(args):
+    #Las gráficas se generan sin ventana, con el backend Agg
+    import matplotlib
+    matplotlib.use("Agg")
+    import almacenamiento
+    import option2
+    rutaDatos = activarCuerpo(args.cuerpo)
+    rutaArchivo = rutaParametro(rutaDatos, args.parametro)
+    df = almacenamiento.leerSerie(rutaArchivo)
+    tipo = TIPOS[args.tipo]
+    ruta = option2.generarGrafica(df, rutaArchivo.stem, tipo, args.invertir,
+                                  option2.obtenerRutaGraficas(option2.TIPOS_GRAFICA[tipo]), mediaMovil=args.media)
+    imprimirJSON({"cuerpo": args.cuerpo, "parametro": args.parametro, "grafica": str(ruta)})
+
+def ordenStats(args):
+    import almacenamiento
+    import estadisticasMoviles
+    rutaDatos = activarCuerpo(args.cuerpo)
+    rutaArchivo = rutaParametro(rutaDatos, args.parametro)
+    df = almacenamiento.leerSerie(rutaArchivo)
+    if args.serie:
+        imprimirJSON(tablaJSON(estadisticasMoviles.calcularEstadisticas(df, args.ventanas)))
+    else:
+        ultimas = estadisticasMoviles.ultimasEstadisticas(df, args.ventanas)
+        #La desviación de una ventana con una sola lectura es NaN, que no es JSON válido
+        ultimas = {ventana: {clave: None if valor != valor else valor for clave, valor in datos.items()}
+                   for ventana, datos in ultimas.items()}
+        imprimirJSON({"cuerpo": args.cuerpo, "parametro": args.parametro, "estadisticas": ultimas})
+
+def ordenPlotLote(args):
+    import graficasLote
+    import lote
+    if args.cuerpo:
+        cuerpos = [activarCuerpo(nombre).parent for nombre in args.cuerpo]
+    else:
+        cuerpos = lote.listarCuerposAgua()
+    tareas = graficasLote.listarTareas(cuerpos, [TIPOS[tipo] for tipo in args.tipos])
+    rutas, errores, total = graficasLote.renderizarTodas(tareas, args.procesos)
+    imprimirJSON({
+        "graficas": rutas,
+        "errores": errores,
+        "tiempoTotal": total,
+        "graficasPorSegundo": len(rutas) / total if total else 0
+    })
+
+def ordenGraficas(args):
+    import catalogoGraficas
+    import option2
+    from almacenamiento import convertirFecha
+    activarCuerpo(args.cuerpo)
+    rutaGraficas = option2.obtenerRutaGraficas()
+    if args.accion == "listar":
+        graficas, total = catalogoGraficas.listarGraficas(rutaGraficas, args.tipo, args.parametro, args.pagina,
+                                                          args.por_pagina)
+        imprimirJSON({"total": total, "pagina": args.pagina, "graficas": graficas})
+    else:
+        if args.conservar is None and args.antes is None:
+            raise ErrorCLI("Indique --conservar N, --antes FECHA o ambos")
+        antes = convertirFecha(args.antes) if args.antes else None
+        eliminadas = catalogoGraficas.podarGraficas(rutaGraficas, args.conservar, antes, args.tipo)
+        imprimirJSON({"cuerpo": args.cuerpo, "eliminadas": eliminadas})
+
+def ordenIngest(args):
+    import pandas as pd
+    import almacenamiento
+    import ingesta
+    import anomalias
+    rutaDatos = activarCuerpo(args.cuerpo)
+    rutaArchivo = rutaParametro(rutaDatos, args.parametro, debeExistir=False)
+
+    if args.archivo:
+        origen = Path(args.archivo)
+        if origen.suffix == ".csv":
+            df = pd.read_csv(origen)
+        else:
+            df = almacenamiento.backendPorRuta(origen).leer(origen)
+    elif args.dato:
+        df = pd.DataFrame({"Fecha": [almacenamiento.convertirFecha(fecha) for fecha, _ in args.dato],
+                           "Valor": [valor for _, valor in args.dato]})
+    else:
+        raise ErrorCLI("Indique --archivo o al menos un --dato FECHA VALOR")
+
+    df = almacenamiento.normalizarSerie(df)
+    if rutaArchivo.exists():
+        agregados, marcadas, registros = ingesta.anexarDatos(rutaArchivo, df)
+    else:
+        marcadas, registros = ingesta.guardarSerie(rutaArchivo, df)
+        agregados = len(df)
+    marcadas["Motivos"] = marcadas["Motivos"].map(anomalias.describirMotivos)
+    imprimirJSON({"cuerpo": args.cuerpo, "archivo": rutaArchivo.name, "agregados": agregados,
+                  "anomalias": tablaJSON(marcadas), "alertas": registros})
+
+def ordenAnomalias(args):
+    import almacenamiento
+    import anomalias
+    rutaDatos = activarCuerpo(args.cuerpo)
+    archivos = [rutaParametro(rutaDatos, args.parametro).name] if args.parametro else None
+    estados = anomalias.obtenerEstados(rutaDatos, archivos)
+    resultado = {}
+    for archivo in archivos or almacenamiento.listarArchivos(rutaDatos):
+        marcadas = anomalias.leerMarcas(rutaDatos / archivo)
+        marcadas["Motivos"] = marcadas["Motivos"].map(anomalias.describirMotivos)
+        parametro = almacenamiento.obtenerNombreParametro(archivo)
+        resultado[parametro] = {"revisadas": estados[parametro]["n"], "marcadas": tablaJSON(marcadas)}
+    imprimirJSON(resultado)
+
+def ordenAlertas(args):
+    import alertas
+    from almacenamiento import convertirFecha
+    rutaDatos = activarCuerpo(args.cuerpo)
+    archivos = [rutaParametro(rutaDatos, args.parametro).name] if args.parametro else None
+    abiertas = alertas.alertasAbiertas(rutaDatos, archivos, pendientes=True)
+    if args.abiertas:
+        imprimirJSON(abiertas)
+        return
+    desde = convertirFecha(args.desde) if args.desde else None
+    imprimirJSON({"abiertas": abiertas, "eventos": alertas.leerAlertas(rutaDatos, args.parametro, desde)})
+
+def ordenReport(args):
+    import option3
+    activarCuerpo(args.cuerpo)
+    if args.accion == "listar":
+        imprimirJSON(option3.listarArchivosDisponibles() or [])
+    elif args.accion == "crear":
+        imprimirJSON({"reporte": str(option3.guardarReporte(args.titulo, args.texto))})
+    else:
+        ruta = option3.obtenerRuta(args.nombre)
+        if not ruta.exists():
+            raise ErrorCLI(f"No existe el reporte '{args.nombre}'")
+        with open(ruta, "r") as archivo:
+            imprimirJSON({"reporte": args.nombre, "contenido": archivo.read()})
+
+def ordenReportLote(args):
+    import lote
+    import reportesAutomaticos
+    if args.cuerpo:
+        cuerpos = [activarCuerpo(nombre).parent for nombre in args.cuerpo]
+    else:
+        cuerpos = lote.listarCuerposAgua()
+    rutas, errores, total = reportesAutomaticos.generarReportes(cuerpos, args.titulo, not args.sin_graficas, args.procesos)
+    imprimirJSON({"reportes": rutas, "errores": errores, "tiempoTotal": total})
+
+def ordenSearch(args):
+    import busqueda
+    from almacenamiento import convertirFecha
+    if args.cuerpo:
+        activarCuerpo(args.cuerpo)
+    desde = convertirFecha(args.desde) if args.desde else None
+    hasta = convertirFecha(args.hasta) if args.hasta else None
+    resultados = busqueda.buscarReportes(" ".join(args.palabras), args.cuerpo, desde, hasta, args.limite)
+    imprimirJSON(resultados)
+
+def ordenLote(args):
+    import lote
+    tabla, total = lote.evaluarTodos(procesos=args.procesos)
+    ruta = lote.guardarRanking(tabla) if not tabla.empty else None
+    imprimirJSON({"ranking": tablaJSON(tabla), "tiempoTotal": total, "archivo": ruta})
+
+# ======================
+# Analizador de Argumentos
+# ======================
+
+def crearParser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Sistema de análisis de calidad de agua")
+    parser.add_argument("--metricas", metavar="RUTA", help="Guarda en JSON los tiempos de las operaciones ejecutadas")
+    parser.add_argument("--perfilar", action="store_true", help="Perfila cada operación medida (requiere --metricas)")
+    ordenes = parser.add_subparsers(dest="orden", required=True)
+
+    orden = ordenes.add_parser("cuerpos", help="Lista los cuerpos de agua")
+    orden.set_defaults(funcion=ordenCuerpos)
+
+    orden = ordenes.add_parser("ica", help="ICA de la última lectura (o historial completo)")
+    orden.add_argument("cuerpo")
+    orden.add_argument("--historial", action="store_true", help="ICA de cada fecha de muestreo")
+    orden.add_argument("--tolerancia-dias", type=int, help="Tolerancia de alineación del historial")
+    orden.set_defaults(funcion=ordenICA)
+
+    orden = ordenes.add_parser("pareto", help="Impactos negativos por parámetro (80/20)")
+    orden.add_argument("cuerpo")
+    orden.add_argument("--desde", help="Impacto medio desde esta fecha dd/mm/aa (por defecto, la última lectura)")
+    orden.add_argument("--hasta", help="Impacto medio hasta esta fecha dd/mm/aa (inclusive)")
+    orden.add_argument("--tolerancia-dias", type=int, help="Tolerancia de alineación de la tabla ancha")
+    orden.set_defaults(funcion=ordenPareto)
+
+    orden = ordenes.add_parser("correlacion", help="Correlación entre parámetros en las mismas fechas")
+    orden.add_argument("cuerpo")
+    orden.add_argument("--metodo", choices=("pearson", "spearman"), default="pearson")
+    orden.add_argument("--desde", help="Fecha dd/mm/aa mínima")
+    orden.add_argument("--hasta", help="Fecha dd/mm/aa máxima (inclusive)")
+    orden.add_argument("--tolerancia-dias", type=int, help="Tolerancia de alineación de la tabla ancha")
+    orden.add_argument("--umbral", type=float, default=0.7, help="|correlación| mínima de las parejas destacadas")
+    orden.set_defaults(funcion=ordenCorrelacion)
+
+    orden = ordenes.add_parser("predict", help="Predicción por regresión lineal")
+    orden.add_argument("cuerpo")
+    orden.add_argument("parametro")
+    orden.add_argument("--unidad", choices=UNIDADES, default="dias")
+    orden.add_argument("--periodos", type=int, default=7)
+    orden.add_argument("--ponderada", action="store_true", help="Da más peso a los datos recientes")
+    orden.set_defaults(funcion=ordenPredict)
+
+    orden = ordenes.add_parser("forecast", help="Pronóstico por lotes de todas las series con varios modelos")
+    orden.add_argument("cuerpo", nargs="*", help="Cuerpos de agua a pronosticar (por defecto, todos)")
+    orden.add_argument("--unidad", choices=UNIDADES, default="meses")
+    orden.add_argument("--periodos", type=int, default=6)
+    orden.add_argument("--modelos", nargs="+", choices=["lineal", "armonico", "estacional"],
+                       default=["lineal", "armonico", "estacional"])
+    orden.set_defaults(funcion=ordenForecast)
+
+    orden = ordenes.add_parser("plot", help="Genera una gráfica de un parámetro")
+    orden.add_argument("cuerpo")
+    orden.add_argument("parametro")
+    orden.add_argument("--tipo", choices=TIPOS, default="lineal")
+    orden.add_argument("--invertir", action="store_true", help="Muestra las fechas más recientes primero")
+    orden.add_argument("--media", choices=VENTANAS, help="Superpone la media móvil de esta ventana")
+    orden.set_defaults(funcion=ordenPlot)
+
+    orden = ordenes.add_parser("stats", help="Estadísticas móviles (7, 30 y 365 días) de un parámetro")
+    orden.add_argument("cuerpo")
+    orden.add_argument("parametro")
+    orden.add_argument("--ventanas", nargs="+", choices=VENTANAS, default=list(VENTANAS))
+    orden.add_argument("--serie", action="store_true", help="Todas las lecturas en lugar de solo la última")
+    orden.set_defaults(funcion=ordenStats)
+
+    orden = ordenes.add_parser("plot-lote", help="Genera sin ventanas las gráficas de todos los parámetros")
+    orden.add_argument("cuerpo", nargs="*", help="Cuerpos de agua a graficar (por defecto, todos)")
+    orden.add_argument("--tipos", nargs="+", choices=TIPOS, default=list(TIPOS))
+    orden.add_argument("--procesos", type=int, default=None)
+    orden.set_defaults(funcion=ordenPlotLote)
+
+    orden = ordenes.add_parser("graficas", help="Lista las gráficas guardadas o elimina las antiguas")
+    orden.add_argument("cuerpo")
+    acciones = orden.add_subparsers(dest="accion", required=True)
+    accion = acciones.add_parser("listar")
+    accion.add_argument("--tipo", help="Carpeta de la gráfica (Barras, Dispersion, Lineal, ICA)")
+    accion.add_argument("--parametro", help="Texto en el nombre del parámetro")
+    accion.add_argument("--pagina", type=int, default=1)
+    accion.add_argument("--por-pagina", type=int, default=20)
+    accion = acciones.add_parser("podar")
+    accion.add_argument("--conservar", type=int, help="Gráficas más recientes a conservar por parámetro y tipo")
+    accion.add_argument("--antes", help="Elimina solo las creadas antes de esta fecha dd/mm/aa")
+    accion.add_argument("--tipo", help="Solo esta carpeta de gráficas")
+    orden.set_defaults(funcion=ordenGraficas)
+
+    orden = ordenes.add_parser("ingest", help="Agrega lecturas a un parámetro (lo crea si no existe)")
+    orden.add_argument("cuerpo")
+    orden.add_argument("parametro")
+    orden.add_argument("--archivo", help="CSV o Excel con columnas Fecha y Valor")
+    orden.add_argument("--dato", nargs=2, action="append", metavar=("FECHA", "VALOR"), help="Fecha dd/mm/aa (o \"dd/mm/aa hh:mm\") y valor")
+    orden.set_defaults(funcion=ordenIngest)
+
+    orden = ordenes.add_parser("anomalias", help="Lecturas marcadas como anómalas al ingresarlas")
+    orden.add_argument("cuerpo")
+    orden.add_argument("parametro", nargs="?", help="Solo este parámetro (por defecto, todos)")
+    orden.set_defaults(funcion=ordenAnomalias)
+
+    orden = ordenes.add_parser("alertas", help="Alertas por salida del rango normal registradas al ingresar lecturas")
+    orden.add_argument("cuerpo")
+    orden.add_argument("parametro", nargs="?", help="Solo este parámetro (por defecto, todos)")
+    orden.add_argument("--desde", help="Solo eventos desde esta fecha dd/mm/aa")
+    orden.add_argument("--abiertas", action="store_true", help="Solo las excursiones en curso")
+    orden.set_defaults(funcion=ordenAlertas)
+
+    orden = ordenes.add_parser("report", help="Lista, crea o muestra reportes")
+    orden.add_argument("cuerpo")
+    acciones = orden.add_subparsers(dest="accion", required=True)
+    acciones.add_parser("listar")
+    accion = acciones.add_parser("crear")
+    accion.add_argument("--titulo", required=True)
+    accion.add_argument("--texto", required=True)
+    accion = acciones.add_parser("mostrar")
+    accion.add_argument("nombre")
+    orden.set_defaults(funcion=ordenReport)
+
+    orden = ordenes.add_parser("report-lote", help="Genera reportes a partir de los datos, en paralelo")
+    orden.add_argument("cuerpo", nargs="*", help="Cuerpos de agua (por defecto, todos)")
+    orden.add_argument("--titulo", help="Título de los reportes (por defecto, 'Informe automático <mes>')")
+    orden.add_argument("--sin-graficas", action="store_true", help="No adjunta gráficas")
+    orden.add_argument("--procesos", type=int, default=None)
+    orden.set_defaults(funcion=ordenReportLote)
+
+    orden = ordenes.add_parser("search", help="Busca reportes por palabras y fechas")
+    orden.add_argument("palabras", nargs="*", help="Palabras a buscar (sin acentos ni mayúsculas)")
+    orden.add_argument("--cuerpo", help="Busca solo en este cuerpo de agua (por defecto, en todos)")
+    orden.add_argument("--desde", help="Fecha dd/mm/aa mínima del reporte")
+    orden.add_argument("--hasta", help="Fecha dd/mm/aa máxima del reporte (inclusive)")
+    orden.add_argument("--limite", type=int, default=20)
+    orden.set_defaults(funcion=ordenSearch)
+
+    orden = ordenes.add_parser("lote", help="ICA y Pareto de todos los cuerpos de agua en paralelo")
+    orden.add_argument("--procesos", type=int, default=None)
+    orden.set_defaults(funcion=ordenLote)
+
+    return parser
+
+def main(argumentos=None):
+    args = crearParser().parse_args(argumentos)
+    config.profile_operations = args.perfilar
+    try:
+        args.funcion(args)
+    except (ErrorCLI, ValueError, FileNotFoundError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.metricas:
+            from metricas import metricas
+            metricas.volcarJSON(args.metricas)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
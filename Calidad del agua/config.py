@@ -3,11 +3,45 @@
 #   activeWaterBody
 #   data_folder(Nombre de la carpeta de datos)
 #   report_Folder(Nombre de la carpeta de reportes)
+#   storage_backend(Formato en el que se guardan las series: "parquet" o "xlsx")
+#   log_max_bytes(Tamaño del registro de anexos a partir del cual se compacta la serie)
+#   cache_max_bytes(Memoria máxima que puede ocupar la caché de series)
+#   ica_tolerance_days(Antigüedad máxima de una lectura para usarla en el historial del ICA)
+#   chart_points_per_pixel(Puntos por píxel de ancho que se dibujan en las gráficas de línea y dispersión)
+#   forecast_half_life_days(Días en los que el peso de una lectura se reduce a la mitad en la predicción ponderada)
+#   profile_operations(Perfila cada operación instrumentada además de medir su tiempo)
+#   profiler(Perfilador a usar: "cProfile" o "pyinstrument" si está instalado)
+#   track_memory(Registra con tracemalloc el pico de memoria de cada operación instrumentada)
+#   large_series_rows(Registros a partir de los cuales una serie se lee en formato compacto)
+#   read_chunk_rows(Registros por bloque al leer una serie por partes)
+#   memory_limit_bytes(Memoria máxima que puede ocupar una serie leída en formato compacto)
+#   anomaly_ewma_span(Lecturas que abarcan la media y la varianza exponenciales de la detección de anomalías)
+#   anomaly_z_threshold(Desviaciones exponenciales a partir de las cuales una lectura es anómala)
+#   anomaly_mad_threshold(Veces la MAD de las lecturas anteriores a partir de las cuales una lectura es anómala)
+#   alert_hysteresis(Fracción del ancho del rango normal que un valor debe volver a entrar para cerrar una alerta)
+#   alert_min_duration_hours(Horas que debe durar una salida del rango normal para abrir una alerta)
 class Config:
     def __init__(self):
         self.activeWaterBody = None
         self.data_folder = "Datos"
         self.report_folder = "Reportes"
+        self.storage_backend = "parquet"
+        self.log_max_bytes = 256 * 1024
+        self.cache_max_bytes = 256 * 1024 * 1024
+        self.ica_tolerance_days = 7
+        self.chart_points_per_pixel = 1
+        self.forecast_half_life_days = 90
+        self.profile_operations = False
+        self.profiler = "cProfile"
+        self.track_memory = False
+        self.large_series_rows = 1_000_000
+        self.read_chunk_rows = 500_000
+        self.memory_limit_bytes = 200 * 1024 * 1024
+        self.anomaly_ewma_span = 60
+        self.anomaly_z_threshold = 5.0
+        self.anomaly_mad_threshold = 6.0
+        self.alert_hysteresis = 0.05
+        self.alert_min_duration_hours = 1
 
 #Instanciamos el objeto config de la clase Config
 config = Config()
\ No newline at end of file
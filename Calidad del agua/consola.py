@@ -0,0 +1,32 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Utilidades de Consola
+
+Limpia y pausa la consola sin lanzar un proceso por cada pantalla
+(antes se usaba os.system('cls') y os.system('pause'), que además solo
+funcionan en Windows).
+"""
+import os
+import sys
+#========================
+#Fin de las importaciones (os, sys)
+
+#Secuencia ANSI: borrar pantalla y mover el cursor al inicio
+_LIMPIAR = "\033[2J\033[H"
+
+if os.name == "nt":
+    #En la consola de Windows las secuencias ANSI se activan una sola vez al inicio
+    os.system("")
+
+
+def limpiarConsola():
+    #Limpia la pantalla de la consola (solo si la salida es una terminal)
+    if sys.stdout.isatty():
+        print(_LIMPIAR, end="", flush=True)
+
+def pausarConsola():
+    #Pausa la ejecución hasta que el usuario presione Enter
+    try:
+        input("Presione Enter para continuar...")
+    except EOFError:
+        pass
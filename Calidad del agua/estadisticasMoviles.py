@@ -0,0 +1,155 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Estadísticas Móviles
+
+Media, desviación estándar, mínimo, máximo, mediana y media exponencial (EWMA)
+de una serie sobre ventanas de tiempo (7, 30 y 365 días por defecto). La
+ventana de cada lectura son las lecturas de los días anteriores hasta ella
+inclusive, como en pandas rolling("7D"), así que los muestreos irregulares no
+se cuentan como si fueran diarios.
+
+Todo se calcula en una pasada:
+    - media y desviación con sumas acumuladas (NumPy) y el inicio de cada
+      ventana por búsqueda binaria sobre las fechas,
+    - mínimo y máximo con las colas monótonas de pandas rolling,
+    - mediana con la lista ordenada de pandas rolling (O(n log w), la más
+      costosa en series de millones de lecturas),
+    - EWMA por tiempo, con vida media igual a la ventana.
+
+Lo usan la evaluación de parámetros (tendencia), las gráficas (media móvil
+superpuesta) y los reportes automáticos.
+"""
+import numpy as np
+import pandas as pd
+from metricas import instrumentar
+#========================
+#Fin de las importaciones (numpy, pandas)
+
+#Ventanas por defecto: nombre -> días
+VENTANAS = {"7d": 7, "30d": 30, "365d": 365}
+
+#Estadísticas que se calculan, en el orden de las columnas
+ESTADISTICAS = ("media", "desviacion", "minimo", "maximo", "mediana", "ewma")
+
+#Diferencia entre la media de 7 y la de 30 días, en desviaciones de 30 días, a partir
+#de la cual se informa que el parámetro sube o baja
+UMBRAL_TENDENCIA = 0.25
+
+
+def _diasVentana(ventana):
+    #Días de una ventana dada por nombre de VENTANAS o como número
+    return VENTANAS[ventana] if ventana in VENTANAS else float(ventana)
+
+def iniciosVentana(fechas, dias):
+    #Índice de la primera lectura de la ventana de cada lectura: la primera posterior a fecha - dias.
+    #fechas debe estar ordenado
+    fechas = np.asarray(fechas)
+    return np.searchsorted(fechas, fechas - np.timedelta64(int(dias * 86_400), "s"), side="right")
+
+def _sumasAcumuladas(valores):
+    #Sumas acumuladas de los valores y de sus cuadrados, con un cero al inicio.
+    #Los valores se centran en su media para que la varianza no pierda precisión
+    centrados = valores - valores.mean()
+    sumas = np.concatenate(([0.0], np.cumsum(centrados)))
+    cuadrados = np.concatenate(([0.0], np.cumsum(centrados * centrados)))
+    return sumas, cuadrados
+
+def mediaDesviacion(fechas, valores, dias, sumas=None):
+    #Media y desviación estándar (muestral) móviles en O(n) a partir de sumas acumuladas.
+    #sumas permite reutilizar _sumasAcumuladas() entre ventanas
+    valores = np.asarray(valores, dtype="float64")
+    sumas, cuadrados = sumas or _sumasAcumuladas(valores)
+    #La ventana de la lectura i va de inicio[i] a i inclusive: sumas[i + 1] - sumas[inicio[i]]
+    inicio = iniciosVentana(fechas, dias)
+    cantidad = np.arange(1, len(valores) + 1) - inicio
+    suma = sumas[1:] - sumas[inicio]
+    media = suma / cantidad
+    #Con una sola lectura en la ventana la desviación no está definida
+    with np.errstate(invalid="ignore", divide="ignore"):
+        varianza = (cuadrados[1:] - cuadrados[inicio] - suma * media) / (cantidad - 1)
+    varianza[cantidad < 2] = np.nan
+    desviacion = np.sqrt(np.clip(varianza, 0, None))
+    return media + valores.mean(), desviacion
+
+@instrumentar("estadisticasMoviles", filas=len)
+def calcularEstadisticas(df, ventanas=tuple(VENTANAS), estadisticas=ESTADISTICAS):
+    #DataFrame con Fecha, Valor y una columna "<estadistica>_<ventana>" por cada estadística y
+    #ventana (p. ej. media_30d). df tiene las columnas Fecha y Valor; se ordena por fecha
+    if not df["Fecha"].is_monotonic_increasing:
+        df = df.sort_values("Fecha", kind="stable")
+    fechas = df["Fecha"].to_numpy()
+    valores = df["Valor"].to_numpy(dtype="float64")
+    resultado = {"Fecha": fechas, "Valor": valores}
+    if not len(valores):
+        columnas = [f"{estadistica}_{ventana}" for ventana in ventanas for estadistica in estadisticas]
+        return pd.DataFrame(resultado).reindex(columns=["Fecha", "Valor", *columnas])
+
+    sumas = _sumasAcumuladas(valores) if {"media", "desviacion"} & set(estadisticas) else None
+    serie = pd.Series(valores, index=pd.DatetimeIndex(fechas))
+    for ventana in ventanas:
+        dias = _diasVentana(ventana)
+        if sumas is not None:
+            media, desviacion = mediaDesviacion(fechas, valores, dias, sumas)
+            calculadas = {"media": media, "desviacion": desviacion}
+        else:
+            calculadas = {}
+        movil = serie.rolling(pd.Timedelta(days=dias))
+        for estadistica in estadisticas:
+            if estadistica == "minimo":
+                calculadas[estadistica] = movil.min().to_numpy()
+            elif estadistica == "maximo":
+                calculadas[estadistica] = movil.max().to_numpy()
+            elif estadistica == "mediana":
+                calculadas[estadistica] = movil.median().to_numpy()
+            elif estadistica == "ewma":
+                calculadas[estadistica] = serie.ewm(halflife=pd.Timedelta(days=dias), times=serie.index).mean().to_numpy()
+            resultado[f"{estadistica}_{ventana}"] = calculadas[estadistica]
+    return pd.DataFrame(resultado)
+
+def ultimasEstadisticas(df, ventanas=tuple(VENTANAS)):
+    #Estadísticas de la última lectura: {ventana: {estadistica: valor, "lecturas": n}}.
+    #Solo se calculan sobre las lecturas que entran en la ventana más larga (salvo la EWMA,
+    #que usa toda la serie), así que sirve para series muy largas
+    if df.empty:
+        return {}
+    if not df["Fecha"].is_monotonic_increasing:
+        df = df.sort_values("Fecha", kind="stable")
+    ultima = df["Fecha"].iloc[-1]
+    maximo = max(_diasVentana(ventana) for ventana in ventanas)
+    recientes = df[df["Fecha"] > ultima - pd.Timedelta(days=maximo)]
+    tabla = calcularEstadisticas(recientes, ventanas, ESTADISTICAS[:-1])
+
+    serie = pd.Series(df["Valor"].to_numpy(dtype="float64"), index=pd.DatetimeIndex(df["Fecha"]))
+    fechas = tabla["Fecha"].to_numpy()
+    resultado = {}
+    for ventana in ventanas:
+        dias = _diasVentana(ventana)
+        datos = {estadistica: float(tabla[f"{estadistica}_{ventana}"].iloc[-1]) for estadistica in ESTADISTICAS[:-1]}
+        datos["ewma"] = float(serie.ewm(halflife=pd.Timedelta(days=dias), times=serie.index).mean().iloc[-1])
+        datos["lecturas"] = int(len(fechas) - iniciosVentana(fechas, dias)[-1])
+        resultado[ventana] = datos
+    return resultado
+
+def tendencia(ultimas, corta="7d", larga="30d"):
+    #"↑ Aumentando", "↓ Disminuyendo" o "→ Estable" según cuánto se aparta la media de la
+    #ventana corta de la de la larga, en desviaciones de la larga. None si falta alguna ventana
+    if corta not in ultimas or larga not in ultimas:
+        return None
+    diferencia = ultimas[corta]["media"] - ultimas[larga]["media"]
+    desviacion = ultimas[larga]["desviacion"]
+    umbral = UMBRAL_TENDENCIA * desviacion if desviacion > 0 else 0
+    if diferencia > umbral:
+        return "↑ Aumentando"
+    if diferencia < -umbral:
+        return "↓ Disminuyendo"
+    return "→ Estable"
+
+def formatearEstadisticas(ultimas, unidades=""):
+    #Líneas de texto con las estadísticas de ultimasEstadisticas(), una por ventana
+    lineas = []
+    for ventana, datos in ultimas.items():
+        desviacion = f" ± {datos['desviacion']:.2f}" if not np.isnan(datos["desviacion"]) else ""
+        lineas.append(f"{ventana:>5} ({datos['lecturas']} lecturas): media {datos['media']:.2f}{desviacion} {unidades}, "
+                      f"mín {datos['minimo']:.2f}, máx {datos['maximo']:.2f}, mediana {datos['mediana']:.2f}, "
+                      f"EWMA {datos['ewma']:.2f}")
+    return lineas
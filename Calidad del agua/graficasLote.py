@@ -0,0 +1,108 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Generación de Gráficas por Lotes
+
+Genera sin ventanas (backend Agg) las gráficas de barras, dispersión y línea de
+todos los parámetros de un cuerpo de agua, o de todos los cuerpos de agua, en
+un pool de procesos. Cada gráfica se guarda en Graficas/<Tipo>/ igual que las
+creadas desde el menú y su figura se cierra en cuanto se guarda.
+
+Uso (desde la raíz del proyecto):
+    python "Calidad del agua/graficasLote.py" [--cuerpo NOMBRE] [--tipos barras lineal] [--procesos N]
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from config import config
+import almacenamiento
+#========================
+#Fin de las importaciones (os, sys, time, argparse, pathlib, concurrent.futures)
+
+#Nombres de los tipos en la línea de comandos -> opción de option2.TIPOS_GRAFICA
+TIPOS = {"barras": 1, "dispersion": 2, "lineal": 3}
+
+
+def inicializarProceso():
+    #Cada proceso del pool dibuja sin ventana; el backend se fija antes de importar pyplot
+    import matplotlib
+    matplotlib.use("Agg")
+
+def listarTareas(cuerpos, tipos=(1, 2, 3)):
+    #Una tarea (ruta de la serie, tipo, carpeta de destino) por parámetro y tipo de gráfica.
+    #Las gráficas de un parámetro van juntas para que el proceso lea la serie una sola vez
+    import option2
+    tareas = []
+    for rutaCuerpo in cuerpos:
+        rutaDatos = Path(rutaCuerpo) / config.data_folder
+        for archivo in almacenamiento.listarArchivos(rutaDatos):
+            for tipo in tipos:
+                rutaGraficas = Path(rutaCuerpo) / "Graficas" / option2.TIPOS_GRAFICA[tipo]
+                tareas.append((str(rutaDatos / archivo), tipo, str(rutaGraficas)))
+    return tareas
+
+def renderizarTarea(tarea):
+    #Dibuja una gráfica. Se ejecuta en un proceso del pool, por lo que recibe y
+    #retorna solo datos simples: (ruta de la imagen o None, error o None)
+    import option2
+    rutaArchivo, tipo, rutaGraficas = tarea
+    try:
+        df = almacenamiento.leerSerie(rutaArchivo)
+        ruta = option2.generarGrafica(df, Path(rutaArchivo).stem, tipo, False, rutaGraficas)
+        return str(ruta), None
+    except Exception as e:
+        return None, f"{Path(rutaArchivo).name} ({option2.TIPOS_GRAFICA[tipo]}): {e}"
+
+def renderizarTodas(tareas, procesos=None):
+    #Genera las gráficas en paralelo. Retorna (rutas generadas, errores, tiempo total)
+    inicio = time.perf_counter()
+    if not tareas:
+        return [], [], 0.0
+
+    procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+    if procesos == 1:
+        #En el propio proceso (p. ej. desde el menú) no se toca el backend: generarGrafica
+        #dibuja sin pyplot y la sesión interactiva sigue pudiendo mostrar ventanas
+        resultados = [renderizarTarea(tarea) for tarea in tareas]
+    else:
+        bloque = max(1, len(tareas) // (procesos * 4))
+        with ProcessPoolExecutor(max_workers=procesos, initializer=inicializarProceso) as pool:
+            resultados = list(pool.map(renderizarTarea, tareas, chunksize=bloque))
+    total = time.perf_counter() - inicio
+
+    rutas = [ruta for ruta, _ in resultados if ruta]
+    errores = [error for _, error in resultados if error]
+    return rutas, errores, total
+
+def ejecutarGraficasLote(cuerpos, tipos=(1, 2, 3), procesos=None):
+    #Genera, informa y retorna las rutas de las gráficas de los cuerpos indicados
+    rutas, errores, total = renderizarTodas(listarTareas(cuerpos, tipos), procesos)
+    for error in errores:
+        print(f"Error: {error}")
+    if not rutas and not errores:
+        print("No hay datos para graficar.")
+        return rutas
+    velocidad = len(rutas) / total if total else 0
+    print(f"\nGráficas generadas: {len(rutas)} en {total:.2f} s ({velocidad:.1f} gráficas/s)")
+    return rutas
+
+def main(argumentos=None):
+    import lote
+    parser = argparse.ArgumentParser(description="Genera las gráficas de todos los parámetros sin ventanas")
+    parser.add_argument("--ruta", default="CuerposDeAgua", help="Carpeta con los cuerpos de agua")
+    parser.add_argument("--cuerpo", action="append", help="Cuerpo de agua a graficar (por defecto, todos)")
+    parser.add_argument("--tipos", nargs="+", choices=TIPOS, default=list(TIPOS))
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos a usar (por defecto, uno por núcleo)")
+    args = parser.parse_args(argumentos)
+
+    if args.cuerpo:
+        cuerpos = [Path(args.ruta) / nombre for nombre in args.cuerpo]
+    else:
+        cuerpos = lote.listarCuerposAgua(Path(args.ruta))
+    ejecutarGraficasLote(cuerpos, [TIPOS[tipo] for tipo in args.tipos], args.procesos)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Motor Vectorizado del ICA
+
+Calcula el Índice de Calidad del Agua para cada fecha de muestreo. El historial
+y el Pareto de un período se puntúan de una vez con NumPy sobre la tabla ancha
+del cuerpo de agua (módulo tablaAncha: series alineadas por fecha con una
+tolerancia configurable en una matriz filas x parámetros). La evaluación de la
+última lectura, el diagrama de Pareto y el historial usan el mismo registro de
+parámetros (compilado de PARAMETROS_CALIDAD) y el mismo núcleo de puntuación. Las lecturas marcadas como anómalas al
+ingresarlas (módulo anomalias) no entran en ninguno de los tres.
+"""
+import numpy as np
+import pandas as pd
+import anomalias
+import tablaAncha
+from parametros import PARAMETROS_CALIDAD, claveParametro
+from metricas import medir
+#========================
+#Fin de las importaciones (numpy, pandas)
+
+# ======================
+# Registro de Parámetros
+# ======================
+
+#Límites inferiores de cada nivel de calidad (el primero no tiene límite)
+UMBRALES_NIVEL = np.array([26, 51, 71, 91])
+NIVELES = np.array(["Muy mala", "Mala", "Aceptable", "Buena", "Excelente"])
+
+
+class RegistroParametros:
+    #PARAMETROS_CALIDAD compilado en arreglos alineados: la posición i de pesos,
+    #minimos y maximos corresponde al parámetro nombres[i]
+
+    def __init__(self, parametros):
+        self.nombres = list(parametros)
+        self.pesos = np.array([datos["ponderacion"] for datos in parametros.values()], dtype="float64")
+        self.minimos = np.array([datos["rango_normal"][0] for datos in parametros.values()], dtype="float64")
+        self.maximos = np.array([datos["rango_normal"][1] for datos in parametros.values()], dtype="float64")
+        self.centros = (self.minimos + self.maximos) / 2
+        self.semianchos = (self.maximos - self.minimos) / 2
+        self._indices = {claveParametro(nombre): i for i, nombre in enumerate(self.nombres)}
+
+    def indice(self, parametro):
+        #Posición del parámetro en el registro, o -1 si no se reconoce
+        return self._indices.get(claveParametro(parametro), -1)
+
+    def columnas(self, parametros):
+        #Posiciones en el registro de una lista de parámetros (-1 los no reconocidos)
+        return np.array([self.indice(parametro) for parametro in parametros], dtype=np.int64)
+
+    def rango(self, parametro):
+        #Rango normal de un parámetro, o None si no se reconoce
+        i = self.indice(parametro)
+        return None if i < 0 else PARAMETROS_CALIDAD[self.nombres[i]]["rango_normal"]
+
+#Registro único que usan el ICA y el diagrama de Pareto
+REGISTRO = RegistroParametros(PARAMETROS_CALIDAD)
+
+# ======================
+# Puntuación
+# ======================
+
+def clasificarICA(ica):
+    #Retorna el nivel de calidad de un ICA (escalar) o, para un arreglo de ICAs,
+    #una serie categórica (evita crear un objeto str por fila)
+    codigos = np.searchsorted(UMBRALES_NIVEL, ica, side="right")
+    if np.ndim(codigos) == 0:
+        return str(NIVELES[codigos])
+    return pd.Categorical.from_codes(codigos, categories=NIVELES, ordered=True)
+
+def puntuarMatriz(valores, columnas, registro=REGISTRO):
+    #Núcleo único de puntuación. valores es una matriz filas x parámetros y columnas la
+    #posición en el registro de cada parámetro (-1 si no se reconoce).
+    #Retorna (subíndices, ICA por fila, impactos negativos):
+    #  - subíndice (0-100): 100 dentro del rango; fuera, se descuentan 10 puntos por unidad
+    #    de exceso sobre el extremo más cercano. NaN si no hay dato o no se reconoce
+    #  - ICA: suma de los subíndices por su ponderación (los NaN no suman)
+    #  - impacto negativo: 100 - subíndice
+    #Se opera en el lugar sobre un solo arreglo para no crear temporales del tamaño de la matriz
+    valores = np.asarray(valores, dtype="float64")
+    columnas = np.asarray(columnas)
+    with medir("puntuar", filas=len(valores)):
+        return _puntuar(valores, columnas, registro)
+
+def _puntuar(valores, columnas, registro):
+    conocidas = columnas >= 0
+    posiciones = np.where(conocidas, columnas, 0)
+    centros = np.where(conocidas, registro.centros[posiciones], np.nan)
+    semianchos = np.where(conocidas, registro.semianchos[posiciones], np.nan)
+    pesos = np.where(conocidas, registro.pesos[posiciones], 0.0)
+
+    with np.errstate(invalid="ignore"):
+        subindices = np.abs(valores - centros)
+        subindices -= semianchos
+        np.maximum(subindices, 0.0, out=subindices)
+        subindices *= -10
+        subindices += 100
+        np.maximum(subindices, 0.0, out=subindices)
+    ica = np.nan_to_num(subindices, nan=0.0) @ pesos
+    return subindices, ica, 100 - subindices
+
+# ======================
+# Evaluación de las Últimas Lecturas
+# ======================
+
+def evaluarUltimasLecturas(valores):
+    #ICA a partir de la última lectura de cada parámetro {parametro: valor}.
+    #Retorna el ICA, su nivel y el detalle por parámetro (rango None si no se reconoce)
+    parametros = list(valores)
+    subindices, ica, _ = puntuarMatriz([list(valores.values())], REGISTRO.columnas(parametros))
+    icaTotal = float(ica[0])
+    detalle = []
+    for parametro, subindice in zip(parametros, subindices[0]):
+        rango = REGISTRO.rango(parametro)
+        detalle.append({"parametro": parametro, "rango": rango, "valor": valores[parametro],
+                        "dentro": None if rango is None else bool(subindice == 100)})
+    return {"ica": icaTotal, "nivel": clasificarICA(icaTotal), "detalle": detalle}
+
+def calcularImpactosNegativos(valores):
+    #Impacto negativo (100 - subíndice) de cada parámetro reconocido, ordenado de mayor a menor
+    parametros = list(valores)
+    columnas = REGISTRO.columnas(parametros)
+    _, _, impactos = puntuarMatriz([list(valores.values())], columnas)
+    resultado = {parametro: float(impacto) for parametro, impacto, columna
+                 in zip(parametros, impactos[0], columnas) if columna >= 0}
+    return dict(sorted(resultado.items(), key=lambda x: x[1], reverse=True))
+
+def porcentajesAcumulados(impactos):
+    #Porcentaje acumulado del impacto total, en el orden de los impactos
+    total = sum(impactos.values())
+    acumulado = 0
+    porcentajes = []
+    for impacto in impactos.values():
+        acumulado += impacto
+        porcentajes.append((acumulado / total) * 100 if total != 0 else 0)
+    return porcentajes
+
+def impactosPeriodo(tabla):
+    #Impacto negativo medio de cada parámetro reconocido sobre las filas de la tabla ancha en
+    #que tiene dato (Pareto de un período), ordenado de mayor a menor
+    _, matriz, parametros = tablaAncha.matrizTabla(tabla)
+    columnas = REGISTRO.columnas(parametros)
+    _, _, impactos = puntuarMatriz(matriz, columnas)
+    conDato = (~np.isnan(impactos)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        medias = np.nansum(impactos, axis=0) / conDato
+    resultado = {parametro: float(media) for parametro, media, columna, cantidad
+                 in zip(parametros, medias, columnas, conDato) if columna >= 0 and cantidad}
+    return dict(sorted(resultado.items(), key=lambda x: x[1], reverse=True))
+
+def principalesPareto(impactos, umbral=80):
+    #Parámetros que en conjunto acumulan el umbral (80%) del impacto negativo
+    etiquetas = list(impactos)
+    for i, porcentaje in enumerate(porcentajesAcumulados(impactos)):
+        if porcentaje >= umbral:
+            return etiquetas[:i+1]
+    return []
+
+# ======================
+# Últimas Lecturas
+# ======================
+
+def ultimasLecturas(rutaDatos, archivos=None):
+    #Última lectura válida (no anómala) de cada parámetro: {parametro: valor}
+    return {parametro: lectura["valor"] for parametro, lectura in anomalias.ultimasValidas(rutaDatos, archivos).items()}
+
+# ======================
+# Historial del ICA
+# ======================
+
+def calcularICA(fechas, matriz, parametros):
+    #ICA por fila a partir de la matriz alineada. Los parámetros sin rango o sin dato
+    #no suman al índice, igual que en la evaluación de la última lectura
+    subindices, ica, _ = puntuarMatriz(matriz, REGISTRO.columnas(parametros))
+    return pd.DataFrame({
+        "Fecha": fechas,
+        "ICA": ica,
+        "Nivel": clasificarICA(ica),
+        "Parametros": (~np.isnan(subindices)).sum(axis=1)
+    })
+
+def calcularHistorialICA(rutaDatos, tolerancia=None):
+    #Serie del ICA de un cuerpo de agua (una fila por fecha de muestreo), puntuada sobre la
+    #tabla ancha, que se guarda en caché y en disco mientras no cambien los datos
+    return calcularICA(*tablaAncha.matrizTabla(tablaAncha.obtenerTabla(rutaDatos, tolerancia)))
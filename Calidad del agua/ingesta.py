@@ -0,0 +1,34 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Ingesta de Datos
+
+Punto único por el que pasan las escrituras de series. Además de guardar los
+datos con el módulo de almacenamiento, mantiene al día el índice de resumen
+del cuerpo de agua, revisa las lecturas nuevas en busca de anomalías y las
+evalúa contra el rango normal de su parámetro (alertas).
+"""
+import almacenamiento
+import resumen
+import anomalias
+import alertas
+#========================
+#Fin de las importaciones
+
+
+def guardarSerie(rutaArchivo, df):
+    #Guarda una serie completa (al crear un parámetro o al editar un registro).
+    #Retorna (lecturas marcadas como anómalas (Fecha, Valor, Motivos), eventos de alerta nuevos)
+    almacenamiento.escribirSerie(rutaArchivo, df)
+    resumen.actualizarCompleto(rutaArchivo, df)
+    marcadas = anomalias.revisarCompleta(rutaArchivo, df)
+    return marcadas, alertas.evaluarCompleta(rutaArchivo, df)
+
+def anexarDatos(rutaArchivo, dfNuevos):
+    #Anexa registros nuevos a una serie. Retorna (cuántos se agregaron, los que se
+    #marcaron como anómalos, eventos de alerta que generaron)
+    agregados = almacenamiento.anexarSerie(rutaArchivo, dfNuevos)
+    if not agregados:
+        return 0, anomalias.sinMarcas(), []
+    resumen.actualizarAnexo(rutaArchivo, dfNuevos)
+    marcadas = anomalias.revisarAnexo(rutaArchivo, dfNuevos)
+    return agregados, marcadas, alertas.evaluarAnexo(rutaArchivo, dfNuevos, marcadas)
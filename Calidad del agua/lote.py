@@ -0,0 +1,112 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Evaluación por Lotes de Todos los Cuerpos de Agua
+
+Recorre todos los cuerpos de agua de CuerposDeAgua/, calcula el ICA y los
+impactos de Pareto de cada uno en paralelo (un proceso por núcleo) y escribe
+una tabla de clasificación consolidada en CuerposDeAgua/Ranking_ICA_<fecha>.csv.
+
+Uso (desde la raíz del proyecto):
+    python "Calidad del agua/lote.py" [--procesos N]
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from config import config
+import ica
+#========================
+#Fin de las importaciones (os, sys, time, argparse, pathlib, datetime, concurrent.futures, pandas)
+
+
+def listarCuerposAgua(rutaBase=Path("CuerposDeAgua")):
+    #Lista las rutas de los cuerpos de agua que tienen carpeta de datos
+    rutaBase = Path(rutaBase)
+    if not rutaBase.exists():
+        return []
+    return sorted(carpeta for carpeta in rutaBase.iterdir() if (carpeta / config.data_folder).is_dir())
+
+def evaluarCuerpoAgua(rutaCuerpo):
+    #Evalúa un cuerpo de agua. Se ejecuta en un proceso del pool, por lo que
+    #recibe y retorna solo datos simples
+    inicio = time.perf_counter()
+    rutaCuerpo = Path(rutaCuerpo)
+    valores = ica.ultimasLecturas(rutaCuerpo / config.data_folder)
+
+    evaluacion = ica.evaluarUltimasLecturas(valores)
+    impactos = ica.calcularImpactosNegativos(valores)
+    fila = {
+        "Cuerpo": rutaCuerpo.name,
+        "ICA": round(evaluacion["ica"], 2),
+        "Nivel": evaluacion["nivel"],
+        "Parametros": len(valores),
+        "Principales": "; ".join(ica.principalesPareto(impactos)),
+    }
+    for parametro, impacto in impactos.items():
+        fila[f"Impacto {parametro}"] = impacto
+    fila["Tiempo_s"] = round(time.perf_counter() - inicio, 4)
+    return fila
+
+def evaluarTodos(rutaBase=Path("CuerposDeAgua"), procesos=None):
+    #Evalúa todos los cuerpos de agua en paralelo y retorna la tabla ordenada por ICA
+    #(mejor primero) y el tiempo total en segundos
+    cuerpos = [str(ruta.resolve()) for ruta in listarCuerposAgua(rutaBase)]
+    inicio = time.perf_counter()
+    if not cuerpos:
+        return pd.DataFrame(), 0.0
+
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(cuerpos) == 1:
+        filas = [evaluarCuerpoAgua(cuerpo) for cuerpo in cuerpos]
+    else:
+        #Se reparten los cuerpos en bloques para no pagar un viaje entre procesos por cuerpo
+        bloque = max(1, len(cuerpos) // (procesos * 4))
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            filas = list(pool.map(evaluarCuerpoAgua, cuerpos, chunksize=bloque))
+    total = time.perf_counter() - inicio
+
+    tabla = pd.DataFrame(filas).sort_values("ICA", ascending=False, ignore_index=True)
+    tabla.insert(0, "Posicion", range(1, len(tabla) + 1))
+    return tabla, total
+
+def guardarRanking(tabla, rutaBase=Path("CuerposDeAgua")):
+    #Escribe la tabla consolidada y retorna su ruta
+    fechaActual = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
+    ruta = Path(rutaBase) / f"Ranking_ICA_{fechaActual}.csv"
+    tabla.to_csv(ruta, index=False, encoding="utf-8")
+    return ruta
+
+def mostrarResultados(tabla, total):
+    #Imprime la clasificación con el tiempo de cada cuerpo y la aceleración obtenida
+    if tabla.empty:
+        print("No hay cuerpos de agua con datos.")
+        return
+    print(tabla[["Posicion", "Cuerpo", "ICA", "Nivel", "Principales", "Tiempo_s"]].to_string(index=False))
+    secuencial = tabla["Tiempo_s"].sum()
+    print(f"\nCuerpos evaluados: {len(tabla)}")
+    print(f"Tiempo total: {total:.2f} s (suma por cuerpo: {secuencial:.2f} s, aceleración: {secuencial / total if total else 0:.1f}x)")
+
+def ejecutarLote(procesos=None, rutaBase=Path("CuerposDeAgua")):
+    #Evalúa, muestra y guarda la clasificación. Retorna la ruta del archivo generado
+    tabla, total = evaluarTodos(rutaBase, procesos)
+    mostrarResultados(tabla, total)
+    if tabla.empty:
+        return None
+    ruta = guardarRanking(tabla, rutaBase)
+    print(f"Clasificación guardada en: {ruta}")
+    return ruta
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Evalúa el ICA de todos los cuerpos de agua en paralelo")
+    parser.add_argument("--ruta", default="CuerposDeAgua", help="Carpeta con los cuerpos de agua")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos a usar (por defecto, uno por núcleo)")
+    args = parser.parse_args(argumentos)
+    ejecutarLote(args.procesos, Path(args.ruta))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
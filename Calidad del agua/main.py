@@ -2,26 +2,15 @@
 Sistema de Gestión de Cuerpos de Agua
 Módulo: Menú Principal
 """
-import os
+import sys
 from pathlib import Path
 import menu
 from config import config
+from consola import limpiarConsola, pausarConsola
 #========================
-#Fin de las importaciones (os, pathlib)
+#Fin de las importaciones (sys, pathlib)
 
 
-# ======================
-# Funciones de Utilidad
-# ======================
-
-def limpiarConsola():
-    #Limpia la pantalla de la consola
-    os.system('cls')
-
-def pausarConsola():
-    #Pausa la ejecución hasta que el usuario presione una tecla
-    os.system("pause")
-
 # ======================
 # Funciones del Menú
 # ======================
@@ -34,7 +23,8 @@ def mostrarMenuPrincipal():
     print("======================================")
     print("\n1. Agregar cuerpo de agua")
     print("2. Acceder a cuerpo de agua existente")
-    print("3. Salir")
+    print("3. Evaluar todos los cuerpos de agua (ICA por lotes)")
+    print("4. Salir")
 
 def crearCuerpoAgua():
     #Crea un nuevo directorio para un cuerpo de agua
@@ -97,6 +87,39 @@ def accederCuerpoAgua():
             print("Error: Debe ingresar un número válido")
         pausarConsola()
 
+def mostrarMetricas():
+    #Opción oculta (9): tiempos de las operaciones medidas en esta sesión
+    from datetime import datetime
+    from metricas import metricas
+
+    while True:
+        limpiarConsola()
+        print("=== MÉTRICAS DE RENDIMIENTO ===\n")
+        print(metricas.tabla())
+        estado = "activado" if config.profile_operations else "desactivado"
+        print(f"\n1. Guardar en JSON\n2. Perfilado por operación ({estado})\n3. Ver perfiles\n4. Limpiar\n5. Volver")
+        opcion = input("\nSeleccione una opción: ").strip()
+        if opcion == "1":
+            ruta = Path("CuerposDeAgua") / f"Metricas_{datetime.now().strftime('%d-%m-%y_%H-%M-%S')}.json"
+            print(f"\nMétricas guardadas en: {metricas.volcarJSON(ruta)}")
+        elif opcion == "2":
+            config.profile_operations = not config.profile_operations
+            continue
+        elif opcion == "3":
+            perfiles = metricas.perfiles()
+            if not perfiles:
+                print("\nNo hay perfiles. Active el perfilado y repita las operaciones.")
+            for operacion, texto in perfiles.items():
+                print(f"\n--- {operacion} ---\n{texto}")
+        elif opcion == "4":
+            metricas.limpiar()
+            continue
+        elif opcion == "5":
+            return
+        else:
+            print("Error: Opción debe ser entre 1 y 5")
+        pausarConsola()
+
 # ======================
 # Bucle Principal
 # ======================
@@ -114,10 +137,18 @@ def ejecutarSistema():
             elif opcion == 2:
                 accederCuerpoAgua()
             elif opcion == 3:
+                #Se importa aquí para no cargar pandas al mostrar el menú
+                import lote
+                lote.ejecutarLote()
+                pausarConsola()
+            elif opcion == 4:
                 print("Saliendo del sistema...")
                 break
+            elif opcion == 9:
+                #Opción oculta: no aparece en el menú
+                mostrarMetricas()
             else:
-                print("Error: Opción debe ser entre 1 y 3")
+                print("Error: Opción debe ser entre 1 y 4")
                 pausarConsola()
         except ValueError:
             print("Error: Debe ingresar un número válido")
@@ -125,4 +156,8 @@ def ejecutarSistema():
         limpiarConsola()
 
 if __name__ == "__main__":
+    #Con argumentos se ejecuta la línea de comandos; sin ellos, el menú interactivo
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main())
     ejecutarSistema()
\ No newline at end of file
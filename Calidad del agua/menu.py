@@ -1,15 +1,9 @@
-import os
-import option1
-import option2
-import option3
+#Funciones para limpiar y hacer pausas en la consola
+from consola import limpiarConsola, pausarConsola
 #========================
-#Fin de las importaciones (os)
-
-#Funciones para limpiar y hacer pausas en la consola usando la libreria os(Operative System).
-def limpiarConsola():
-    os.system('cls')#Clear console
-def pausarConsola():
-    os.system("pause")
+#Fin de las importaciones
+#Los módulos option1, option2 y option3 se importan al elegir su opción:
+#cargan pandas, numpy y matplotlib, y el menú no los necesita para mostrarse
 
 
 #Función que nos imprime las opciones del menu 2
@@ -36,12 +30,16 @@ def ejecutarAplicacion():
         limpiarConsola()
         if opcion >= 1 and opcion <= 5:
             if opcion == 1:
+                import option1
                 option1.ejecutarOpcion1()
             elif opcion == 2:
+                import option2
                 option2.ejecutarOpcion2()
             elif opcion == 3:
+                import option3
                 option3.ejecutarOpcion3()
             elif opcion == 4:
+                import option1
                 option1.definirDiagramaPareto()
             else:
                 print("Programa finalizado...")
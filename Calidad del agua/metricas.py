@@ -0,0 +1,216 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Métricas de Rendimiento
+
+Registro en memoria del tiempo que toman las operaciones principales (leer,
+interpretar, puntuar, ajustar, graficar, guardar), con las filas procesadas y
+los bytes leídos. Las operaciones se instrumentan con el administrador de
+contexto medir() o con el decorador instrumentar():
+
+    with metricas.medir("leer", bytes=tamano) as medicion:
+        df = ...
+        medicion["filas"] = len(df)
+
+Con config.profile_operations activado cada medición también se perfila (con
+pyinstrument si está instalado y config.profiler lo pide, o con cProfile) y el
+resumen del perfil queda en el registro. Con config.track_memory se registra
+además, con tracemalloc, el pico de memoria de cada operación por encima de la
+que ya estaba en uso al empezar. El registro se consulta desde una
+opción oculta del menú principal (9) y se puede volcar a JSON.
+
+Solo usa la librería estándar para que instrumentar no cargue nada más.
+"""
+import io
+import json
+import time
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from config import config
+#========================
+#Fin de las importaciones (io, json, time, threading, functools, tracemalloc, contextlib, pathlib)
+
+#Líneas del informe de perfil que se guardan por operación
+LINEAS_PERFIL = 25
+
+#Solo se perfila la operación más externa de cada hilo: los perfiladores no se anidan
+_local = threading.local()
+
+
+class RegistroMetricas:
+    #Acumula por operación: llamadas, tiempo total y máximo, filas, bytes y pico de memoria
+
+    def __init__(self):
+        self._operaciones = {}
+        self._perfiles = {}
+        self._bloqueo = threading.Lock()
+
+    def registrar(self, operacion, segundos, filas=0, bytes=0, picoMemoria=None):
+        with self._bloqueo:
+            datos = self._operaciones.setdefault(operacion, {
+                "llamadas": 0, "segundos": 0.0, "maximoSegundos": 0.0, "filas": 0, "bytes": 0,
+                "picoMemoria": None})
+            datos["llamadas"] += 1
+            datos["segundos"] += segundos
+            datos["maximoSegundos"] = max(datos["maximoSegundos"], segundos)
+            datos["filas"] += int(filas or 0)
+            datos["bytes"] += int(bytes or 0)
+            if picoMemoria is not None:
+                datos["picoMemoria"] = max(datos["picoMemoria"] or 0, picoMemoria)
+
+    def guardarPerfil(self, operacion, texto):
+        #Se conserva el perfil más reciente de cada operación
+        with self._bloqueo:
+            self._perfiles[operacion] = texto
+
+    def estadisticas(self):
+        #Copia del registro con la media por llamada y las filas por segundo
+        with self._bloqueo:
+            resultado = {}
+            for operacion, datos in sorted(self._operaciones.items()):
+                resultado[operacion] = dict(datos)
+                resultado[operacion]["mediaSegundos"] = datos["segundos"] / datos["llamadas"]
+                resultado[operacion]["filasPorSegundo"] = datos["filas"] / datos["segundos"] if datos["segundos"] else 0
+            return resultado
+
+    def perfiles(self):
+        with self._bloqueo:
+            return dict(self._perfiles)
+
+    def limpiar(self):
+        with self._bloqueo:
+            self._operaciones.clear()
+            self._perfiles.clear()
+
+    def volcarJSON(self, ruta):
+        #Escribe las estadísticas y los perfiles en un archivo JSON y retorna su ruta
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        contenido = {"operaciones": self.estadisticas(), "perfiles": self.perfiles()}
+        ruta.write_text(json.dumps(contenido, ensure_ascii=False, indent=2), encoding="utf-8")
+        return ruta
+
+    def tabla(self):
+        #Texto con una fila por operación, para mostrar en la consola
+        lineas = [f"{'Operación':24} {'Llamadas':>8} {'Total ms':>10} {'Media ms':>10} {'Máx ms':>10} "
+                  f"{'Filas':>12} {'Bytes':>12} {'Pico MB':>9}"]
+        for operacion, datos in self.estadisticas().items():
+            pico = f"{datos['picoMemoria'] / 2**20:9.1f}" if datos["picoMemoria"] is not None else f"{'-':>9}"
+            lineas.append(f"{operacion:24} {datos['llamadas']:8} {datos['segundos'] * 1000:10.2f} "
+                          f"{datos['mediaSegundos'] * 1000:10.2f} {datos['maximoSegundos'] * 1000:10.2f} "
+                          f"{datos['filas']:12} {datos['bytes']:12} {pico}")
+        return "\n".join(lineas)
+
+#Registro global de la aplicación
+metricas = RegistroMetricas()
+
+# ======================
+# Perfilado
+# ======================
+
+def _iniciarPerfil():
+    #Retorna una función que detiene el perfil y entrega su resumen en texto
+    if config.profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            perfilador = Profiler()
+            perfilador.start()
+
+            def detener():
+                perfilador.stop()
+                return perfilador.output_text()
+            return detener
+
+    import cProfile
+    import pstats
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+
+    def detener():
+        perfilador.disable()
+        salida = io.StringIO()
+        pstats.Stats(perfilador, stream=salida).sort_stats("cumulative").print_stats(LINEAS_PERFIL)
+        return salida.getvalue()
+    return detener
+
+# ======================
+# Memoria
+# ======================
+
+#Operaciones en curso de cada hilo, con la memoria al empezar y el pico visto.
+#tracemalloc tiene un solo pico global: cada operación lo reinicia al empezar y,
+#al terminar, entrega su pico a la operación que la contiene y lo vuelve a reiniciar
+def _pilaMemoria():
+    if not hasattr(_local, "pilaMemoria"):
+        _local.pilaMemoria = []
+    return _local.pilaMemoria
+
+def _iniciarMemoria():
+    #Solo se detiene al final el rastreo que se haya iniciado aquí
+    iniciado = not tracemalloc.is_tracing()
+    if iniciado:
+        tracemalloc.start()
+    pila = _pilaMemoria()
+    actual, pico = tracemalloc.get_traced_memory()
+    if pila:
+        pila[-1]["pico"] = max(pila[-1]["pico"], pico)
+    tracemalloc.reset_peak()
+    pila.append({"inicio": actual, "pico": actual, "iniciado": iniciado})
+
+def _detenerMemoria():
+    #Retorna los bytes que la operación llegó a usar por encima de los que había al empezar
+    pila = _pilaMemoria()
+    medicion = pila.pop()
+    medicion["pico"] = max(medicion["pico"], tracemalloc.get_traced_memory()[1])
+    if pila:
+        pila[-1]["pico"] = max(pila[-1]["pico"], medicion["pico"])
+        tracemalloc.reset_peak()
+    elif medicion["iniciado"]:
+        tracemalloc.stop()
+    return medicion["pico"] - medicion["inicio"]
+
+# ======================
+# Instrumentación
+# ======================
+
+@contextmanager
+def medir(operacion, filas=0, bytes=0):
+    #Mide el bloque y lo registra. El diccionario que entrega permite fijar
+    #filas y bytes cuando solo se conocen al terminar
+    medicion = {"filas": filas, "bytes": bytes}
+    detenerPerfil = None
+    if config.profile_operations and not getattr(_local, "perfilando", False):
+        _local.perfilando = True
+        detenerPerfil = _iniciarPerfil()
+    midiendoMemoria = config.track_memory or bool(_pilaMemoria())
+    if midiendoMemoria:
+        _iniciarMemoria()
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        segundos = time.perf_counter() - inicio
+        picoMemoria = _detenerMemoria() if midiendoMemoria else None
+        if detenerPerfil:
+            metricas.guardarPerfil(operacion, detenerPerfil())
+            _local.perfilando = False
+        metricas.registrar(operacion, segundos, medicion["filas"], medicion["bytes"], picoMemoria)
+
+def instrumentar(operacion, filas=None):
+    #Decorador que mide cada llamada a la función. filas, si se indica, es una
+    #función que recibe el resultado y retorna las filas procesadas
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(operacion) as medicion:
+                resultado = funcion(*args, **kwargs)
+                if filas is not None:
+                    medicion["filas"] = filas(resultado)
+                return resultado
+        return envoltura
+    return decorador
@@ -2,98 +2,50 @@
 Sistema de Evaluación de Calidad del Agua
 Módulo: Gestión de Datos y Evaluación de Parámetros
 """
-import os
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 import pandas as pd
-import numpy as np
 from config import config
-import matplotlib.pyplot as plt
-
-# ======================
-# Constantes y Configuraciones
-# ======================
-
-#Lista de parametros de calidad, con su correspondiente unidad, rango, descripción y recomendación segun el ICA
-PARAMETROS_CALIDAD = {
-    "pH": {
-        "unidades": "unidades",
-        "rango_normal": (6.5, 8.5),
-        "descripcion": "Medida de acidez o alcalinidad. Valores extremos afectan la vida acuática.",
-        "recomendacion": "Ajustar el pH con agentes acidificantes o alcalinizantes según el desbalance detectado."
-    },
-    "Temperatura": {
-        "unidades": "°C",
-        "rango_normal": (10, 25),
-        "descripcion": "Temperatura favorable para organismos acuáticos y oxígeno disuelto.",
-        "recomendacion": "Controlar fuentes de calor o frío, evitar descargas térmicas industriales."
-    },
-    "Turbidez": {
-        "unidades": "NTU",
-        "rango_normal": (0, 5),
-        "descripcion": "Medida de claridad del agua. Alta turbidez puede indicar contaminación por sedimentos o residuos.",
-        "recomendacion": "Implementar filtración y control de escorrentías para reducir partículas suspendidas."
-    },
-    "Oxígeno Disuelto": {
-        "unidades": "mg/L",
-        "rango_normal": (5, 12),
-        "descripcion": "Esencial para la vida acuática. Niveles bajos indican contaminación orgánica.",
-        "recomendacion": "Mejorar la aireación del agua e identificar fuentes de materia orgánica para reducir su entrada."
-    },
-    "Conductividad": {
-        "unidades": "µS/cm",
-        "rango_normal": (100, 1000),
-        "descripcion": "Mide la cantidad de sales y minerales disueltos en el agua.",
-        "recomendacion": "Revisar descargas de aguas industriales y actividades agrícolas cercanas."
-    },
-    "Nitratos": {
-        "unidades": "mg/L",
-        "rango_normal": (0, 10),
-        "descripcion": "Provienen de fertilizantes y aguas residuales. Contribuyen a la eutrofización.",
-        "recomendacion": "Reducir el uso de fertilizantes y controlar fuentes de aguas residuales domésticas y agrícolas."
-    },
-    "Fosfatos": {
-        "unidades": "mg/L",
-        "rango_normal": (0, 0.1),
-        "descripcion": "Nutriente que en exceso promueve el crecimiento de algas nocivas.",
-        "recomendacion": "Limitar el uso de detergentes y fertilizantes con fósforo, y mejorar el tratamiento de aguas residuales."
-    },
-    "Coliformes Fecales": {
-        "unidades": "UFC/100 mL",
-        "rango_normal": (0, 200),
-        "descripcion": "Indicador de contaminación biológica por desechos fecales.",
-        "recomendacion": "Identificar y eliminar fuentes de contaminación fecal. Tratar el agua con desinfección (cloración o UV)."
-    },
-    "Demanda Bioquímica de Oxígeno DBO": {
-        "unidades": "mg/L",
-        "rango_normal": (0, 5),
-        "descripcion": "Cantidad de oxígeno requerida para descomponer materia orgánica en el agua.",
-        "recomendacion": "Reducir la descarga de materia orgánica y mejorar el tratamiento de aguas residuales."
-    },
-    "Sólidos Totales Disueltos TDS": {
-        "unidades": "mg/L",
-        "rango_normal": (200, 500),
-        "descripcion": "Concentración total de sustancias disueltas. Valores altos afectan el sabor y uso del agua.",
-        "recomendacion": "Filtrar el agua y controlar la fuente de contaminantes disueltos, como fertilizantes o aguas industriales."
-    }
-}
-
+import almacenamiento
+import ingesta
+import resumen
+import ica
+import prediccion
+import estadisticasMoviles
+import anomalias
+import alertas
+import tablaAncha
+from parametros import PARAMETROS_CALIDAD
+from metricas import medir
+from consola import limpiarConsola, pausarConsola
 
 # ======================
 # Funciones de Utilidad
 # ======================
 
-def limpiarConsola():
-    #Limpia la pantalla de la consola
-    os.system('cls')
-
-def pausarConsola():
-    #Pausa la ejecución hasta que el usuario presione una tecla
-    os.system("pause")
-
 def formatearNombreArchivo(parametro):
-    #Convierte un nombre de parámetro a formato de nombre de archivo
-    return f"DATOS_{parametro.replace(' ', '_').replace('(', '').replace(')', '')}.xlsx"
+    #Convierte un nombre de parámetro a formato de nombre de archivo (según el backend activo)
+    return almacenamiento.formatearNombreArchivo(parametro)
+
+def mostrarAnomalias(marcadas, maximo=10):
+    #Informa las lecturas que se marcaron como anómalas al ingresarlas (a lo sumo maximo)
+    if marcadas.empty:
+        return
+    print(f"\n⚠️ {len(marcadas)} lectura(s) marcada(s) como anómala(s); no se usarán en el ICA:")
+    for fila in marcadas.head(maximo).itertuples():
+        print(f"  {almacenamiento.formatearFecha(fila.Fecha)}: {fila.Valor} ({anomalias.describirMotivos(fila.Motivos)})")
+    if len(marcadas) > maximo:
+        print(f"  ... y {len(marcadas) - maximo} más")
+
+def mostrarAlertas(registros, maximo=10):
+    #Informa las alertas que se abrieron o cerraron con las lecturas ingresadas (las últimas maximo)
+    if not registros:
+        return
+    print(f"\n🚨 {len(registros)} evento(s) de alerta por rango normal:")
+    if len(registros) > maximo:
+        print(f"  ... {len(registros) - maximo} anteriores en {alertas.NOMBRE_REGISTRO}")
+    for registro in registros[-maximo:]:
+        print(f"  {alertas.formatearAlerta(registro)}")
 
 # ======================
 # Funciones del Menú
@@ -111,7 +63,8 @@ def mostrarMenuPrincipal():
     print("4. Evaluar parámetros actuales")
     print("5. Realizar predicciones")
     print("6. Evaluación de la calidad segun el ICA")
-    print("7. Volver al menú anterior")
+    print("7. Correlación entre parámetros")
+    print("8. Volver al menú anterior")
 
 def mostrarMenuIngresoDatos():
     #Muestra el submenú para ingreso de datos
@@ -131,14 +84,14 @@ def obtenerRutaDatos():
     return Path("CuerposDeAgua") / config.activeWaterBody / config.data_folder #CuerposDeAgua/Lago de bonanza/Datos
 
 def listarArchivosDisponibles():
-    #Lista los archivos Excel disponibles en la carpeta de datos
+    #Lista los archivos de datos disponibles en la carpeta de datos
     rutaDatos = obtenerRutaDatos()
     #Si la carpeta no existe, retorna none
     if not rutaDatos.exists():
         return None
     #============================================================
-    #Si si existe, retorna una lista con los nombres de los archivos terminados en .xlsx en la carpeta Datos
-    return [archivo.name for archivo in rutaDatos.glob("*.xlsx")]
+    #Si si existe, retorna una lista con los nombres de los archivos del backend activo en la carpeta Datos
+    return almacenamiento.listarArchivos(rutaDatos)
 
 def seleccionarOpcion(mensaje, maxOpcion):
     #Maneja la selección de opciones del usuario
@@ -198,7 +151,7 @@ def crearNuevoArchivo():
     rutaDatos = obtenerRutaDatos()
     #Si no existe, creala
     rutaDatos.mkdir(parents=True, exist_ok=True)
-    #La ruta del archivo es Datos nombreArchivo.xlsx
+    #La ruta del archivo es Datos/nombreArchivo (con la extensión del backend activo)
     rutaArchivo = rutaDatos / nombreArchivo
 
     #Si el archivo ya existe, imprimir en pantalla
@@ -219,14 +172,14 @@ def crearNuevoArchivo():
     
     #Ciclo que pide fechas y valores y valida el formato de cada uno de estos hastas que se deja la fecha vacia
     while True:
-        fecha = input("\nFecha (dd/mm/aa): ").strip()
+        fecha = input("\nFecha (dd/mm/aa [hh:mm]): ").strip()
         if not fecha:
             break
             
         try:
-            datetime.strptime(fecha, "%d/%m/%y")
+            fecha = almacenamiento.convertirFecha(fecha)
         except ValueError:
-            print("Error: Formato inválido. Use dd/mm/aa")
+            print("Error: Formato inválido. Use dd/mm/aa o dd/mm/aa hh:mm")
             continue
             
         try:
@@ -250,9 +203,11 @@ def crearNuevoArchivo():
         "Valor": valores,
     })
     
-    #Se crea el archivo de excel en la ruta definida anteriormente
-    df.to_excel(rutaArchivo, index=False)
+    #Se crea el archivo de datos en la ruta definida anteriormente
+    marcadas, registros = ingesta.guardarSerie(rutaArchivo, df)
     print(f"\nArchivo '{nombreArchivo}' creado con {len(df)} registros.")
+    mostrarAnomalias(marcadas)
+    mostrarAlertas(registros)
     pausarConsola()
     
 
@@ -280,8 +235,9 @@ def editarValorExistente():
     # Cargar datos
     rutaArchivo = obtenerRutaDatos() / archivoSeleccionado
     try:
-        df = pd.read_excel(rutaArchivo)
-        parametro = str(archivoSeleccionado).replace("DATOS_", "").replace("_", " ").replace(".xlsx", "")
+        #La serie se reescribe completa, así que no se lee en formato compacto
+        df = almacenamiento.leerSerie(rutaArchivo, compacta=False)
+        parametro = almacenamiento.obtenerNombreParametro(archivoSeleccionado)
     except Exception as e:
         print(f"Error al leer archivo: {e}")
         pausarConsola()
@@ -289,10 +245,10 @@ def editarValorExistente():
     
     # Mostrar datos con índices
     print(f"\nDatos actuales de {parametro}:")
-    print("Índice | Fecha       | Valor")
-    print("---------------------------")
+    print("Índice | Fecha          | Valor")
+    print("------------------------------")
     for i, fila in df.iterrows():
-        print(f"{i:6} | {fila['Fecha']:10} | {fila['Valor']}")
+        print(f"{i:6} | {almacenamiento.formatearFecha(fila['Fecha']):14} | {fila['Valor']}")
     
     # Selección de registro a editar
     while True:
@@ -309,20 +265,19 @@ def editarValorExistente():
     # Edición de valores
     registro = df.loc[indice]
     print(f"\nEditando registro {indice}:")
-    print(f"Fecha actual: {registro['Fecha']}")
+    print(f"Fecha actual: {almacenamiento.formatearFecha(registro['Fecha'])}")
     print(f"Valor actual: {registro['Valor']} {PARAMETROS_CALIDAD.get(parametro, {}).get('unidades', '')}")
     
     # Edición de fecha
     while True:
-        nueva_fecha = input("\nNueva fecha (dd/mm/aa) [Enter para mantener actual]: ").strip()
+        nueva_fecha = input("\nNueva fecha (dd/mm/aa [hh:mm]) [Enter para mantener actual]: ").strip()
         if not nueva_fecha:
             break
         try:
-            datetime.strptime(nueva_fecha, "%d/%m/%y")
-            df.at[indice, 'Fecha'] = nueva_fecha
+            df.at[indice, 'Fecha'] = almacenamiento.convertirFecha(nueva_fecha)
             break
         except ValueError:
-            print("Error: Formato inválido. Use dd/mm/aa")
+            print("Error: Formato inválido. Use dd/mm/aa o dd/mm/aa hh:mm")
 
     # Edición de valor
     while True:
@@ -338,14 +293,16 @@ def editarValorExistente():
 
     # Guardar cambios
     try:
-        df.to_excel(rutaArchivo, index=False)
+        marcadas, registros = ingesta.guardarSerie(rutaArchivo, df)
         print("\n¡Cambios guardados exitosamente!")
         
         # Mostrar registro actualizado
         registro_actualizado = df.loc[indice]
         print("\nRegistro actualizado:")
-        print(f"Fecha: {registro_actualizado['Fecha']}")
+        print(f"Fecha: {almacenamiento.formatearFecha(registro_actualizado['Fecha'])}")
         print(f"Valor: {registro_actualizado['Valor']} {PARAMETROS_CALIDAD.get(parametro, {}).get('unidades', '')}")
+        mostrarAnomalias(marcadas[marcadas["Fecha"] == registro_actualizado['Fecha']])
+        mostrarAlertas(registros)
         
     except Exception as e:
         print(f"\nError al guardar cambios: {e}")
@@ -379,11 +336,11 @@ def agregarDatosExistente():
     #Define la ruta del archivo en el que almacenar los nuevos datos
     rutaArchivo = obtenerRutaDatos() / archivoSeleccionado
     try:
-        #Define el data frame que es igual a los datos del excel
-        df = pd.read_excel(rutaArchivo)
+        #Cantidad de registros y los últimos 10, sin leer todo el historial
+        totalRegistros, ultimos = almacenamiento.leerUltimos(rutaArchivo, 10)
 
         #Parametro es igual a el parametro formateado
-        parametro = str(archivoSeleccionado).replace("DATOS_", "").replace("_", " ").replace(".xlsx", "")
+        parametro = almacenamiento.obtenerNombreParametro(archivoSeleccionado)
     except Exception as e: #Manejo de errores
         print(f"Error al leer archivo: {e}")
         pausarConsola()
@@ -393,8 +350,8 @@ def agregarDatosExistente():
     rangoideal = PARAMETROS_CALIDAD.get(parametro, {}).get('rango_normal', 'No disponible')
     
     #Mensajes para el usuario
-    print(f"\nDatos actuales de {parametro} ({len(df)} registros):")
-    print(df.to_string(index=False))
+    print(f"\nDatos actuales de {parametro} ({totalRegistros} registros, se muestran los últimos 10):")
+    print(ultimos.to_string(index=False))
     print(f"\nRango ideal: {rangoideal}")
 
     #Se define una función con los nuevos datos ingresados
@@ -405,22 +362,20 @@ def agregarDatosExistente():
     
     #Se piden los nuevos datos, en el ciclo se valida que se tenga el formato correcto tanto para fecha como para los valores
     while True:
-        fecha = input("\nFecha (dd/mm/aa): ").strip()
+        fecha = input("\nFecha (dd/mm/aa [hh:mm]): ").strip()
         if not fecha:
             break
         try:
-            datetime.strptime(fecha, "%d/%m/%y")
+            fecha = almacenamiento.convertirFecha(fecha)
         except ValueError:
-            print("Error: Formato inválido. Use dd/mm/aa")
+            print("Error: Formato inválido. Use dd/mm/aa o dd/mm/aa hh:mm")
             continue
             
         try:
             valor = float(input(f"Valor de {parametro}: "))
             nuevosDatos.append({
                 "Fecha": fecha,
-                "Parámetro": parametro,
-                "Valor": valor,
-                "Unidades": PARAMETROS_CALIDAD[parametro]["unidades"]
+                "Valor": valor
             })
         except ValueError:
             print("Error: Ingrese un valor numérico válido")
@@ -431,12 +386,13 @@ def agregarDatosExistente():
         pausarConsola()
         return
 
-    # Combinar y guardar
+    # Anexar sin reescribir el historial; la compactación ocurre en segundo plano
     dfNuevos = pd.DataFrame(nuevosDatos)
-    df = pd.concat([df, dfNuevos], ignore_index=True)
-    df.to_excel(rutaArchivo, index=False)
+    agregados, marcadas, registros = ingesta.anexarDatos(rutaArchivo, dfNuevos)
     
-    print(f"\nSe agregaron {len(dfNuevos)} registros. Total: {len(df)}")
+    print(f"\nSe agregaron {agregados} registros. Total: {totalRegistros + agregados}")
+    mostrarAnomalias(marcadas)
+    mostrarAlertas(registros)
     pausarConsola()
 
 def evaluarParametros():
@@ -462,18 +418,17 @@ def evaluarParametros():
     # Cargar datos
     rutaArchivo = obtenerRutaDatos() / archivoSeleccionado
     try:
-        df = pd.read_excel(rutaArchivo)
-        
-        # Verificar que el archivo tenga las columnas correctas
-        if 'Fecha' not in df.columns or 'Valor' not in df.columns:
-            print("Error: El archivo no tiene el formato correcto (debe contener 'Fecha' y 'Valor')")
+        # Los datos salen del índice de resumen, sin leer la serie completa
+        datos = resumen.obtenerResumen(rutaArchivo)
+        if datos is None:
+            print("No hay registros para evaluar en este parámetro")
             pausarConsola()
             return
             
         # Obtener el nombre del parámetro del nombre del archivo
-        parametro = archivoSeleccionado.replace('DATOS_', '').replace('.xlsx', '').replace('_', ' ')
-        ultimoValor = df['Valor'].iloc[-1]
-        fechaUltimo = df['Fecha'].iloc[-1]
+        parametro = almacenamiento.obtenerNombreParametro(archivoSeleccionado)
+        ultimoValor = datos['ultimoValor']
+        fechaUltimo = almacenamiento.formatearFecha(datetime.fromisoformat(datos['ultimaFecha']))
         
     except Exception as e:
         print(f"Error al leer archivo: {e}")
@@ -492,6 +447,20 @@ def evaluarParametros():
     print("="*40)
     print(f"\nÚltima medición: {fechaUltimo}")
     print(f"Valor actual: {ultimoValor} {unidades}")
+
+    # Avisar si la última medición se marcó como anómala al ingresarla
+    valida = anomalias.ultimasValidas(obtenerRutaDatos(), [archivoSeleccionado]).get(parametro)
+    if valida and valida["fecha"] != datetime.fromisoformat(datos['ultimaFecha']):
+        print(f"⚠️ Esta medición se marcó como anómala; el ICA usa la última válida: {valida['valor']} "
+              f"({almacenamiento.formatearFecha(valida['fecha'])})")
+
+    # Alerta abierta por salida del rango normal (con histéresis y duración mínima)
+    abierta = alertas.alertasAbiertas(obtenerRutaDatos(), [archivoSeleccionado], pendientes=True).get(parametro)
+    if abierta:
+        estado = "ALERTA ABIERTA" if abierta["confirmada"] else "Fuera de rango (aún sin alerta)"
+        print(f"🚨 {estado}: por {abierta['direccion']} de {abierta['limite']} {abierta['unidades']} desde "
+              f"{almacenamiento.formatearFecha(abierta['inicio'])} ({abierta['lecturas']} lecturas, "
+              f"extremo {abierta['extremo']:g})")
     
     if rango:
         print(f"Rango ideal: {rango[0]} - {rango[1]} {unidades}")
@@ -507,10 +476,17 @@ def evaluarParametros():
     else:
         print("\nNo se encontró información de Rango ideal para este parámetro")
     
-    # Mostrar tendencia si hay suficientes datos
-    if len(df) > 1:
-        tendencia = "↑ Aumentando" if df['Valor'].iloc[-1] > df['Valor'].iloc[-2] else "↓ Disminuyendo"
-        print(f"\nTendencia: {tendencia} (vs medición anterior)")
+    # Tendencia y estadísticas móviles de la última medición (7, 30 y 365 días)
+    if datos['n'] > 1:
+        try:
+            ultimas = estadisticasMoviles.ultimasEstadisticas(almacenamiento.leerSerie(rutaArchivo))
+            print(f"\nTendencia: {estadisticasMoviles.tendencia(ultimas)} (media de 7 días vs 30 días)")
+            print("\nEstadísticas móviles:")
+            for linea in estadisticasMoviles.formatearEstadisticas(ultimas, unidades):
+                print(linea)
+        except Exception as e:
+            print(f"\nNo se pudieron calcular las estadísticas móviles: {e}")
+    print(f"\nHistórico ({datos['n']} registros): mínimo {datos['minimo']}, máximo {datos['maximo']}, media {datos['media']:.2f}")
     
     pausarConsola()
 
@@ -533,27 +509,10 @@ def realizarPredicciones():
     if not archivoSeleccionado:
         return
 
-    # Cargar datos
+    # Cargar el resumen de la serie (incluye las sumas de la regresión)
     rutaArchivo = obtenerRutaDatos() / archivoSeleccionado
     try:
-        df = pd.read_excel(rutaArchivo)
-        
-        # Verificar columnas necesarias
-        if 'Fecha' not in df.columns or 'Valor' not in df.columns:
-            print("Error: El archivo debe contener columnas 'Fecha' y 'Valor'")
-            pausarConsola()
-            return
-            
-        # Convertir fechas
-        df['Fecha'] = pd.to_datetime(df['Fecha'], format='%d/%m/%y', errors='coerce')
-        if df['Fecha'].isnull().any():
-            print("Error: Algunas fechas no pudieron ser interpretadas (formato dd/mm/aa)")
-            pausarConsola()
-            return
-            
-        # Calcular días desde primera fecha
-        df['Dias'] = (df['Fecha'] - df['Fecha'].min()).dt.days
-        
+        datos = resumen.obtenerResumen(rutaArchivo)
     except Exception as e:
         print(f"Error al procesar archivo: {e}")
         pausarConsola()
@@ -583,60 +542,28 @@ def realizarPredicciones():
         print("Error: Ingrese un número válido")
         pausarConsola()
         return
-    
-    df.sort_values('Fecha', inplace=True)  # Compromiso: Verificar consumo de memoria en datasets >1M registros
-
-    # Validación de ordenamiento (Compromiso: Loggear advertencias)
-    if not df['Fecha'].is_monotonic_increasing:
-        print("¡Advertencia! Datos reordenados cronológicamente")
 
-    # Cálculo de días DESPUÉS de ordenar
-    df['Dias'] = (df['Fecha'] - df['Fecha'].min()).dt.days  # Compromiso: Verificar delta mínimo = 1 día
+    ponderada = input("¿Dar más peso a los datos recientes? (s/n): ").lower() == 's'
 
-    # Detección de gaps (Compromiso: Umbral configurable)
-    saltos = np.diff(df['Dias'])
-    if any(saltos > 30):
-        print(f"Advertencia: Saltos temporales >30 días detectados (Máx: {max(saltos)} días)")
-
-    # Calcular regresión lineal
-    X = df['Dias'].values
-    y = df['Valor'].values
-    
+    # Calcular regresión lineal y predicciones
     try:
-        coeficientes = np.polyfit(X, y, 1)
-        predictor = np.poly1d(coeficientes)
+        resultado = prediccion.prediccionesDesdeResumen(datos, unidadTiempo, periodos, ponderada)
     except Exception as e:
         print(f"Error al calcular predicción: {e}")
         pausarConsola()
         return
 
-    # Generar predicciones
-    ultimaFecha = df['Fecha'].max()
-    ultimoDia = df['Dias'].max()
-    
+    for advertencia in resultado["advertencias"]:
+        print(advertencia)
+
     print("\nPredicciones:")
     print("-------------")
-    print(f"Última fecha registrada: {ultimaFecha.strftime('%d/%m/%Y')}")
-    print(f"Último valor registrado: {y[-1]:.2f}")
+    print(f"Última fecha registrada: {resultado['ultimaFecha'].strftime('%d/%m/%Y')}")
+    print(f"Último valor registrado: {resultado['ultimoValor']:.2f}")
     print("-------------")
     
-    timeDeltas = {
-        1: timedelta(days=1),
-        2: timedelta(weeks=1),
-        3: timedelta(days=30),
-        4: timedelta(days=365)
-    }
-    
-    #Se listan los nombres de las unidades
-    nombresUnidades = {1: "días", 2: "semanas", 3: "meses", 4: "años"}
-    delta = timeDeltas[unidadTiempo]
-    
-    for i in range(1, periodos+1):
-        fechaFutura = ultimaFecha + i * delta
-        diasFuturos = ultimoDia + (fechaFutura - ultimaFecha).days
-        valoresPrediccion = predictor(diasFuturos)
-        
-        print(f"{i} {nombresUnidades[unidadTiempo]}: {fechaFutura.strftime('%d/%m/%Y')} -> {valoresPrediccion:.2f}")
+    for fila in resultado["predicciones"].itertuples():
+        print(f"{fila.Periodo} {resultado['unidad']}: {fila.Fecha.strftime('%d/%m/%Y')} -> {fila.Valor:.2f}")
     
     pausarConsola()
 
@@ -663,8 +590,8 @@ def visualizarArchivo():
     # Mostrar datos
     rutaArchivo = obtenerRutaDatos() / archivoSeleccionado
     try:
-        df = pd.read_excel(rutaArchivo, usecols=["Fecha", "Valor"])
-        parametro = archivoSeleccionado.replace('DATOS_', '').replace('.xlsx', '').replace('_', ' ')
+        df = almacenamiento.leerSerie(rutaArchivo)
+        parametro = almacenamiento.obtenerNombreParametro(archivoSeleccionado)
         
         limpiarConsola()
         print("\n" + "="*40)
@@ -683,104 +610,34 @@ def visualizarArchivo():
 
 
 def obtenerValores(rutaDatos, archivos):
-    #Se define el diccionario de valores
-    valores = {}
-
-    #Extraemos el ultimo valor de cada archivo disponible
-    for archivo in archivos:
-        ruta = rutaDatos / archivo
-        df   = pd.read_excel(ruta)
-
-        if df.empty:
-            continue
-
-        ultimoValor = df["Valor"].iloc[-1]
-        if isinstance(ultimoValor, np.generic):
-            ultimoValor = ultimoValor.item()
-
-        nombreParam = archivo.replace("DATOS_", "").replace(".xlsx", "").replace("_", " ")
-        valores[nombreParam] = ultimoValor
-    
-    return valores
+    #Extraemos el ultimo valor válido (no anómalo) de cada archivo disponible desde el
+    #estado de la detección de anomalías, sin leer las series completas
+    return ica.ultimasLecturas(rutaDatos, archivos)
         
 
 def evaluarCalidadICA():
 
     #Se obtiene la ruta base
     rutaDatos = obtenerRutaDatos()
-    #Se crea una lista con los nombres de los archivos que terminan en xlsx en la carpeta Datos
-    archivos   = [f.name for f in rutaDatos.glob("*.xlsx")]
+    #Se crea una lista con los nombres de los archivos de datos en la carpeta Datos
+    archivos   = almacenamiento.listarArchivos(rutaDatos)
     #Se obtienen los valores
     valores = obtenerValores(rutaDatos, archivos)
     
-    #Definimos el diccionario de ponderaciones
-    ponderaciones = {
-        "pH": 0.11,
-        "Temperatura": 0.10,
-        "Turbidez": 0.08,
-        "Oxígeno Disuelto": 0.17,
-        "Conductividad": 0.07,
-        "Nitratos": 0.10,
-        "Fosfatos": 0.10,
-        "Coliformes Fecales": 0.12,
-        "Demanda Bioquímica de Oxígeno (DBO)": 0.10,
-        "Sólidos Totales Disueltos (TDS)": 0.05
-    }
-
-    #Definimos el diccionario de rangos ideales segun ica
-    rangosIdeales = {
-        "pH": (6.5, 8.5),
-        "Temperatura": (10, 25),
-        "Turbidez": (0, 5),
-        "Oxígeno Disuelto": (5, 12),
-        "Conductividad": (100, 1000),
-        "Nitratos": (0, 10),
-        "Fosfatos": (0, 0.1),
-        "Coliformes Fecales": (0, 200),
-        "Demanda Bioquímica de Oxígeno DBO": (0, 5),
-        "Sólidos Totales Disueltos TDS": (200, 500)
-    }
-
-    #Se definen la variables
-    icaTotal = 0
-    observaciones = []
+    #Se evalúan los valores con los mismos rangos y ponderaciones que usa el historial del ICA
+    evaluacion = ica.evaluarUltimasLecturas(valores)
+    icaTotal = evaluacion["ica"]
+    nivel = evaluacion["nivel"]
 
-    #Ciclo que recorre los valores de los parametros, evaluando la calidad de cada uno de ellos
-    for parametro, valor in valores.items():
-        #Si no existen parametros ideales registrados, pasa al siguiente item
-        if parametro not in rangosIdeales:
-            observaciones.append(f"{parametro} no se reconoce para ICA.")
-            continue
-
-        #Se desestructuran esos rangos ideales y se define el peso usando las ponderaciones
-        minVal, maxVal = rangosIdeales[parametro]
-        peso = ponderaciones.get(parametro, 0)
-
-        #Si el valor esta dentro del rango ideal, su puntaje es 100
-        if minVal <= valor <= maxVal:
-            indice = 100
-            observaciones.append(f"{parametro}\n   Rango ideal: {rangosIdeales[parametro]}\n   Valor actual: {valor}\n   Dentro del rango ✅\n")
+    #Se arman las observaciones de cada parametro
+    observaciones = []
+    for item in evaluacion["detalle"]:
+        if item["rango"] is None:
+            observaciones.append(f"{item['parametro']} no se reconoce para ICA.")
+        elif item["dentro"]:
+            observaciones.append(f"{item['parametro']}\n   Rango ideal: {item['rango']}\n   Valor actual: {item['valor']}\n   Dentro del rango ✅\n")
         else:
-            #Sino calcula su exeso
-            exceso = max(abs(valor - minVal), abs(valor - maxVal))
-            indice = max(0, 100 - exceso * 10)
-        
-        #Calcula el ica total
-        icaTotal += indice * peso
-
-        if not (minVal <= valor <= maxVal):
-            observaciones.append(f"{parametro}\n   Rango ideal: {rangosIdeales[parametro]}\n   Valor actual: {valor}\n   Fuera del rango ⚠️\n")
-        
-    if icaTotal >= 91:
-        nivel = "Excelente"
-    elif icaTotal >= 71:
-        nivel = "Buena"
-    elif icaTotal >= 51:
-        nivel = "Aceptable"
-    elif icaTotal >= 26:
-        nivel = "Mala"
-    else:
-        nivel = "Muy mala"
+            observaciones.append(f"{item['parametro']}\n   Rango ideal: {item['rango']}\n   Valor actual: {item['valor']}\n   Fuera del rango ⚠️\n")
 
     #Se le muestra al usuario los resultados de la evaluación
     print("==============================================")
@@ -797,96 +654,72 @@ def evaluarCalidadICA():
     pausarConsola()
 
 
+def analizarCorrelaciones():
+    #Muestra la correlación entre cada pareja de parámetros en las mismas fechas de muestreo,
+    #calculada sobre la tabla ancha del cuerpo de agua
+    tabla = tablaAncha.obtenerTabla(obtenerRutaDatos())
+    matriz = tablaAncha.correlaciones(tabla)
+    parejas = tablaAncha.parejasDestacadas(matriz, 0)
+
+    print("==============================================")
+    print("       Correlación entre parámetros")
+    print("==============================================\n")
+    print(f"Fechas de muestreo alineadas: {len(tabla)} (tolerancia {config.ica_tolerance_days} días)")
+    if not parejas:
+        print(f"\nNo hay parejas de parámetros con al menos {tablaAncha.LECTURAS_MINIMAS_CORRELACION} lecturas en común.")
+        pausarConsola()
+        return
+
+    print(f"\nParejas ordenadas por la fuerza de la relación (⚠️ |r| >= {tablaAncha.UMBRAL_CORRELACION}):")
+    for parametro, otro, coeficiente in parejas:
+        marca = " ⚠️" if abs(coeficiente) >= tablaAncha.UMBRAL_CORRELACION else ""
+        sentido = "directa" if coeficiente > 0 else "inversa"
+        print(f"- {parametro} / {otro}: r = {coeficiente:.2f} ({sentido}){marca}")
+
+    pausarConsola()
+
+
 def definirDiagramaPareto():
     #Se hace el analisis de pareto para los parametros
     
     #Se obtiene la ruta de los datos
     rutaDatos = obtenerRutaDatos()
-    #Se extrae en una lista los archivos que terminan en xlsx dentro de la carpeta Datos
-    archivos = [f.name for f in rutaDatos.glob("*.xlsx")]
+    #Se extrae en una lista los archivos de datos dentro de la carpeta Datos
+    archivos = almacenamiento.listarArchivos(rutaDatos)
     valores = obtenerValores(rutaDatos, archivos)
 
-    #Se definen los rangos ideales
-    rangosIdeales = {
-        "pH": (6.5, 8.5),
-        "Temperatura": (10, 25),
-        "Turbidez": (0, 5),
-        "Oxígeno Disuelto": (5, 12),
-        "Conductividad": (100, 1000),
-        "Nitratos": (0, 10),
-        "Fosfatos": (0, 0.1),
-        "Coliformes Fecales": (0, 200),
-        "Demanda Bioquímica de Oxígeno (DBO)": (0, 5),
-        "Sólidos Totales Disueltos (TDS)": (200, 500)
-    }
-
-    #Se define un diccionario
-    impactosNegativos = {}
-
-    #Ciclo en el que se calucla el ICA por parametro y luego se calcula el impacto negativo
-    for parametro, valor in valores.items():
-        if parametro not in rangosIdeales:
-            continue
-        
-        minVal, maxVal = rangosIdeales[parametro]
-        
-        # Calcular puntaje ICA del parámetro
-        if minVal <= valor <= maxVal:
-            puntaje = 100
-        else:
-            if valor < minVal:
-                exceso = minVal - valor
-            else:  # valor > maxVal
-                exceso = valor - maxVal
-
-            puntaje = max(0, 100 - exceso * 10)
-
-        # A menor puntaje, mayor impacto negativo (100 - puntaje)
-        impacto = 100 - puntaje
-        impactosNegativos[parametro] = impacto
-
-    # Ordenar de mayor a menor impacto
-    impactosOrdenados = dict(sorted(impactosNegativos.items(), key=lambda x: x[1], reverse=True))
+    # Impacto negativo (100 - puntaje ICA) por parametro, de mayor a menor
+    impactosOrdenados = ica.calcularImpactosNegativos(valores)
 
     #Damos formato a la grafica
     etiquetas = list(impactosOrdenados.keys())
     valoresGrafica = list(impactosOrdenados.values())
+    porcentajesAcumulados = ica.porcentajesAcumulados(impactosOrdenados)
 
-    #Calculamos el total
-    total = sum(valoresGrafica)
-    #Definimos el diccionario de porcentajes acumulados
-    porcentajesAcumulados = []
-    acumulado = 0
-    
-    #Se recorren los valore y se calcula el acumulado
-    for v in valoresGrafica:
-        acumulado += v
-        porcentaje = (acumulado / total) * 100 if total != 0 else 0
-        porcentajesAcumulados.append(porcentaje)
-
-    print(f"{parametro}: valor={valor:.2f}, puntaje ICA={puntaje:.2f}, impacto={impacto:.2f}")
+    for parametro, impacto in impactosOrdenados.items():
+        print(f"{parametro}: valor={valores[parametro]:.2f}, puntaje ICA={100 - impacto:.2f}, impacto={impacto:.2f}")
     # === Gráfico ===
-    fig, ax1 = plt.subplots()
-
-    ax1.bar(etiquetas, valoresGrafica, color='skyblue')
-    ax1.set_ylabel("Impacto negativo (100 - puntaje ICA)")
-    ax1.set_title("Diagrama de Pareto - Impacto negativo por parámetro")
-    ax1.tick_params(axis='x', rotation=45)
-
-    ax2 = ax1.twinx()
-    ax2.plot(etiquetas, porcentajesAcumulados, color="orange", marker="o", linestyle="-")
-    ax2.set_ylabel("% acumulado")
-    ax2.axhline(80, color='red', linestyle='--', linewidth=1)
-
-    plt.tight_layout()
+    #pyplot se carga solo cuando se va a graficar
+    import matplotlib.pyplot as plt
+    with medir("graficarPareto", filas=len(etiquetas)):
+        fig, ax1 = plt.subplots()
+
+        ax1.bar(etiquetas, valoresGrafica, color='skyblue')
+        ax1.set_ylabel("Impacto negativo (100 - puntaje ICA)")
+        ax1.set_title("Diagrama de Pareto - Impacto negativo por parámetro")
+        ax1.tick_params(axis='x', rotation=45)
+
+        ax2 = ax1.twinx()
+        ax2.plot(etiquetas, porcentajesAcumulados, color="orange", marker="o", linestyle="-")
+        ax2.set_ylabel("% acumulado")
+        ax2.axhline(80, color='red', linestyle='--', linewidth=1)
+
+        plt.tight_layout()
     plt.show()
+    plt.close(fig)
 
     # === Conclusiones ===
-    conclusiones = []
-    for i, porcentaje in enumerate(porcentajesAcumulados):
-        if porcentaje >= 80:
-            conclusiones = etiquetas[:i+1]
-            break
+    conclusiones = ica.principalesPareto(impactosOrdenados, 80)
 
     print("\nConclusiones 80/20:")
     print("Los siguientes parámetros representan aproximadamente el 80% del impacto negativo en la calidad del agua:")
@@ -923,7 +756,7 @@ def ejecutarOpcion1():
         limpiarConsola()
         mostrarMenuPrincipal()
         
-        opcion = seleccionarOpcion("Seleccione opción", 7)
+        opcion = seleccionarOpcion("Seleccione opción", 8)
         limpiarConsola()
         
         if opcion == 1:
@@ -939,6 +772,8 @@ def ejecutarOpcion1():
         elif opcion == 6:
             evaluarCalidadICA()
         elif opcion == 7:
+            analizarCorrelaciones()
+        elif opcion == 8:
             break
 
 if __name__ == "__main__":
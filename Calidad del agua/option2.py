@@ -5,21 +5,18 @@ Módulo: Generación y Visualización de Gráficas
 import os
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
 from config import config
+from consola import limpiarConsola, pausarConsola
+from metricas import medir
+#pyplot, almacenamiento (pandas) e ica (numpy) se importan dentro de las funciones que
+#los usan, para que listar y abrir gráficas guardadas no cargue esas librerías
 
-# ======================
-# Funciones de Utilidad
-# ======================
-
-def limpiarConsola():
-    #Limpia la pantalla de la consola 
-    os.system('cls')
+#Gráficas por página al visualizar las guardadas
+GRAFICAS_POR_PAGINA = 20
 
-def pausarConsola():
-    #Pausa la ejecución hasta que el usuario presione una tecla 
-    os.system("pause")
+#Versión del estilo de las gráficas: cambiarla cuando cambie cómo se dibujan (títulos,
+#marcadores, tamaño...) para que no se reutilicen imágenes con el estilo anterior
+VERSION_ESTILO = 1
 
 # ======================
 # Funciones del Menú
@@ -32,7 +29,10 @@ def mostrarMenuPrincipalGraficas():
     print("=================================")
     print("\n1. Crear nueva gráfica")
     print("2. Visualizar gráficas guardadas")
-    print("3. Volver al menú anterior")
+    print("3. Graficar historial del ICA")
+    print("4. Generar todas las gráficas del cuerpo de agua")
+    print("5. Depurar gráficas antiguas")
+    print("6. Volver al menú anterior")
 
 def mostrarMenuTipoGrafica():
     #Muestra los tipos de gráficas disponibles 
@@ -48,9 +48,16 @@ def mostrarMenuTipoGrafica():
 # Funciones de Gráficas
 # ======================
 
+#Tipos de gráficas: opción -> nombre de la carpeta en la que se guardan
+TIPOS_GRAFICA = {
+    1: "Barras",
+    2: "Dispersion",
+    3: "Lineal"
+}
+
 def obtenerRutaDatos():
     #Retorna la ruta a la carpeta de datos del cuerpo de agua activo 
-    return Path(f"CuerposDeAgua/{config.activeWaterBody}/Datos")
+    return Path("CuerposDeAgua") / config.activeWaterBody / config.data_folder
 
 def obtenerRutaGraficas(tipo=None):
     #Retorna la ruta a la carpeta de gráficas 
@@ -90,7 +97,8 @@ def crearGrafica(tipoGrafica):
         pausarConsola()
         return
 
-    archivos = [archivo.name for archivo in rutaDatos.glob("*.xlsx")]
+    import almacenamiento
+    archivos = almacenamiento.listarArchivos(rutaDatos)
     if not archivos:
         print("No hay archivos disponibles")
         pausarConsola()
@@ -101,38 +109,123 @@ def crearGrafica(tipoGrafica):
     if not archivoSeleccionado:
         return
 
+    if tipoGrafica not in TIPOS_GRAFICA:
+        print("Error: Tipo de gráfica inválido")
+        pausarConsola()
+        return
+
     # Leer datos
     rutaArchivo = rutaDatos / archivoSeleccionado
     try:
-        df = pd.read_excel(rutaArchivo)
-        # Convertir fechas a datetime para ordenamiento correcto
-        df['Fecha'] = pd.to_datetime(df['Fecha'], format='%d/%m/%y')
-        df = df.sort_values('Fecha')  # Ordenar por fecha
-        fechas = df['Fecha']
-        valores = df['Valor'].to_numpy()
+        df = almacenamiento.leerSerie(rutaArchivo)  # Las fechas ya vienen tipadas
     except Exception as e:
         print(f"Error al leer archivo: {e}")
         pausarConsola()
         return
 
-    # Configurar gráfico
-    fig, ax = plt.subplots(figsize=(10, 6))
-    nombreArchivo = archivoSeleccionado.replace(".xlsx", "")
+    # Preguntar si desea invertir el eje X (fechas)
+    invertir = input("\n¿Desea invertir el eje de fechas (mostrar más recientes primero)? (s/n): ").lower() == 's'
 
-    # Crear gráfico según tipo seleccionado
-    tipos = {
-        1: ("Barras", lambda: ax.bar(fechas, valores)),
-        2: ("Dispersion", lambda: ax.scatter(fechas, valores)),
-        3: ("Lineal", lambda: ax.plot(fechas, valores, marker='o'))
-    }
+    # Preguntar si desea superponer la media móvil
+    import estadisticasMoviles
+    ventanas = list(estadisticasMoviles.VENTANAS)
+    ventana = input(f"¿Superponer media móvil? ({'/'.join(ventanas)}, vacío para no): ").strip().lower()
+    mediaMovil = ventana if ventana in ventanas else None
 
-    if tipoGrafica not in tipos:
-        print("Error: Tipo de gráfica inválido")
-        pausarConsola()
-        return
+    rutaCompleta = generarGrafica(df, Path(archivoSeleccionado).stem, tipoGrafica, invertir,
+                                  obtenerRutaGraficas(TIPOS_GRAFICA[tipoGrafica]), mostrar=True, mediaMovil=mediaMovil)
+    print(f"\nGráfica guardada en: {rutaCompleta}")
+    pausarConsola()
 
-    nombreTipo, funcionGrafica = tipos[tipoGrafica]
-    funcionGrafica()
+def estiloGraficas(mediaMovil=None):
+    #Todo lo que, además de los datos, cambia la imagen: versión del estilo, densidad de puntos
+    #y media móvil superpuesta
+    estilo = f"{VERSION_ESTILO}/{config.chart_points_per_pixel}"
+    return f"{estilo}/media {mediaMovil}" if mediaMovil else estilo
+
+def generarGrafica(df, nombreArchivo, tipoGrafica, invertir, rutaGraficas, mostrar=False, reutilizar=True,
+                   mediaMovil=None):
+    #Dibuja la serie con el tipo indicado, la guarda en rutaGraficas y retorna la ruta de la imagen.
+    #mediaMovil (una ventana de estadisticasMoviles.VENTANAS) superpone la media móvil con una
+    #franja de ± una desviación estándar.
+    #Si ya hay una imagen de la serie con el mismo contenido, tipo, inversión y estilo, se retorna
+    #esa sin dibujar (reutilizar=False obliga a dibujarla de nuevo).
+    #La figura se cierra siempre, para que no se acumulen en memoria. Sin mostrar se dibuja sin
+    #pyplot (figuraSinVentana), así que no hace falta cambiar el backend del proceso
+    import catalogoGraficas
+    df = df.sort_values('Fecha')  # Ordenar por fecha
+    fechas = df['Fecha'].to_numpy()
+    valores = df['Valor'].to_numpy()
+    huella = catalogoGraficas.hashDatos(fechas, valores)
+
+    if reutilizar:
+        with medir("graficaEnCache", filas=len(df)):
+            rutaCompleta = catalogoGraficas.buscarGrafica(rutaGraficas, nombreArchivo, huella, invertir,
+                                                          estiloGraficas(mediaMovil))
+        if rutaCompleta is not None:
+            if mostrar:
+                mostrarImagen(rutaCompleta)
+            return rutaCompleta
+
+    with medir("graficar", filas=len(df)):
+        return _dibujarGrafica(fechas, valores, huella, nombreArchivo, tipoGrafica, invertir, rutaGraficas, mostrar,
+                               mediaMovil)
+
+def mostrarImagen(rutaImagen):
+    #Muestra en una ventana una gráfica ya guardada
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.imshow(plt.imread(rutaImagen))
+    ax.axis("off")
+    fig.tight_layout()
+    plt.show()
+    plt.close(fig)
+
+def figuraSinVentana(figsize=(10, 6)):
+    #Figura que se dibuja con Agg sin pasar por pyplot: no cambia el backend del proceso
+    #(la sesión interactiva sigue pudiendo mostrar ventanas) y no queda registrada en pyplot
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
+def _dibujarGrafica(fechas, valores, huella, nombreArchivo, tipoGrafica, invertir, rutaGraficas, mostrar,
+                    mediaMovil=None):
+    import reduccion
+    import catalogoGraficas
+    datosGraficados = (fechas, valores)
+
+    # Configurar gráfico; solo se usa pyplot si hay que mostrar la ventana
+    if mostrar:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(10, 6))
+    else:
+        fig, ax = figuraSinVentana()
+
+    # Reducir las series largas a los puntos que caben en el ancho de la figura
+    barras = tipoGrafica == 1
+    fechas, valores = reduccion.reducirSerie(fechas, valores, reduccion.puntosObjetivo(fig, barras), barras)
+
+    # Crear gráfico según tipo seleccionado
+    if tipoGrafica == 1:
+        ax.bar(fechas, valores)
+    elif tipoGrafica == 2:
+        ax.scatter(fechas, valores)
+    else:
+        ax.plot(fechas, valores, marker='o')
+
+    # Superponer la media móvil, calculada con todas las lecturas y reducida como la serie
+    if mediaMovil and len(datosGraficados[1]):
+        import estadisticasMoviles
+        fechasMedia, valoresMedia = datosGraficados
+        media, desviacion = estadisticasMoviles.mediaDesviacion(
+            fechasMedia, valoresMedia, estadisticasMoviles.VENTANAS[mediaMovil])
+        indices = reduccion.lttb(fechasMedia, media, reduccion.puntosObjetivo(fig))
+        ax.plot(fechasMedia[indices], media[indices], color="darkorange", label=f"Media móvil {mediaMovil}")
+        ax.fill_between(fechasMedia[indices], (media - desviacion)[indices], (media + desviacion)[indices],
+                        color="darkorange", alpha=0.2, label="± 1 desviación")
+        ax.legend()
 
     # Configuración del gráfico
     ax.set_title(nombreArchivo)
@@ -141,31 +234,107 @@ def crearGrafica(tipoGrafica):
     ax.grid(True)
     
     # Formatear fechas para mejor visualización
-    plt.xticks(rotation=45)
+    ax.tick_params(axis='x', rotation=45)
     fig.autofmt_xdate()
     
-    # Preguntar si desea invertir el eje X (fechas)
-    invertir = input("\n¿Desea invertir el eje de fechas (mostrar más recientes primero)? (s/n): ").lower()
-    if invertir == 's':
+    if invertir:
         ax.invert_xaxis()
 
     # Guardar gráfico
-    rutaGraficas = obtenerRutaGraficas(nombreTipo)
+    rutaGraficas = Path(rutaGraficas)
     rutaGraficas.mkdir(parents=True, exist_ok=True)
 
     timestamp = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
     nombreGrafica = f"{nombreArchivo}-{timestamp}.png"
     rutaCompleta = rutaGraficas / nombreGrafica
 
-    plt.tight_layout()  # Ajustar layout para que no se corten las etiquetas
+    try:
+        fig.tight_layout()  # Ajustar layout para que no se corten las etiquetas
+        fig.savefig(rutaCompleta)
+        catalogoGraficas.registrarGrafica(rutaCompleta, nombreArchivo, *datosGraficados, invertida=invertir,
+                                          huella=huella, estilo=estiloGraficas(mediaMovil))
+        if mostrar:
+            plt.show()
+    finally:
+        if mostrar:
+            plt.close(fig)
+    return rutaCompleta
+    
+    
+def graficarHistorialICA():
+    #Grafica el ICA de cada fecha de muestreo con las franjas de nivel de calidad
+    if not config.activeWaterBody:
+        print("Error: No hay cuerpo de agua seleccionado")
+        pausarConsola()
+        return
+
+    import matplotlib.pyplot as plt
+    import ica
+    import reduccion
+    import catalogoGraficas
+    try:
+        historial = ica.calcularHistorialICA(obtenerRutaDatos())
+    except Exception as e:
+        print(f"Error al calcular el historial del ICA: {e}")
+        pausarConsola()
+        return
+
+    if historial.empty:
+        print("No hay datos disponibles.")
+        pausarConsola()
+        return
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    fechas, valores = reduccion.reducirSerie(historial["Fecha"].to_numpy(), historial["ICA"].to_numpy(),
+                                             reduccion.puntosObjetivo(fig))
+    ax.plot(fechas, valores, color="navy")
+
+    # Franjas de los niveles de calidad
+    limites = [0, *ica.UMBRALES_NIVEL, 100]
+    colores = ["red", "orange", "yellow", "yellowgreen", "green"]
+    for inferior, superior, color, nivel in zip(limites, limites[1:], colores, ica.NIVELES):
+        ax.axhspan(inferior, superior, color=color, alpha=0.15, label=nivel)
+
+    ax.set_ylim(0, 100)
+    ax.set_title(f"Historial del ICA - {config.activeWaterBody}")
+    ax.set_xlabel("Fecha")
+    ax.set_ylabel("ICA (%)")
+    ax.legend(loc="lower left")
+    ax.grid(True)
+    fig.autofmt_xdate()
+
+    # Guardar gráfico
+    rutaGraficas = obtenerRutaGraficas("ICA")
+    rutaGraficas.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
+    rutaCompleta = rutaGraficas / f"Historial_ICA-{timestamp}.png"
+
+    plt.tight_layout()
     plt.savefig(rutaCompleta)
+    catalogoGraficas.registrarGrafica(rutaCompleta, "Historial_ICA",
+                                      historial["Fecha"].to_numpy(), historial["ICA"].to_numpy())
     plt.show()
-    print(f"\nGráfica guardada en: {rutaCompleta}")
+    plt.close(fig)
+
+    ultimo = historial.iloc[-1]
+    print(f"\nÚltimo ICA ({ultimo['Fecha'].strftime('%d/%m/%y')}): {ultimo['ICA']:.2f}% - {ultimo['Nivel']}")
+    print(f"Gráfica guardada en: {rutaCompleta}")
     pausarConsola()
-    
-    
+
+def generarTodasGraficas():
+    #Genera las gráficas de barras, dispersión y línea de todos los parámetros en paralelo
+    if not config.activeWaterBody:
+        print("Error: No hay cuerpo de agua seleccionado")
+        pausarConsola()
+        return
+
+    import graficasLote
+    graficasLote.ejecutarGraficasLote([obtenerRutaDatos().parent])
+    pausarConsola()
+
 def visualizarGraficas():
-    #Muestra las gráficas guardadas y permite visualizarlas 
+    #Muestra las gráficas guardadas por páginas, con filtro por parámetro, y permite abrirlas.
+    #El listado sale del catálogo (Graficas/catalogo.db), sin recorrer las carpetas
     if not config.activeWaterBody:
         print("Error: No hay cuerpo de agua seleccionado")
         pausarConsola()
@@ -177,23 +346,23 @@ def visualizarGraficas():
         pausarConsola()
         return
 
-    # Listar tipos de gráficas disponibles
-    carpetas = [carpeta for carpeta in rutaBase.iterdir() if carpeta.is_dir()]
-    if not carpetas:
+    import catalogoGraficas
+    tipos = catalogoGraficas.tiposDisponibles(rutaBase)
+    if not tipos:
         print("No hay gráficas guardadas")
         pausarConsola()
         return
 
     print("\nTipos de gráficas disponibles:")
-    for i, carpeta in enumerate(carpetas, 1):
-        print(f"{i}. {carpeta.name}")
+    for i, (tipo, cantidad) in enumerate(tipos, 1):
+        print(f"{i}. {tipo} ({cantidad})")
 
     # Seleccionar tipo de gráfica
     try:
         opcion = int(input("\nSeleccione tipo (0 para cancelar): "))
         if opcion == 0:
             return
-        if not 1 <= opcion <= len(carpetas):
+        if not 1 <= opcion <= len(tipos):
             print("Error: Opción inválida")
             pausarConsola()
             return
@@ -202,34 +371,71 @@ def visualizarGraficas():
         pausarConsola()
         return
 
-    carpetaSeleccionada = carpetas[opcion - 1]
-    graficas = list(carpetaSeleccionada.glob("*.png"))
+    tipoSeleccionado = tipos[opcion - 1][0]
+    filtro = input("Filtrar por parámetro (vacío para todos): ").strip()
 
-    # Ordenar por fecha de modificación (más reciente primero)
-    graficas.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+    # Mostrar gráficas por páginas, las más recientes primero
+    pagina = 1
+    while True:
+        graficas, total = catalogoGraficas.listarGraficas(rutaBase, tipoSeleccionado, filtro, pagina, GRAFICAS_POR_PAGINA)
+        if not total:
+            print(f"No hay gráficas en {tipoSeleccionado}")
+            pausarConsola()
+            return
+        paginas = -(-total // GRAFICAS_POR_PAGINA)
 
-    if not graficas:
-        print(f"No hay gráficas en {carpetaSeleccionada.name}")
+        limpiarConsola()
+        print(f"\nGráficas en {tipoSeleccionado} (página {pagina} de {paginas}, {total} en total):")
+        for i, grafica in enumerate(graficas, 1):
+            rango = f"  [{grafica['desde'][:10]} a {grafica['hasta'][:10]}]" if grafica["desde"] else ""
+            print(f"{i}. {Path(grafica['ruta']).name}{rango}")
+
+        # Seleccionar gráfica para visualizar o cambiar de página
+        opcion = input("\nSeleccione gráfica, 's' siguiente página, 'a' anterior (0 para cancelar): ").strip().lower()
+        if opcion == "0":
+            return
+        if opcion == "s" and pagina < paginas:
+            pagina += 1
+        elif opcion == "a" and pagina > 1:
+            pagina -= 1
+        elif opcion.isdigit() and 1 <= int(opcion) <= len(graficas):
+            os.startfile(graficas[int(opcion) - 1]["rutaCompleta"])  # Abre con visor predeterminado
+            break
+        else:
+            print("Error: Opción inválida")
+            pausarConsola()
+
+    pausarConsola()
+
+def depurarGraficas():
+    #Elimina las gráficas antiguas y conserva las más recientes de cada parámetro y tipo
+    if not config.activeWaterBody:
+        print("Error: No hay cuerpo de agua seleccionado")
+        pausarConsola()
+        return
+
+    rutaBase = obtenerRutaGraficas()
+    if not rutaBase.exists():
+        print("No hay gráficas guardadas")
         pausarConsola()
         return
 
-    # Mostrar gráficas disponibles
-    print(f"\nGráficas disponibles en {carpetaSeleccionada.name}:")
-    for i, grafica in enumerate(graficas, 1):
-        print(f"{i}. {grafica.name}")
-    # Seleccionar gráfica para visualizar
+    import catalogoGraficas
     try:
-        opcion = int(input("\nSeleccione gráfica (0 para cancelar): "))
-        if opcion == 0:
+        conservar = int(input("¿Cuántas gráficas recientes conservar por parámetro y tipo?: "))
+        if conservar < 0:
+            print("Error: Debe ser un número positivo")
+            pausarConsola()
             return
-        if 1 <= opcion <= len(graficas):
-            graficaSeleccionada = graficas[opcion-1]
-            os.startfile(graficaSeleccionada)  # Abre con visor predeterminado
-        else:
-            print("Error: Opción inválida")
     except ValueError:
         print("Error: Ingrese un número válido")
-    
+        pausarConsola()
+        return
+
+    if input("Se eliminarán las demás gráficas. ¿Continuar? (s/n): ").lower() != 's':
+        return
+    eliminadas = catalogoGraficas.podarGraficas(rutaBase, conservar=conservar)
+    print(f"\nSe eliminaron {eliminadas} gráficas.")
     pausarConsola()
 
 # ======================
@@ -272,6 +478,12 @@ def ejecutarOpcion2():
             elif opcion == 2:
                 visualizarGraficas()
             elif opcion == 3:
+                graficarHistorialICA()
+            elif opcion == 4:
+                generarTodasGraficas()
+            elif opcion == 5:
+                depurarGraficas()
+            elif opcion == 6:
                 break
             else:
                 print("Error: Opción inválida")
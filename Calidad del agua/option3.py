@@ -3,14 +3,8 @@ from config import config
 import os
 from pathlib import Path
 from datetime import datetime, timedelta
-
-def limpiarConsola():
-    #Limpia la pantalla de la consola 
-    os.system('cls')
-
-def pausarConsola():
-    #Pausa la ejecución hasta que el usuario presione una tecla 
-    os.system("pause")
+from consola import limpiarConsola, pausarConsola
+from metricas import medir, instrumentar
 
 def menuReportes():
     #Muestra el menú principal de evaluación de calidad 
@@ -22,7 +16,9 @@ def menuReportes():
     print('2. Mostrar reportes existentes.')
     print('3. Editar un reporte.')
     print("4. Eliminar un reporte.")
-    print('5. Volver al menu anterior.')
+    print("5. Buscar reportes.")
+    print("6. Generar reporte automático.")
+    print('7. Volver al menu anterior.')
 
 
 def obtenerRuta(nombreArchivo):
@@ -34,16 +30,27 @@ def obtenerRuta(nombreArchivo):
 
 def crearReportes():
     titulo = input("Ingresa titulo del reporte: ")
+    texto = input("Ingresa el contenido del reporte: ")
+    guardarReporte(titulo, texto)
+    print(f"\nReporte guardado.")
+
+@instrumentar("guardarReporte")
+def guardarReporte(titulo, texto, rutaReportes=None):
+    #Guarda un reporte como Reporte_<titulo>_<fecha>.txt y retorna su ruta.
+    #Sin rutaReportes se usa la carpeta de reportes del cuerpo activo
     fechaActual = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
     nombreArchivo = "Reporte_" + titulo + "_" + fechaActual + ".txt"
-    ruta = obtenerRuta(nombreArchivo)
+    ruta = Path(rutaReportes) / nombreArchivo if rutaReportes else obtenerRuta(nombreArchivo)
     ruta.parent.mkdir(parents=True, exist_ok=True)
-    texto = input("Ingresa el contenido del reporte: ")
     contenido = titulo + "\n" + texto
     with open(ruta, "w") as archivo:
         archivo.write(contenido)
-    print(f"\nReporte guardado.")
+    #El índice de búsqueda se pone al día con este reporte sin revisar los demás
+    import busqueda
+    busqueda.indexarReporte(ruta)
+    return ruta
 
+@instrumentar("listarReportes", filas=lambda lista: len(lista or []))
 def listarArchivosDisponibles():
     #Lista los archivos Excel disponibles en la carpeta de datos 
     rutaDatos = obtenerRuta("")
@@ -65,9 +72,10 @@ def mostrarReportes():
             break
         elif(op <= len(listaReportes)):
             ruta = obtenerRuta(listaReportes[op-1])
-            with open(ruta, "r") as archivo:
-                contenido = archivo.read()
-                print(contenido)
+            with medir("leerReporte", bytes=ruta.stat().st_size):
+                with open(ruta, "r") as archivo:
+                    contenido = archivo.read()
+            print(contenido)
             break
         else:
             print("Error: Opción invalida.")
@@ -87,6 +95,9 @@ def editarReportes():
         elif(op <= len(listaReportes)):
             ruta = obtenerRuta(listaReportes[op-1])
             os.startfile(ruta)
+            #El reporte se edita fuera del sistema: la búsqueda lo revisa en cada consulta
+            import busqueda
+            busqueda.vigilarReporte(ruta)
             break
         else:
             print("Error: Opción invalida.")
@@ -123,6 +134,70 @@ def eliminarReportes():
 
 
 
+def pedirFecha(mensaje):
+    #Fecha opcional para filtrar la búsqueda; vacía retorna None
+    from almacenamiento import convertirFecha
+    while True:
+        texto = input(mensaje).strip()
+        if not texto:
+            return None
+        try:
+            return convertirFecha(texto)
+        except ValueError as e:
+            print(f"Error: {e}")
+
+
+def buscarReportes():
+    #Búsqueda por palabras en los reportes del cuerpo activo o de todos
+    import busqueda
+    limpiarConsola()
+    consulta = input("Palabras a buscar (vacío para listar por fecha): ")
+    todos = input("¿Buscar en todos los cuerpos de agua? (s/n): ").lower() == 's'
+    desde = pedirFecha("Desde (dd/mm/aa, vacío para no filtrar): ")
+    hasta = pedirFecha("Hasta (dd/mm/aa, vacío para no filtrar): ")
+
+    resultados = busqueda.buscarReportes(consulta, None if todos else config.activeWaterBody, desde, hasta)
+    if not resultados:
+        print("\nNo se encontraron reportes.")
+        return
+
+    print(f"\nReportes encontrados ({len(resultados)}):")
+    for i, resultado in enumerate(resultados, start=1):
+        cuerpo = f"[{resultado['cuerpo']}] " if todos else ""
+        print(f"{i}. {cuerpo}{resultado['titulo']} ({resultado['fecha'].strftime('%d/%m/%y %H:%M')})")
+        if resultado["fragmento"]:
+            print(f"     {resultado['fragmento']}")
+
+    while True:
+        op = int(input("\nIngresa el numero del reporte (0 para cancelar): "))
+        if(op == 0):
+            break
+        elif(op <= len(resultados)):
+            ruta = resultados[op-1]["ruta"]
+            with medir("leerReporte", bytes=ruta.stat().st_size):
+                with open(ruta, "r") as archivo:
+                    contenido = archivo.read()
+            print(contenido)
+            break
+        else:
+            print("Error: Opción invalida.")
+
+
+def generarReporteAutomatico():
+    #Reporte a partir de los datos (lecturas, ICA, Pareto, predicción y gráficas)
+    #del cuerpo activo o, en paralelo, de todos los cuerpos de agua
+    import lote
+    import reportesAutomaticos
+    limpiarConsola()
+    titulo = input("Título del reporte (vacío para el título por defecto): ").strip() or None
+    if input("¿Generar para todos los cuerpos de agua? (s/n): ").lower() == 's':
+        cuerpos = lote.listarCuerposAgua()
+    else:
+        cuerpos = [Path("CuerposDeAgua") / config.activeWaterBody]
+    for ruta in reportesAutomaticos.ejecutarReportes(cuerpos, titulo):
+        print(f"Reporte guardado en: {ruta}")
+
+
 def ejecutarOpcion3():
     while True:
         menuReportes()
@@ -136,6 +211,10 @@ def ejecutarOpcion3():
         elif op == 4:
             eliminarReportes()
         elif op == 5:
+            buscarReportes()
+        elif op == 6:
+            generarReporteAutomatico()
+        elif op == 7:
             break
         else:
             print("Error: Opción invalida.")
@@ -0,0 +1,102 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Parámetros de Calidad
+
+Fuente única de los parámetros que reconoce el sistema: ponderación en el ICA,
+unidades, rango normal, cambio máximo creíble por hora (para detectar lecturas
+anómalas al ingresarlas), descripción y recomendación. El motor del ICA compila
+este diccionario en arreglos alineados (ica.REGISTRO).
+"""
+import re
+#========================
+#Fin de las importaciones (re)
+
+#Lista de parametros de calidad, con su ponderación en el ICA y su correspondiente unidad, rango, descripción y recomendación segun el ICA
+PARAMETROS_CALIDAD = {
+    "pH": {
+        "ponderacion": 0.11,
+        "unidades": "unidades",
+        "rango_normal": (6.5, 8.5),
+        "cambio_maximo": 1.0,
+        "descripcion": "Medida de acidez o alcalinidad. Valores extremos afectan la vida acuática.",
+        "recomendacion": "Ajustar el pH con agentes acidificantes o alcalinizantes según el desbalance detectado."
+    },
+    "Temperatura": {
+        "ponderacion": 0.10,
+        "unidades": "°C",
+        "rango_normal": (10, 25),
+        "cambio_maximo": 3,
+        "descripcion": "Temperatura favorable para organismos acuáticos y oxígeno disuelto.",
+        "recomendacion": "Controlar fuentes de calor o frío, evitar descargas térmicas industriales."
+    },
+    "Turbidez": {
+        "ponderacion": 0.08,
+        "unidades": "NTU",
+        "rango_normal": (0, 5),
+        "cambio_maximo": 50,
+        "descripcion": "Medida de claridad del agua. Alta turbidez puede indicar contaminación por sedimentos o residuos.",
+        "recomendacion": "Implementar filtración y control de escorrentías para reducir partículas suspendidas."
+    },
+    "Oxígeno Disuelto": {
+        "ponderacion": 0.17,
+        "unidades": "mg/L",
+        "rango_normal": (5, 12),
+        "cambio_maximo": 4,
+        "descripcion": "Esencial para la vida acuática. Niveles bajos indican contaminación orgánica.",
+        "recomendacion": "Mejorar la aireación del agua e identificar fuentes de materia orgánica para reducir su entrada."
+    },
+    "Conductividad": {
+        "ponderacion": 0.07,
+        "unidades": "µS/cm",
+        "rango_normal": (100, 1000),
+        "cambio_maximo": 300,
+        "descripcion": "Mide la cantidad de sales y minerales disueltos en el agua.",
+        "recomendacion": "Revisar descargas de aguas industriales y actividades agrícolas cercanas."
+    },
+    "Nitratos": {
+        "ponderacion": 0.10,
+        "unidades": "mg/L",
+        "rango_normal": (0, 10),
+        "cambio_maximo": 10,
+        "descripcion": "Provienen de fertilizantes y aguas residuales. Contribuyen a la eutrofización.",
+        "recomendacion": "Reducir el uso de fertilizantes y controlar fuentes de aguas residuales domésticas y agrícolas."
+    },
+    "Fosfatos": {
+        "ponderacion": 0.10,
+        "unidades": "mg/L",
+        "rango_normal": (0, 0.1),
+        "cambio_maximo": 1,
+        "descripcion": "Nutriente que en exceso promueve el crecimiento de algas nocivas.",
+        "recomendacion": "Limitar el uso de detergentes y fertilizantes con fósforo, y mejorar el tratamiento de aguas residuales."
+    },
+    "Coliformes Fecales": {
+        "ponderacion": 0.12,
+        "unidades": "UFC/100 mL",
+        "rango_normal": (0, 200),
+        "descripcion": "Indicador de contaminación biológica por desechos fecales.",
+        "recomendacion": "Identificar y eliminar fuentes de contaminación fecal. Tratar el agua con desinfección (cloración o UV)."
+    },
+    "Demanda Bioquímica de Oxígeno DBO": {
+        "ponderacion": 0.10,
+        "unidades": "mg/L",
+        "rango_normal": (0, 5),
+        "cambio_maximo": 10,
+        "descripcion": "Cantidad de oxígeno requerida para descomponer materia orgánica en el agua.",
+        "recomendacion": "Reducir la descarga de materia orgánica y mejorar el tratamiento de aguas residuales."
+    },
+    "Sólidos Totales Disueltos TDS": {
+        "ponderacion": 0.05,
+        "unidades": "mg/L",
+        "rango_normal": (200, 500),
+        "cambio_maximo": 200,
+        "descripcion": "Concentración total de sustancias disueltas. Valores altos afectan el sabor y uso del agua.",
+        "recomendacion": "Filtrar el agua y controlar la fuente de contaminantes disueltos, como fertilizantes o aguas industriales."
+    }
+}
+
+
+def claveParametro(nombre):
+    #Forma canónica de un nombre de parámetro. Hace coincidir las variantes que
+    #aparecen en el sistema: "Demanda Bioquímica de Oxígeno (DBO)", la derivada del
+    #archivo "Demanda Bioquímica de Oxígeno DBO" y la del propio archivo con guiones bajos
+    return " ".join(re.sub(r"[()_]", " ", nombre).split()).casefold()
@@ -0,0 +1,93 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Predicción de Parámetros
+
+Cálculo de las predicciones por regresión lineal, separado de la pantalla de
+option1 para que también se pueda usar desde la línea de comandos. La recta se
+obtiene de las sumas del módulo regresion, que el índice de resumen mantiene al
+día, así que predecir no requiere leer la serie.
+"""
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from config import config
+import regresion
+from metricas import instrumentar
+#========================
+#Fin de las importaciones (datetime, numpy, pandas)
+
+#Unidades de tiempo disponibles: opción -> (nombre, duración de un período)
+UNIDADES_TIEMPO = {
+    1: ("días", timedelta(days=1)),
+    2: ("semanas", timedelta(weeks=1)),
+    3: ("meses", timedelta(days=30)),
+    4: ("años", timedelta(days=365))
+}
+
+#Días sin datos a partir de los cuales se advierte de un salto temporal
+UMBRAL_SALTO_DIAS = 30
+
+
+def calcularPredicciones(df, unidadTiempo, periodos, ponderada=False):
+    #Ajusta una recta a la serie y predice los períodos indicados.
+    #Retorna un diccionario con la última fecha y valor, las advertencias
+    #y un DataFrame de predicciones (Periodo, Fecha, Valor)
+    if len(df) < 2:
+        raise ValueError("Se necesitan al menos dos registros para predecir")
+
+    advertencias = []
+    if not df['Fecha'].is_monotonic_increasing:
+        advertencias.append("¡Advertencia! Datos reordenados cronológicamente")
+        df = df.sort_values('Fecha')
+
+    resumenSerie = {
+        "ultimaFecha": df['Fecha'].iloc[-1],
+        "ultimoValor": float(df['Valor'].iloc[-1]),
+        "regresion": regresion.calcularEstadisticas(df),
+        "regresionPonderada": regresion.calcularPonderadas(df, config.forecast_half_life_days) if ponderada else None
+    }
+    resultado = prediccionesDesdeResumen(resumenSerie, unidadTiempo, periodos, ponderada)
+    resultado["advertencias"] = advertencias + resultado["advertencias"]
+    return resultado
+
+@instrumentar("ajustar")
+def prediccionesDesdeResumen(resumenSerie, unidadTiempo, periodos, ponderada=False):
+    #Predicción a partir del resumen de la serie (módulo resumen), sin leer sus datos:
+    #la recta sale de las sumas guardadas en "regresion" o "regresionPonderada"
+    if unidadTiempo not in UNIDADES_TIEMPO:
+        raise ValueError("La unidad de tiempo debe ser 1-4")
+    if periodos <= 0:
+        raise ValueError("La cantidad de períodos debe ser un número positivo")
+    estadisticas = resumenSerie["regresion"] if resumenSerie else None
+    if not estadisticas or estadisticas["n"] < 2:
+        raise ValueError("Se necesitan al menos dos registros para predecir")
+
+    # Detección de gaps
+    advertencias = []
+    if estadisticas["saltoMaximo"] > UMBRAL_SALTO_DIAS:
+        advertencias.append(f"Advertencia: Saltos temporales >{UMBRAL_SALTO_DIAS} días detectados (Máx: {estadisticas['saltoMaximo']:.0f} días)")
+
+    # Recta de mínimos cuadrados a partir de las sumas
+    if ponderada:
+        estadisticas = resumenSerie.get("regresionPonderada") or estadisticas
+    pendiente, intercepto = regresion.ajustarRecta(estadisticas)
+
+    # Generar predicciones para todos los períodos de una vez
+    xUltimo = resumenSerie["regresion"]["xMaximo"]
+    nombreUnidad, delta = UNIDADES_TIEMPO[unidadTiempo]
+    periodosFuturos = np.arange(1, periodos + 1)
+    diasFuturos = xUltimo + periodosFuturos * delta.days
+    ultimaFecha = regresion.fechaDesdeDias(xUltimo)
+
+    return {
+        "ultimaFecha": pd.Timestamp(resumenSerie["ultimaFecha"]),
+        "ultimoValor": float(resumenSerie["ultimoValor"]),
+        "unidad": nombreUnidad,
+        "ponderada": ponderada,
+        "advertencias": advertencias,
+        "predicciones": pd.DataFrame({
+            "Periodo": periodosFuturos,
+            "Fecha": ultimaFecha + pd.to_timedelta(periodosFuturos * delta.days, unit="D"),
+            "Valor": pendiente * diasFuturos + intercepto
+        })
+    }
@@ -0,0 +1,265 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Pronóstico por Lotes de Todas las Series
+
+Ajusta de una sola vez, con NumPy, todos los parámetros de todos los cuerpos
+de agua. Las lecturas de todas las series se apilan en un solo arreglo plano,
+ordenado por (serie, fecha), con el inicio de cada serie; no se rellena nada,
+así que la memoria depende de las lecturas y no de la serie más larga. Cada
+modelo se resuelve para todas las series a la vez:
+
+    lineal      recta de mínimos cuadrados
+    armonico    recta más términos seno/coseno del ciclo anual, resueltos como
+                mínimos cuadrados apilados (ecuaciones normales por lotes)
+    estacional  ingenuo estacional: el valor de la misma fecha del año anterior;
+                si la serie no cubre un año se usa la última lectura
+
+Los horizontes usan las mismas unidades (días, semanas, meses, años) que la
+pantalla de predicciones.
+
+Uso (desde la raíz del proyecto):
+    python "Calidad del agua/pronostico.py" [--unidad meses] [--periodos 6] [--modelos lineal armonico]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import config
+import almacenamiento
+import regresion
+from prediccion import UNIDADES_TIEMPO
+from metricas import instrumentar
+#========================
+#Fin de las importaciones (sys, time, argparse, pathlib, datetime, numpy, pandas)
+
+#Modelos disponibles, en el orden en que aparecen en las tablas
+MODELOS = ("lineal", "armonico", "estacional")
+
+#Duración del ciclo estacional en días
+PERIODO_ANUAL = 365.25
+
+#Cantidad de armónicos del ciclo anual en el modelo armónico
+ARMONICOS = 2
+
+#Regularización de los términos armónicos. Evita sistemas singulares cuando la
+#serie cubre menos de un ciclo y los términos armónicos se confunden con la recta
+REGULARIZACION = 1e-3
+
+#Antigüedad máxima, en días, de la lectura que usa el modelo estacional
+TOLERANCIA_ESTACIONAL = 31
+
+#Lecturas por bloque al acumular las ecuaciones normales; acota la matriz de diseño en memoria
+LECTURAS_POR_BLOQUE = 1_000_000
+
+# ======================
+# Apilado de Series
+# ======================
+
+def cargarSeries(cuerpos):
+    #Lee todas las series de los cuerpos indicados: lista de (cuerpo, parametro, DataFrame)
+    series = []
+    for rutaCuerpo in cuerpos:
+        rutaDatos = Path(rutaCuerpo) / config.data_folder
+        for archivo in almacenamiento.listarArchivos(rutaDatos):
+            df = almacenamiento.leerSerie(rutaDatos / archivo)
+            series.append((Path(rutaCuerpo).name, almacenamiento.obtenerNombreParametro(archivo), df))
+    return series
+
+def apilarSeries(dataframes):
+    #Apila las lecturas válidas de todas las series en arreglos planos ordenados por (serie, fecha).
+    #Retorna (serie de cada lectura, x en días desde la época, valores, inicio de cada serie,
+    #cantidad de lecturas de cada serie). Todas se convierten y ordenan juntas, en un solo arreglo
+    largos = np.array([len(df) for df in dataframes], dtype=np.int64)
+    filas = np.repeat(np.arange(len(dataframes)), largos)
+    xs = regresion.diasDesdeEpoca(np.concatenate([df["Fecha"].to_numpy() for df in dataframes]))
+    ys = np.concatenate([df["Valor"].to_numpy(dtype="float64") for df in dataframes])
+    validos = ~np.isnan(ys)
+    filas, xs, ys = filas[validos], xs[validos], ys[validos]
+    orden = np.lexsort((xs, filas))
+    filas, xs, ys = filas[orden], xs[orden], ys[orden]
+
+    cantidades = np.bincount(filas, minlength=len(dataframes))
+    inicios = np.concatenate([[0], np.cumsum(cantidades)[:-1]])
+    return filas, xs, ys, inicios, cantidades
+
+def ultimasPosiciones(inicios, cantidades):
+    #Posición en el arreglo plano de la última lectura de cada serie (0 en las vacías)
+    return np.maximum(inicios + cantidades - 1, 0)
+
+# ======================
+# Mínimos Cuadrados Apilados
+# ======================
+
+def disenoArmonico(x, referencia, armonicos):
+    #Matriz de diseño (puntos x términos, con x de cualquier forma): constante, tiempo en
+    #años desde la referencia (ya alineada con x) y, por cada armónico, seno y coseno del ciclo anual
+    diseno = np.empty((*x.shape, 2 + 2 * armonicos))
+    diseno[..., 0] = 1.0
+    np.divide(x - referencia, PERIODO_ANUAL, out=diseno[..., 1])
+    for k in range(1, armonicos + 1):
+        angulo = (2 * np.pi * k / PERIODO_ANUAL) * x
+        np.sin(angulo, out=diseno[..., 2 * k])
+        np.cos(angulo, out=diseno[..., 2 * k + 1])
+    return diseno
+
+def resolverApilado(apilado, referencia, armonicos):
+    #Resuelve por lotes las ecuaciones normales (XᵀX + λI) b = Xᵀy de cada serie. XᵀX y Xᵀy
+    #se acumulan por serie con bincount sobre las lecturas reales, por bloques de lecturas.
+    #Retorna los coeficientes (series x términos); NaN si la serie tiene menos puntos que términos
+    filas, x, y, inicios, cantidades = apilado
+    series = len(inicios)
+    terminos = 2 + 2 * armonicos
+    pares = [(a, b) for a in range(terminos) for b in range(a, terminos)]
+    xtx = np.zeros((series, terminos, terminos))
+    xty = np.zeros((series, terminos))
+    for inicio in range(0, len(x), LECTURAS_POR_BLOQUE):
+        bloque = slice(inicio, inicio + LECTURAS_POR_BLOQUE)
+        filasBloque = filas[bloque]
+        diseno = disenoArmonico(x[bloque], referencia[filasBloque], armonicos)
+        for a, b in pares:
+            xtx[:, a, b] += np.bincount(filasBloque, weights=diseno[:, a] * diseno[:, b], minlength=series)
+        for a in range(terminos):
+            xty[:, a] += np.bincount(filasBloque, weights=diseno[:, a] * y[bloque], minlength=series)
+    for a, b in pares:
+        xtx[:, b, a] = xtx[:, a, b]
+
+    #La regularización es proporcional a la cantidad de puntos y solo afecta a los armónicos.
+    #Crece cuando la serie cubre menos de un ciclo, porque entonces el ciclo no se puede
+    #estimar y los armónicos solo extrapolarían ruido. La pendiente recibe una mínima para
+    #que una serie con una sola fecha no detenga el lote
+    cantidad = cantidades.astype("float64")
+    cobertura = np.zeros(series)
+    if len(x):
+        primeras = np.minimum(inicios, len(x) - 1)
+        cobertura = np.clip((x[ultimasPosiciones(inicios, cantidades)] - x[primeras]) / PERIODO_ANUAL, 0, 1)
+    xtx[:, 1, 1] += 1e-9 * cantidad
+    indices = np.arange(2, terminos)
+    xtx[:, indices, indices] += ((REGULARIZACION + 1 - cobertura) * cantidad)[:, None]
+    suficientes = cantidades >= max(2, terminos)
+    coeficientes = np.full((series, terminos), np.nan)
+    if suficientes.any():
+        coeficientes[suficientes] = np.linalg.solve(xtx[suficientes], xty[suficientes][..., None])[..., 0]
+    return coeficientes
+
+# ======================
+# Modelos
+# ======================
+
+def pronosticarLineal(apilado, referencia, futuros):
+    coeficientes = resolverApilado(apilado, referencia, 0)
+    return np.einsum("shk,sk->sh", disenoArmonico(futuros, referencia[:, None], 0), coeficientes)
+
+def pronosticarArmonico(apilado, referencia, futuros):
+    coeficientes = resolverApilado(apilado, referencia, ARMONICOS)
+    return np.einsum("shk,sk->sh", disenoArmonico(futuros, referencia[:, None], ARMONICOS), coeficientes)
+
+def pronosticarEstacional(apilado, referencia, futuros):
+    #Para cada fecha futura se busca la última lectura no posterior a la misma fecha
+    #del ciclo más reciente con datos. Todas las búsquedas se hacen con un solo
+    #searchsorted sobre el arreglo plano, con cada serie separada por un desplazamiento
+    filas, x, y, inicios, cantidades = apilado
+    series = len(inicios)
+    ciclos = np.ceil((futuros - referencia[:, None]) / PERIODO_ANUAL)
+    consultas = futuros - ciclos * PERIODO_ANUAL
+
+    #Sin un ciclo completo de historia se repite la última lectura
+    ultimos = y[ultimasPosiciones(inicios, cantidades)] if len(y) else np.full(series, np.nan)
+    resultado = np.repeat(ultimos[:, None], futuros.shape[1], axis=1)
+    if len(x):
+        desplazamiento = np.abs(x).max() * 4 + 4 * PERIODO_ANUAL
+        claves = x + filas * desplazamiento
+        numeros = np.arange(series)[:, None]
+        posiciones = np.searchsorted(claves, consultas + numeros * desplazamiento, side="right") - 1
+        posiciones = np.maximum(posiciones, 0)
+        encontrado = ((filas[posiciones] == numeros) & (consultas - x[posiciones] <= TOLERANCIA_ESTACIONAL))
+        resultado = np.where(encontrado, y[posiciones], resultado)
+    resultado[cantidades == 0] = np.nan
+    return resultado
+
+FUNCIONES_MODELO = {
+    "lineal": pronosticarLineal,
+    "armonico": pronosticarArmonico,
+    "estacional": pronosticarEstacional
+}
+
+# ======================
+# Pronóstico por Lotes
+# ======================
+
+@instrumentar("ajustarLote", filas=len)
+def pronosticarLote(series, unidadTiempo, periodos, modelos=MODELOS):
+    #Pronostica todas las series [(cuerpo, parametro, DataFrame)] con los modelos indicados.
+    #Retorna una tabla larga: Cuerpo, Parametro, Modelo, Periodo, Fecha, Valor
+    if unidadTiempo not in UNIDADES_TIEMPO:
+        raise ValueError("La unidad de tiempo debe ser 1-4")
+    if periodos <= 0:
+        raise ValueError("La cantidad de períodos debe ser un número positivo")
+    series = [serie for serie in series if not serie[2].empty]
+    if not series:
+        return pd.DataFrame(columns=["Cuerpo", "Parametro", "Modelo", "Periodo", "Fecha", "Valor"])
+
+    apilado = apilarSeries([df for _, _, df in series])
+    _, x, _, inicios, cantidades = apilado
+    referencia = x[ultimasPosiciones(inicios, cantidades)] if len(x) else np.zeros(len(series))
+    pasos = np.arange(1, periodos + 1) * UNIDADES_TIEMPO[unidadTiempo][1].days
+    futuros = referencia[:, None] + pasos[None, :]
+
+    cuerpos = np.array([cuerpo for cuerpo, _, _ in series], dtype=object)
+    parametros = np.array([parametro for _, parametro, _ in series], dtype=object)
+    fechas = regresion.fechaDesdeDias(futuros.ravel())
+    tablas = []
+    for modelo in modelos:
+        valores = FUNCIONES_MODELO[modelo](apilado, referencia, futuros)
+        tablas.append(pd.DataFrame({
+            "Cuerpo": np.repeat(cuerpos, periodos),
+            "Parametro": np.repeat(parametros, periodos),
+            "Modelo": modelo,
+            "Periodo": np.tile(np.arange(1, periodos + 1), len(series)),
+            "Fecha": fechas,
+            "Valor": valores.ravel()
+        }))
+    return pd.concat(tablas, ignore_index=True)
+
+def pronosticarCuerpos(cuerpos, unidadTiempo, periodos, modelos=MODELOS):
+    #Carga y pronostica los cuerpos indicados. Retorna (tabla, cantidad de series,
+    #tiempo de lectura, tiempo de ajuste) en segundos
+    inicio = time.perf_counter()
+    series = cargarSeries(cuerpos)
+    lectura = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    tabla = pronosticarLote(series, unidadTiempo, periodos, modelos)
+    return tabla, len(series), lectura, time.perf_counter() - inicio
+
+def guardarPronosticos(tabla, rutaBase=Path("CuerposDeAgua")):
+    #Escribe la tabla de pronósticos y retorna su ruta
+    fechaActual = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
+    ruta = Path(rutaBase) / f"Pronosticos_{fechaActual}.csv"
+    tabla.to_csv(ruta, index=False, encoding="utf-8")
+    return ruta
+
+def main(argumentos=None):
+    import lote
+    from cli import UNIDADES as unidades
+    parser = argparse.ArgumentParser(description="Pronostica todas las series de todos los cuerpos de agua")
+    parser.add_argument("--ruta", default="CuerposDeAgua", help="Carpeta con los cuerpos de agua")
+    parser.add_argument("--unidad", choices=unidades, default="meses")
+    parser.add_argument("--periodos", type=int, default=6)
+    parser.add_argument("--modelos", nargs="+", choices=MODELOS, default=list(MODELOS))
+    args = parser.parse_args(argumentos)
+
+    tabla, cantidad, lectura, ajuste = pronosticarCuerpos(lote.listarCuerposAgua(Path(args.ruta)),
+                                                          unidades[args.unidad], args.periodos, args.modelos)
+    if tabla.empty:
+        print("No hay series para pronosticar.")
+        return 0
+    ruta = guardarPronosticos(tabla, Path(args.ruta))
+    print(f"Series pronosticadas: {cantidad} (lectura: {lectura:.2f} s, ajuste: {ajuste:.3f} s, "
+          f"{cantidad / ajuste if ajuste else 0:.0f} series/s)")
+    print(f"Pronósticos guardados en: {ruta}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
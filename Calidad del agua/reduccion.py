@@ -0,0 +1,96 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Reducción de Puntos para Gráficas
+
+Reduce las series largas antes de dibujarlas sin cambiar su aspecto. Las
+gráficas de línea y dispersión usan Largest-Triangle-Three-Buckets (LTTB),
+que conserva los picos y la forma de la curva; las de barras usan cubetas de
+mínimo y máximo, que conservan los extremos de cada tramo. La cantidad de
+puntos a conservar depende del ancho de la figura en píxeles.
+"""
+import numpy as np
+from config import config
+#========================
+#Fin de las importaciones (numpy)
+
+#Una cubeta de barras conserva dos puntos y cada barra necesita al menos dos píxeles
+PIXELES_POR_CUBETA_BARRAS = 4
+
+
+def puntosObjetivo(fig, barras=False):
+    #Puntos que caben en el ancho de la figura: config.chart_points_per_pixel por
+    #píxel en línea y dispersión, y una cubeta cada PIXELES_POR_CUBETA_BARRAS en barras
+    pixeles = int(fig.get_size_inches()[0] * fig.dpi)
+    if barras:
+        return max(1, pixeles // PIXELES_POR_CUBETA_BARRAS) * 2
+    return max(3, int(pixeles * config.chart_points_per_pixel))
+
+def _comoNumeros(x):
+    #Las fechas se tratan como nanosegundos para poder calcular áreas
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").view("int64").astype("float64")
+    return x.astype("float64")
+
+def lttb(x, y, objetivo):
+    #Índices de los puntos a conservar con Largest-Triangle-Three-Buckets.
+    #Se conservan el primero y el último; del resto, en cada cubeta se elige el punto
+    #que forma el triángulo más grande con el elegido antes y el promedio de la cubeta siguiente
+    n = len(y)
+    if objetivo >= n or objetivo < 3:
+        return np.arange(n)
+
+    xs = _comoNumeros(x)
+    ys = np.asarray(y, dtype="float64")
+    #Límites de las n-2 posiciones interiores repartidas en objetivo-2 cubetas
+    limites = np.linspace(1, n - 1, objetivo - 1).astype(np.int64)
+    #Promedio de cada cubeta (la última "siguiente" es el punto final)
+    sumasX = np.add.reduceat(xs[:-1], limites[:-1])
+    sumasY = np.add.reduceat(ys[:-1], limites[:-1])
+    tamanos = np.diff(limites)
+    promediosX = np.append(sumasX / tamanos, xs[-1])
+    promediosY = np.append(sumasY / tamanos, ys[-1])
+
+    indices = np.empty(objetivo, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    elegido = 0
+    for cubeta in range(objetivo - 2):
+        inicio, fin = limites[cubeta], limites[cubeta + 1]
+        ax, ay = xs[elegido], ys[elegido]
+        cx, cy = promediosX[cubeta + 1], promediosY[cubeta + 1]
+        #El doble del área basta para comparar
+        areas = np.abs((ax - cx) * (ys[inicio:fin] - ay) - (ax - xs[inicio:fin]) * (cy - ay))
+        elegido = inicio + int(np.argmax(areas))
+        indices[cubeta + 1] = elegido
+    return indices
+
+def minMaxCubetas(y, objetivo):
+    #Índices del mínimo y del máximo de cada cubeta, en orden, para unas
+    #objetivo/2 cubetas de igual tamaño
+    n = len(y)
+    cubetas = objetivo // 2
+    if objetivo >= n or cubetas < 1:
+        return np.arange(n)
+
+    ys = np.asarray(y, dtype="float64")
+    tamano = -(-n // cubetas)
+    cubetas = -(-n // tamano)
+    relleno = cubetas * tamano - n
+    #Se rellena la última cubeta con valores que nunca ganan
+    minimos = np.argmin(np.append(ys, np.full(relleno, np.inf)).reshape(cubetas, tamano), axis=1)
+    maximos = np.argmax(np.append(ys, np.full(relleno, -np.inf)).reshape(cubetas, tamano), axis=1)
+    base = np.arange(cubetas) * tamano
+    indices = np.sort(np.concatenate([base + minimos, base + maximos]))
+    #Si el mínimo y el máximo coinciden (cubeta constante) se conserva una vez
+    return indices[np.append(True, indices[1:] != indices[:-1])]
+
+def reducirSerie(fechas, valores, objetivo, barras=False):
+    #Retorna (fechas, valores) con a lo sumo objetivo puntos
+    if len(valores) <= objetivo:
+        return fechas, valores
+    if barras:
+        indices = minMaxCubetas(valores, objetivo)
+    else:
+        indices = lttb(fechas, valores, objetivo)
+    return fechas[indices], valores[indices]
@@ -0,0 +1,118 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Estadísticas Suficientes de la Regresión Lineal
+
+La recta de mínimos cuadrados de una serie solo depende de n, Σx, Σy, Σxy y
+Σx², con x = días desde una época fija. Estas sumas se guardan en el índice de
+resumen y se combinan al anexar datos, de modo que una predicción no tiene que
+leer la serie completa.
+
+La variante ponderada multiplica cada lectura por 0.5 ** (antigüedad / vida
+media), dando más peso a los datos recientes. Sus sumas se guardan referidas a
+la fecha más reciente y se reescalan al combinarlas.
+"""
+import numpy as np
+import pandas as pd
+#========================
+#Fin de las importaciones (numpy, pandas)
+
+#Época fija de la coordenada x (días desde esta fecha)
+EPOCA = pd.Timestamp("2000-01-01")
+
+#Sumas que se combinan sumándolas
+SUMAS = ("sx", "sy", "sxy", "sxx")
+
+
+def diasDesdeEpoca(fechas):
+    #Días (con fracción) desde la época para un arreglo de fechas
+    fechas = np.asarray(fechas).astype("datetime64[ns]")
+    return (fechas - EPOCA.to_datetime64()) / np.timedelta64(1, "D")
+
+def fechaDesdeDias(dias):
+    #Fecha que corresponde a x días desde la época, redondeada al segundo
+    return (EPOCA + pd.to_timedelta(dias, unit="D")).round("s")
+
+def _sumas(x, y, pesos=None):
+    if pesos is None:
+        return {"sx": float(x.sum()), "sy": float(y.sum()),
+                "sxy": float((x * y).sum()), "sxx": float((x * x).sum())}
+    return {"sx": float((pesos * x).sum()), "sy": float((pesos * y).sum()),
+            "sxy": float((pesos * x * y).sum()), "sxx": float((pesos * x * x).sum())}
+
+# ======================
+# Estadísticas sin Ponderar
+# ======================
+
+def calcularEstadisticas(df):
+    #Sumas de la regresión de una serie y datos de su eje x (extremos y mayor salto entre fechas)
+    if df.empty:
+        return None
+    x = diasDesdeEpoca(df["Fecha"])
+    y = df["Valor"].to_numpy(dtype="float64")
+    ordenadas = np.sort(x)
+    return {
+        "n": int(len(x)),
+        **_sumas(x, y),
+        "xMinimo": float(ordenadas[0]),
+        "xMaximo": float(ordenadas[-1]),
+        "saltoMaximo": float(np.diff(ordenadas).max()) if len(x) > 1 else 0.0
+    }
+
+def combinarEstadisticas(anteriores, nuevas):
+    #Estadísticas de la unión de dos conjuntos de lecturas. El salto entre ambos
+    #solo se cuenta cuando las nuevas lecturas van después de las anteriores
+    if anteriores is None or nuevas is None:
+        return nuevas or anteriores
+    combinadas = {"n": anteriores["n"] + nuevas["n"]}
+    for suma in SUMAS:
+        combinadas[suma] = anteriores[suma] + nuevas[suma]
+    combinadas["xMinimo"] = min(anteriores["xMinimo"], nuevas["xMinimo"])
+    combinadas["xMaximo"] = max(anteriores["xMaximo"], nuevas["xMaximo"])
+    combinadas["saltoMaximo"] = max(anteriores["saltoMaximo"], nuevas["saltoMaximo"],
+                                    nuevas["xMinimo"] - anteriores["xMaximo"])
+    return combinadas
+
+# ======================
+# Estadísticas Ponderadas
+# ======================
+
+def calcularPonderadas(df, vidaMedia):
+    #Sumas ponderadas referidas a la fecha más reciente de la serie
+    if df.empty:
+        return None
+    x = diasDesdeEpoca(df["Fecha"])
+    y = df["Valor"].to_numpy(dtype="float64")
+    referencia = float(x.max())
+    pesos = 0.5 ** ((referencia - x) / vidaMedia)
+    return {"vidaMedia": vidaMedia, "referencia": referencia, "w": float(pesos.sum()), **_sumas(x, y, pesos)}
+
+def combinarPonderadas(anteriores, nuevas):
+    #Lleva ambos conjuntos a la referencia más reciente y suma
+    if anteriores is None or nuevas is None:
+        return nuevas or anteriores
+    vidaMedia = nuevas["vidaMedia"]
+    referencia = max(anteriores["referencia"], nuevas["referencia"])
+    combinadas = {"vidaMedia": vidaMedia, "referencia": referencia, "w": 0.0, **dict.fromkeys(SUMAS, 0.0)}
+    for parte in (anteriores, nuevas):
+        factor = 0.5 ** ((referencia - parte["referencia"]) / vidaMedia)
+        for suma in ("w", *SUMAS):
+            combinadas[suma] += parte[suma] * factor
+    return combinadas
+
+# ======================
+# Ajuste
+# ======================
+
+def ajustarRecta(estadisticas):
+    #Retorna (pendiente, intercepto) de y = pendiente * x + intercepto, con x en días desde la época
+    total = estadisticas.get("w", estadisticas.get("n"))
+    if not total:
+        raise ValueError("Se necesitan al menos dos registros para predecir")
+    varianzaX = estadisticas["sxx"] - estadisticas["sx"] ** 2 / total
+    #Con todas las lecturas en la misma fecha la recta no está definida
+    if varianzaX <= 1e-9 * max(1.0, estadisticas["sxx"] / total):
+        raise ValueError("Se necesitan al menos dos fechas distintas para predecir")
+    covarianza = estadisticas["sxy"] - estadisticas["sx"] * estadisticas["sy"] / total
+    pendiente = covarianza / varianzaX
+    intercepto = (estadisticas["sy"] - pendiente * estadisticas["sx"]) / total
+    return pendiente, intercepto
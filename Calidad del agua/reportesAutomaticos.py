@@ -0,0 +1,254 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Reportes Automáticos a partir de los Datos
+
+Genera para cada cuerpo de agua un reporte de texto con:
+    - la última lectura válida de cada parámetro frente a su rango normal y las
+      lecturas marcadas como anómalas,
+    - las alertas abiertas por salida del rango normal, con su recomendación,
+    - el ICA y su nivel,
+    - los parámetros que concentran el 80 % del impacto negativo (Pareto)
+      con su recomendación,
+    - las estadísticas móviles (7, 30 y 365 días) y la tendencia de cada parámetro,
+    - la predicción lineal de cada parámetro,
+    - la ruta de la gráfica de línea de cada parámetro.
+
+Los reportes se guardan en Reportes/ con el mismo nombre que los creados desde
+el menú (Reporte_<titulo>_<fecha>.txt), así que aparecen en los listados y en
+la búsqueda. Todo sale del índice de resumen salvo las estadísticas móviles y
+las gráficas, que leen la serie. Las gráficas se toman del catálogo de gráficas
+(catalogoGraficas) si ya hay una con el mismo contenido de la serie y solo se
+dibujan si no. Los cuerpos de agua se procesan en paralelo, un proceso por núcleo.
+
+Uso (desde la raíz del proyecto):
+    python "Calidad del agua/reportesAutomaticos.py" [--cuerpo NOMBRE] [--titulo TITULO] [--procesos N]
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from config import config
+from parametros import PARAMETROS_CALIDAD
+import almacenamiento
+import resumen
+import ica
+import prediccion
+import estadisticasMoviles
+import anomalias
+import alertas
+from graficasLote import inicializarProceso
+#========================
+#Fin de las importaciones (os, sys, time, argparse, pathlib, datetime, concurrent.futures)
+
+#Predicción incluida en el reporte: unidad de prediccion.UNIDADES_TIEMPO y períodos
+UNIDAD_PREDICCION = 3
+PERIODOS_PREDICCION = 3
+
+#Tipo de gráfica que se adjunta (option2.TIPOS_GRAFICA)
+TIPO_GRAFICA = 3
+
+
+def tituloPorDefecto():
+    #Título de la corrida mensual, p. ej. "Informe automático 10-2026"
+    return f"Informe automático {datetime.now().strftime('%m-%Y')}"
+
+# ======================
+# Contenido del Reporte
+# ======================
+
+def datosParametro(parametro):
+    #Entrada de PARAMETROS_CALIDAD de un parámetro (por su nombre de archivo), o {} si no se reconoce
+    i = ica.REGISTRO.indice(parametro)
+    return PARAMETROS_CALIDAD[ica.REGISTRO.nombres[i]] if i >= 0 else {}
+
+def obtenerGrafica(df, rutaArchivo, rutaGraficas):
+    #Ruta de la gráfica de la serie: la del catálogo si coincide la huella de sus datos
+    #(y el estilo), o una nueva
+    import option2
+    return option2.generarGrafica(df, Path(rutaArchivo).stem, TIPO_GRAFICA, False, rutaGraficas)
+
+def evaluarCuerpo(rutaCuerpo, graficas=True):
+    #Datos del reporte de un cuerpo de agua, como diccionario
+    import option2
+    rutaCuerpo = Path(rutaCuerpo)
+    rutaDatos = rutaCuerpo / config.data_folder
+    archivos = almacenamiento.listarArchivos(rutaDatos)
+    resumenes = resumen.obtenerResumenes(rutaDatos, archivos)
+    validas = anomalias.ultimasValidas(rutaDatos, archivos)
+    valores = {parametro: lectura["valor"] for parametro, lectura in validas.items()}
+    if not valores:
+        raise ValueError("No hay datos de parámetros")
+
+    evaluacion = ica.evaluarUltimasLecturas(valores)
+    impactos = ica.calcularImpactosNegativos(valores)
+
+    lecturas = []
+    for detalle in evaluacion["detalle"]:
+        parametro = detalle["parametro"]
+        estado = "Sin rango"
+        if detalle["rango"] is not None:
+            minimo, maximo = detalle["rango"]
+            estado = "Dentro" if detalle["dentro"] else ("Por debajo" if detalle["valor"] < minimo else "Por encima")
+        lecturas.append({**detalle, "fecha": validas[parametro]["fecha"],
+                         "unidades": datosParametro(parametro).get("unidades", ""), "estado": estado})
+
+    predicciones = {}
+    for parametro, datos in resumenes.items():
+        try:
+            predicciones[parametro] = prediccion.prediccionesDesdeResumen(datos, UNIDAD_PREDICCION, PERIODOS_PREDICCION)
+        except ValueError as e:
+            predicciones[parametro] = str(e)
+
+    #Cada serie se lee una vez para sus estadísticas móviles y su gráfica
+    movil = {}
+    rutasGraficas = {}
+    rutaGraficas = rutaCuerpo / "Graficas" / option2.TIPOS_GRAFICA[TIPO_GRAFICA]
+    for archivo in archivos:
+        parametro = almacenamiento.obtenerNombreParametro(archivo)
+        df = almacenamiento.leerSerie(rutaDatos / archivo)
+        movil[parametro] = estadisticasMoviles.ultimasEstadisticas(df)
+        if graficas:
+            rutasGraficas[parametro] = obtenerGrafica(df, rutaDatos / archivo, rutaGraficas)
+
+    return {
+        "cuerpo": rutaCuerpo.name,
+        "ica": evaluacion["ica"],
+        "nivel": evaluacion["nivel"],
+        "lecturas": lecturas,
+        "impactos": impactos,
+        "principales": ica.principalesPareto(impactos),
+        "predicciones": predicciones,
+        "estadisticasMoviles": movil,
+        "anomalias": {parametro: estado["marcadas"]
+                      for parametro, estado in anomalias.obtenerEstados(rutaDatos, archivos).items() if estado["marcadas"]},
+        "alertas": alertas.alertasAbiertas(rutaDatos, archivos),
+        "graficas": rutasGraficas
+    }
+
+def redactarReporte(datos):
+    #Texto del reporte a partir de evaluarCuerpo()
+    lineas = [
+        f"Cuerpo de agua: {datos['cuerpo']}",
+        f"Generado: {datetime.now().strftime('%d/%m/%y %H:%M')}",
+        "",
+        "=== ÍNDICE DE CALIDAD DEL AGUA ===",
+        f"ICA: {datos['ica']:.2f} ({datos['nivel']})",
+        "",
+        "=== ÚLTIMAS LECTURAS ===",
+    ]
+    for lectura in datos["lecturas"]:
+        rango = f"{lectura['rango'][0]} - {lectura['rango'][1]}" if lectura["rango"] else "-"
+        lineas.append(f"{lectura['parametro']}: {lectura['valor']:.2f} {lectura['unidades']} "
+                      f"(rango normal {rango}; {almacenamiento.formatearFecha(lectura['fecha'])}) -> {lectura['estado']}")
+
+    if datos["anomalias"]:
+        lineas += ["", "=== LECTURAS ANÓMALAS (EXCLUIDAS DEL ICA) ==="]
+        lineas += [f"{parametro}: {cantidad}" for parametro, cantidad in datos["anomalias"].items()]
+
+    if datos["alertas"]:
+        lineas += ["", "=== ALERTAS ABIERTAS ==="]
+        for parametro, alerta in datos["alertas"].items():
+            lineas.append(f"{parametro}: por {alerta['direccion']} de {alerta['limite']} {alerta['unidades']} desde "
+                          f"{almacenamiento.formatearFecha(alerta['inicio'])} ({alerta['lecturas']} lecturas, "
+                          f"extremo {alerta['extremo']:g})")
+            lineas.append(f"   Recomendación: {alerta['recomendacion']}")
+
+    lineas += ["", "=== PRINCIPALES CONTRIBUYENTES AL IMPACTO NEGATIVO (PARETO 80%) ==="]
+    if not datos["principales"]:
+        lineas.append("Ningún parámetro fuera de su rango normal.")
+    porcentajes = dict(zip(datos["impactos"], ica.porcentajesAcumulados(datos["impactos"])))
+    for i, parametro in enumerate(datos["principales"], start=1):
+        lineas.append(f"{i}. {parametro}: impacto {datos['impactos'][parametro]:.1f} "
+                      f"({porcentajes[parametro]:.1f}% acumulado)")
+        recomendacion = datosParametro(parametro).get("recomendacion")
+        if recomendacion:
+            lineas.append(f"   Recomendación: {recomendacion}")
+
+    lineas += ["", "=== ESTADÍSTICAS MÓVILES ==="]
+    for parametro, ultimas in datos["estadisticasMoviles"].items():
+        lineas.append(f"{parametro}: tendencia {estadisticasMoviles.tendencia(ultimas)} (media de 7 días vs 30 días)")
+        unidades = datosParametro(parametro).get("unidades", "")
+        lineas += [f"   {linea}" for linea in estadisticasMoviles.formatearEstadisticas(ultimas, unidades)]
+
+    nombreUnidad = prediccion.UNIDADES_TIEMPO[UNIDAD_PREDICCION][0]
+    lineas += ["", f"=== PREDICCIÓN ({PERIODOS_PREDICCION} {nombreUnidad}) ==="]
+    for parametro, resultado in datos["predicciones"].items():
+        if isinstance(resultado, str):
+            lineas.append(f"{parametro}: {resultado}")
+            continue
+        valores = ", ".join(f"{fila.Valor:.2f} ({fila.Fecha.strftime('%d/%m/%y')})"
+                            for fila in resultado["predicciones"].itertuples())
+        lineas.append(f"{parametro}: {valores}")
+        for advertencia in resultado["advertencias"]:
+            lineas.append(f"   {advertencia}")
+
+    if datos["graficas"]:
+        lineas += ["", "=== GRÁFICAS ==="]
+        lineas += [f"{parametro}: {ruta}" for parametro, ruta in datos["graficas"].items()]
+    return "\n".join(lineas)
+
+# ======================
+# Generación por Lotes
+# ======================
+
+def generarReporteCuerpo(tarea):
+    #Genera y guarda el reporte de un cuerpo de agua. Se ejecuta en un proceso del pool,
+    #por lo que recibe y retorna solo datos simples: (ruta del reporte o None, error o None)
+    import option3
+    rutaCuerpo, titulo, graficas = tarea
+    try:
+        texto = redactarReporte(evaluarCuerpo(rutaCuerpo, graficas))
+        ruta = option3.guardarReporte(titulo, texto, Path(rutaCuerpo) / config.report_folder)
+        return str(ruta), None
+    except Exception as e:
+        return None, f"{Path(rutaCuerpo).name}: {e}"
+
+def generarReportes(cuerpos, titulo=None, graficas=True, procesos=None):
+    #Genera el reporte de cada cuerpo en paralelo. Retorna (rutas, errores, tiempo total)
+    inicio = time.perf_counter()
+    titulo = titulo or tituloPorDefecto()
+    tareas = [(str(Path(rutaCuerpo).resolve()), titulo, graficas) for rutaCuerpo in cuerpos]
+    if not tareas:
+        return [], [], 0.0
+
+    procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+    if procesos == 1:
+        #En el propio proceso (p. ej. desde el menú) no se toca el backend: las gráficas se
+        #dibujan sin pyplot y la sesión interactiva sigue pudiendo mostrar ventanas
+        resultados = [generarReporteCuerpo(tarea) for tarea in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos, initializer=inicializarProceso) as pool:
+            resultados = list(pool.map(generarReporteCuerpo, tareas))
+    total = time.perf_counter() - inicio
+
+    rutas = [ruta for ruta, _ in resultados if ruta]
+    errores = [error for _, error in resultados if error]
+    return rutas, errores, total
+
+def ejecutarReportes(cuerpos, titulo=None, graficas=True, procesos=None):
+    #Genera los reportes, informa el resultado y retorna sus rutas
+    rutas, errores, total = generarReportes(cuerpos, titulo, graficas, procesos)
+    print(f"Reportes generados: {len(rutas)} en {total:.2f} s")
+    for error in errores:
+        print(f"Error: {error}")
+    return rutas
+
+def main(argumentos=None):
+    import lote
+    parser = argparse.ArgumentParser(description="Genera los reportes automáticos de los cuerpos de agua")
+    parser.add_argument("--ruta", default="CuerposDeAgua", help="Carpeta con los cuerpos de agua")
+    parser.add_argument("--cuerpo", action="append", help="Cuerpo de agua (se puede repetir; por defecto, todos)")
+    parser.add_argument("--titulo", help="Título de los reportes (por defecto, 'Informe automático <mes>')")
+    parser.add_argument("--sin-graficas", action="store_true", help="No adjunta gráficas")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos a usar (por defecto, uno por núcleo)")
+    args = parser.parse_args(argumentos)
+
+    cuerpos = [Path(args.ruta) / nombre for nombre in args.cuerpo] if args.cuerpo else lote.listarCuerposAgua(args.ruta)
+    ejecutarReportes(cuerpos, args.titulo, not args.sin_graficas, args.procesos)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Índice de Resumen por Cuerpo de Agua
+
+Mantiene en Datos/resumen.json, por cada parámetro, la última lectura y las
+estadísticas agregadas de la serie (cantidad, mínimo, máximo, media y suma de
+cuadrados de las desviaciones), además de las sumas de la regresión lineal
+que usan las predicciones (módulo regresion). Las rutas de escritura lo actualizan a medida
+que llegan datos, de forma que ICA, Pareto y la evaluación de parámetros no
+tienen que leer las series completas.
+
+Cada entrada guarda la firma de los archivos de su serie; si la firma no
+coincide (por ejemplo, el archivo se modificó fuera del sistema) la entrada se
+recalcula leyendo la serie una vez.
+"""
+import os
+import json
+import threading
+from pathlib import Path
+from config import config
+import almacenamiento
+import regresion
+from cache import firmaArchivos
+from metricas import instrumentar
+#========================
+#Fin de las importaciones (os, json, threading, pathlib)
+
+#Nombre del archivo del índice dentro de la carpeta de datos
+NOMBRE_INDICE = "resumen.json"
+
+#Versión del contenido de las entradas; las de otra versión se recalculan
+VERSION_RESUMEN = 2
+
+#Protege la lectura-modificación-escritura del índice entre hilos
+_bloqueo = threading.RLock()
+
+# ======================
+# Cálculo de Resúmenes
+# ======================
+
+def calcularResumen(df):
+    #Calcula el resumen de una serie completa
+    valores = df["Valor"]
+    if valores.empty:
+        return None
+    return {
+        "ultimoValor": float(valores.iloc[-1]),
+        "ultimaFecha": df["Fecha"].iloc[-1].isoformat(),
+        "valorAnterior": float(valores.iloc[-2]) if len(valores) > 1 else None,
+        "n": int(len(valores)),
+        "minimo": float(valores.min()),
+        "maximo": float(valores.max()),
+        "media": float(valores.mean()),
+        "sumaCuadrados": float(((valores - valores.mean()) ** 2).sum()),
+        "regresion": regresion.calcularEstadisticas(df),
+        "regresionPonderada": regresion.calcularPonderadas(df, config.forecast_half_life_days)
+    }
+
+def calcularResumenSerie(rutaArchivo):
+    #Resumen de la serie en disco, combinado bloque a bloque para no tenerla entera en memoria
+    resumen = None
+    for bloque in almacenamiento.iterarSerie(rutaArchivo):
+        resumen = combinarResumen(resumen, bloque)
+    return resumen
+
+def combinarResumen(resumen, dfNuevos):
+    #Actualiza un resumen con registros nuevos en O(registros nuevos).
+    #La media y la suma de cuadrados se combinan con la fórmula de Chan et al.
+    nuevo = calcularResumen(dfNuevos)
+    if resumen is None or nuevo is None:
+        return nuevo or resumen
+
+    n = resumen["n"] + nuevo["n"]
+    delta = nuevo["media"] - resumen["media"]
+    combinado = dict(nuevo)
+    combinado["valorAnterior"] = nuevo["valorAnterior"] if nuevo["n"] > 1 else resumen["ultimoValor"]
+    combinado["n"] = n
+    combinado["minimo"] = min(resumen["minimo"], nuevo["minimo"])
+    combinado["maximo"] = max(resumen["maximo"], nuevo["maximo"])
+    combinado["media"] = resumen["media"] + delta * nuevo["n"] / n
+    combinado["sumaCuadrados"] = (resumen["sumaCuadrados"] + nuevo["sumaCuadrados"]
+                                  + delta ** 2 * resumen["n"] * nuevo["n"] / n)
+    combinado["regresion"] = regresion.combinarEstadisticas(resumen["regresion"], nuevo["regresion"])
+    combinado["regresionPonderada"] = regresion.combinarPonderadas(resumen["regresionPonderada"],
+                                                                   nuevo["regresionPonderada"])
+    return combinado
+
+# ======================
+# Persistencia del Índice
+# ======================
+
+def rutaIndice(rutaDatos):
+    return Path(rutaDatos) / NOMBRE_INDICE
+
+def leerIndice(rutaDatos):
+    #Lee el índice de un cuerpo de agua (vacío si no existe o está dañado)
+    ruta = rutaIndice(rutaDatos)
+    try:
+        with open(ruta, "r", encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def guardarIndice(rutaDatos, indice):
+    #Guarda el índice a un temporal y luego lo reemplaza
+    ruta = rutaIndice(rutaDatos)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(indice, archivo, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+def firmaSerie(rutaArchivo):
+    #La firma se guarda como listas para que sea comparable tras pasar por JSON
+    return [list(parte) for parte in firmaArchivos(almacenamiento.rutasSerie(rutaArchivo))]
+
+# ======================
+# Actualización desde las Rutas de Escritura
+# ======================
+
+def actualizarCompleto(rutaArchivo, df):
+    #Se llama tras escribir la serie completa (crear o editar)
+    rutaArchivo = Path(rutaArchivo)
+    with _bloqueo:
+        indice = leerIndice(rutaArchivo.parent)
+        _fijarEntrada(indice, rutaArchivo, calcularResumen(almacenamiento.normalizarSerie(df)))
+        guardarIndice(rutaArchivo.parent, indice)
+
+def actualizarAnexo(rutaArchivo, dfNuevos):
+    #Se llama tras anexar registros; solo se procesan los registros nuevos
+    rutaArchivo = Path(rutaArchivo)
+    with _bloqueo:
+        indice = leerIndice(rutaArchivo.parent)
+        entrada = indice.get(rutaArchivo.name)
+        if entrada is None or not _vigente(entrada):
+            #Sin resumen previo válido no se puede combinar; se calcula con la serie completa
+            resumen = calcularResumenSerie(rutaArchivo)
+        else:
+            resumen = combinarResumen(entrada["resumen"], almacenamiento.normalizarSerie(dfNuevos))
+        _fijarEntrada(indice, rutaArchivo, resumen)
+        guardarIndice(rutaArchivo.parent, indice)
+
+def refrescarFirma(rutaArchivo):
+    #La compactación cambia los archivos pero no los datos: solo se actualiza la firma
+    rutaArchivo = Path(rutaArchivo)
+    with _bloqueo:
+        indice = leerIndice(rutaArchivo.parent)
+        if rutaArchivo.name in indice:
+            indice[rutaArchivo.name]["firma"] = firmaSerie(rutaArchivo)
+            guardarIndice(rutaArchivo.parent, indice)
+
+def _vigente(entrada):
+    #Una entrada de otra versión, o cuyas sumas ponderadas usan otra vida media, se recalcula
+    if entrada.get("version") != VERSION_RESUMEN:
+        return False
+    ponderada = (entrada["resumen"] or {}).get("regresionPonderada")
+    return ponderada is None or ponderada["vidaMedia"] == config.forecast_half_life_days
+
+def _fijarEntrada(indice, rutaArchivo, resumen):
+    indice[rutaArchivo.name] = {
+        "version": VERSION_RESUMEN,
+        "parametro": almacenamiento.obtenerNombreParametro(rutaArchivo.name),
+        "firma": firmaSerie(rutaArchivo),
+        "resumen": resumen
+    }
+
+# ======================
+# Consultas
+# ======================
+
+@instrumentar("resumen", filas=len)
+def obtenerResumenes(rutaDatos, archivos=None):
+    #Retorna {parametro: resumen} para los archivos indicados (o todos los de la carpeta).
+    #Solo se leen las series cuyo resumen falta o no coincide con los archivos en disco
+    rutaDatos = Path(rutaDatos)
+    if archivos is None:
+        archivos = almacenamiento.listarArchivos(rutaDatos)
+
+    resumenes = {}
+    with _bloqueo:
+        indice = leerIndice(rutaDatos)
+        modificado = False
+        for archivo in archivos:
+            rutaArchivo = rutaDatos / archivo
+            entrada = indice.get(archivo)
+            if entrada is None or not _vigente(entrada) or entrada["firma"] != firmaSerie(rutaArchivo):
+                _fijarEntrada(indice, rutaArchivo, calcularResumenSerie(rutaArchivo))
+                entrada = indice[archivo]
+                modificado = True
+            if entrada["resumen"] is not None:
+                resumenes[entrada["parametro"]] = entrada["resumen"]
+        #Se quitan las entradas de series que ya no existen
+        for archivo in [a for a in indice if not (rutaDatos / a).exists()]:
+            del indice[archivo]
+            modificado = True
+        if modificado:
+            guardarIndice(rutaDatos, indice)
+    return resumenes
+
+def obtenerResumen(rutaArchivo):
+    #Resumen de una sola serie
+    rutaArchivo = Path(rutaArchivo)
+    return obtenerResumenes(rutaArchivo.parent, [rutaArchivo.name]).get(
+        almacenamiento.obtenerNombreParametro(rutaArchivo.name))
+
+
+#La compactación de almacenamiento avisa al índice para que no recalcule la serie
+almacenamiento.observadoresCompactacion.append(refrescarFirma)
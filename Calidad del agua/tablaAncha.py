@@ -0,0 +1,240 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Módulo: Tabla Ancha de Parámetros
+
+Une todas las series de un cuerpo de agua en una sola tabla: una fila por fecha
+de muestreo (la unión de las fechas de todos los parámetros) y una columna por
+parámetro. Para cada fecha se toma la última lectura de cada parámetro que no
+tenga más antigüedad que la tolerancia (unión as-of hacia atrás); las lecturas
+marcadas como anómalas no entran.
+
+Los valores forman un único bloque float64 filas x parámetros, así que el
+historial del ICA, el Pareto de un período y las correlaciones trabajan sobre
+una matriz contigua y no sobre una serie por parámetro. La tabla se guarda en
+la caché de series y en Datos/tablaAncha_<tolerancia>.parquet con la firma de
+las series de las que salió: mientras no cambien, ni se leen las series ni se
+vuelven a alinear.
+"""
+import os
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import config
+import almacenamiento
+import anomalias
+from resumen import firmaSerie
+from cache import cacheSeries, firmaArchivos
+from metricas import medir
+#========================
+#Fin de las importaciones (os, json, pathlib, numpy, pandas)
+
+#Versión del contenido de la tabla guardada; las de otra versión se reconstruyen
+VERSION_TABLA = 2
+
+#Clave de los metadatos del archivo Parquet en la que se guarda la firma
+CLAVE_FIRMA = b"firmaTablaAncha"
+
+#Lecturas simultáneas mínimas de dos parámetros para calcular su correlación
+LECTURAS_MINIMAS_CORRELACION = 10
+
+#Correlación (en valor absoluto) a partir de la cual una pareja se considera destacada
+UMBRAL_CORRELACION = 0.7
+
+# ======================
+# Carga y Alineación
+# ======================
+
+def cargarSeries(rutaDatos, archivos=None):
+    #Lee las series de un cuerpo de agua sin las lecturas anómalas: {parametro: DataFrame}
+    rutaDatos = Path(rutaDatos)
+    if archivos is None:
+        archivos = almacenamiento.listarArchivos(rutaDatos)
+    return {almacenamiento.obtenerNombreParametro(archivo):
+            anomalias.filtrarAnomalias(rutaDatos / archivo, almacenamiento.leerSerie(rutaDatos / archivo))
+            for archivo in archivos}
+
+def alinearSeries(series, tolerancia):
+    #Alinea las series en la unión de sus fechas. Para cada fecha se toma la última
+    #lectura de cada parámetro que no tenga más antigüedad que la tolerancia.
+    #Retorna (fechas, matriz filas x parámetros, lista de parámetros)
+    with medir("alinear") as medicion:
+        fechas, matriz, parametros = _alinear(series, tolerancia)
+        medicion["filas"] = len(fechas)
+    return fechas, matriz, parametros
+
+def _alinear(series, tolerancia):
+    parametros = list(series)
+    ordenadas = []
+    for parametro in parametros:
+        df = series[parametro]
+        fechasParam = df["Fecha"].to_numpy().astype("datetime64[ns]").view("int64")
+        valoresParam = df["Valor"].to_numpy(dtype="float64")
+        #Las series casi siempre vienen ordenadas; solo se ordena si hace falta
+        if (fechasParam[1:] < fechasParam[:-1]).any():
+            orden = np.argsort(fechasParam, kind="stable")
+            fechasParam, valoresParam = fechasParam[orden], valoresParam[orden]
+        ordenadas.append((fechasParam, valoresParam))
+
+    if not ordenadas:
+        return np.array([], dtype="datetime64[ns]"), np.empty((0, 0)), parametros
+
+    fechas = _unirFechas([f for f, _ in ordenadas])
+    toleranciaNs = pd.Timedelta(tolerancia).value
+    matriz = np.full((len(fechas), len(parametros)), np.nan)
+    for columna, (fechasParam, valoresParam) in enumerate(ordenadas):
+        if len(fechasParam) == 0:
+            continue
+        #Índice de la última lectura con fecha <= a la fecha de la fila
+        indices = np.searchsorted(fechasParam, fechas, side="right") - 1
+        validos = indices >= 0
+        indicesValidos = np.where(validos, indices, 0)
+        validos &= (fechas - fechasParam[indicesValidos]) <= toleranciaNs
+        matriz[validos, columna] = valoresParam[indicesValidos[validos]]
+
+    return fechas.view("datetime64[ns]"), matriz, parametros
+
+def _unirFechas(listaFechas):
+    #Unión ordenada y sin repetidos de varios arreglos de fechas ya ordenados.
+    #Si todos los parámetros se midieron en las mismas fechas se evita ordenar la unión
+    base = listaFechas[0]
+    if all(len(f) == len(base) and np.array_equal(f, base) for f in listaFechas[1:]):
+        union = base
+    else:
+        union = np.sort(np.concatenate(listaFechas))
+    if len(union) == 0:
+        return union
+    distintas = np.empty(len(union), dtype=bool)
+    distintas[0] = True
+    np.not_equal(union[1:], union[:-1], out=distintas[1:])
+    return union[distintas]
+
+def construirTabla(fechas, matriz, parametros):
+    #DataFrame con Fecha y una columna por parámetro; los valores quedan en un solo bloque
+    tabla = pd.DataFrame(np.ascontiguousarray(matriz, dtype="float64"), columns=parametros, copy=False)
+    tabla.insert(0, "Fecha", fechas)
+    return tabla
+
+def matrizTabla(tabla):
+    #Operación inversa: (fechas, matriz filas x parámetros, lista de parámetros)
+    parametros = [columna for columna in tabla.columns if columna != "Fecha"]
+    return tabla["Fecha"].to_numpy(), tabla[parametros].to_numpy(dtype="float64"), parametros
+
+# ======================
+# Tabla Guardada
+# ======================
+
+def _segundosTolerancia(tolerancia):
+    return int(pd.Timedelta(tolerancia).total_seconds())
+
+def rutaTabla(rutaDatos, tolerancia):
+    #Archivo de la tabla de una tolerancia dentro de la carpeta de datos
+    return Path(rutaDatos) / f"tablaAncha_{_segundosTolerancia(tolerancia)}s.parquet"
+
+def firmaTabla(rutaDatos, archivos, tolerancia):
+    #Firma de las series (y sus archivos de anomalías) de las que sale la tabla.
+    #Las series que aún no se revisaron generan aquí su archivo de anomalías
+    rutaDatos = Path(rutaDatos)
+    anomalias.obtenerEstados(rutaDatos, archivos)
+    return {
+        "version": VERSION_TABLA,
+        "tolerancia": _segundosTolerancia(tolerancia),
+        "series": {archivo: [firmaSerie(rutaDatos / archivo),
+                             [list(parte) for parte in firmaArchivos([anomalias.rutaMarcas(rutaDatos / archivo)])]]
+                   for archivo in archivos}
+    }
+
+def leerTablaGuardada(ruta, firma):
+    #Tabla guardada si existe y su firma coincide, o None
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    try:
+        metadatos = pq.read_schema(ruta).metadata or {}
+        if json.loads(metadatos.get(CLAVE_FIRMA, b"null")) != firma:
+            return None
+        datos = pq.read_table(ruta)
+    except (OSError, ValueError):
+        return None
+    parametros = [columna for columna in datos.column_names if columna != "Fecha"]
+    matriz = np.empty((datos.num_rows, len(parametros)))
+    for i, parametro in enumerate(parametros):
+        matriz[:, i] = datos.column(parametro).to_numpy()
+    return construirTabla(datos.column("Fecha").to_numpy(), matriz, parametros)
+
+def guardarTabla(ruta, tabla, firma):
+    #Guarda la tabla con su firma en los metadatos, a un temporal y luego la reemplaza.
+    #Sin pyarrow la tabla solo vive en la caché
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return
+    ruta = Path(ruta)
+    datos = pa.Table.from_pandas(tabla, preserve_index=False)
+    datos = datos.replace_schema_metadata({**(datos.schema.metadata or {}), CLAVE_FIRMA: json.dumps(firma)})
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    pq.write_table(datos, temporal, row_group_size=config.read_chunk_rows)
+    os.replace(temporal, ruta)
+
+# ======================
+# Consulta
+# ======================
+
+def obtenerTabla(rutaDatos, tolerancia=None):
+    #Tabla ancha de un cuerpo de agua (ver el inicio del módulo). Se busca primero en la
+    #caché, luego en el archivo guardado y solo si ninguno está al día se alinean las series
+    rutaDatos = Path(rutaDatos)
+    if tolerancia is None:
+        tolerancia = f"{config.ica_tolerance_days}D"
+    archivos = almacenamiento.listarArchivos(rutaDatos)
+    firma = firmaTabla(rutaDatos, archivos, tolerancia)
+    ruta = rutaTabla(rutaDatos, tolerancia)
+    clave = f"tablaAncha:{ruta}"
+
+    tabla = cacheSeries.obtener(clave, firma)
+    if tabla is None:
+        with medir("tablaAncha") as medicion:
+            tabla = leerTablaGuardada(ruta, firma)
+            if tabla is None:
+                tabla = construirTabla(*alinearSeries(cargarSeries(rutaDatos, archivos), tolerancia))
+                guardarTabla(ruta, tabla, firma)
+            medicion["filas"] = len(tabla)
+        cacheSeries.guardar(clave, firma, tabla)
+    return tabla.copy()
+
+def filtrarPeriodo(tabla, desde=None, hasta=None):
+    #Filas de la tabla entre dos fechas (inclusive); sin límites, la tabla completa
+    if desde is None and hasta is None:
+        return tabla
+    fechas = tabla["Fecha"].to_numpy()
+    inicio = 0 if desde is None else np.searchsorted(fechas, np.datetime64(desde, "ns"), side="left")
+    fin = len(fechas) if hasta is None else np.searchsorted(fechas, np.datetime64(hasta, "ns"), side="right")
+    return tabla.iloc[inicio:fin]
+
+# ======================
+# Correlaciones
+# ======================
+
+def correlaciones(tabla, metodo="pearson", minimo=LECTURAS_MINIMAS_CORRELACION):
+    #Matriz de correlación entre parámetros sobre las filas en que ambos tienen dato
+    #(pearson o spearman). NaN si una pareja tiene menos de minimo filas en común
+    _, _, parametros = matrizTabla(tabla)
+    with medir("correlaciones", filas=len(tabla)):
+        return tabla[parametros].corr(method=metodo, min_periods=minimo)
+
+def parejasDestacadas(matriz, umbral=UMBRAL_CORRELACION):
+    #Parejas de parámetros con |correlación| >= umbral, de la más fuerte a la más débil:
+    #[(parametro, parametro, correlacion)]
+    valores = matriz.to_numpy()
+    filas, columnas = np.triu_indices(len(valores), k=1)
+    coeficientes = valores[filas, columnas]
+    with np.errstate(invalid="ignore"):
+        elegidas = np.flatnonzero(np.abs(coeficientes) >= umbral)
+    elegidas = elegidas[np.argsort(-np.abs(coeficientes[elegidas]), kind="stable")]
+    nombres = list(matriz.columns)
+    return [(nombres[filas[i]], nombres[columnas[i]], float(coeficientes[i])) for i in elegidas]
@@ -0,0 +1,114 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Benchmark: Generador de Cuerpos de Agua Sintéticos
+
+Crea N cuerpos de agua con los 10 parámetros de PARAMETROS_CALIDAD y M lecturas
+por cuerpo, con la misma estructura que usa la aplicación:
+
+    <ruta>/CuerposDeAgua/<Cuerpo>/Datos/DATOS_<parametro>.<ext>
+    <ruta>/CuerposDeAgua/<Cuerpo>/Reportes/Reporte_<titulo>_<fecha>.txt
+
+Cada serie tiene un ciclo anual y uno diario alrededor del centro de su rango
+normal, ruido, huecos sin datos (tramos de hasta 2 % de la serie) y valores
+atípicos (0.5 % de las lecturas). Las series se guardan con ingesta, así que el
+índice de resumen queda al día, como tras capturar los datos desde el menú.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/datosSinteticos.py --ruta /tmp/bench --cuerpos 3 --filas 100000
+"""
+import sys
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+#========================
+#Fin de las importaciones (sys, argparse, pathlib, numpy, pandas)
+
+#Carpeta con el código de la aplicación
+RUTA_APP = Path(__file__).resolve().parent.parent / "Calidad del agua"
+if str(RUTA_APP) not in sys.path:
+    sys.path.insert(0, str(RUTA_APP))
+
+import almacenamiento
+import ingesta
+from parametros import PARAMETROS_CALIDAD
+
+#Años que abarcan las series generadas
+ANIOS = 3
+
+#Fracción de las lecturas que se vuelven atípicas
+FRACCION_ATIPICOS = 0.005
+
+#Cantidad de huecos por serie y largo máximo de cada uno (fracción de la serie)
+HUECOS = 5
+LARGO_MAXIMO_HUECO = 0.02
+
+
+def generarSerie(parametro, filas, generador, fin=pd.Timestamp("2025-06-01")):
+    #Serie sintética de un parámetro con filas lecturas (antes de quitar los huecos)
+    minimo, maximo = PARAMETROS_CALIDAD[parametro]["rango_normal"]
+    centro, amplitud = (minimo + maximo) / 2, (maximo - minimo) / 2
+    inicio = fin - pd.Timedelta(days=365 * ANIOS)
+    fechas = pd.date_range(inicio, fin, periods=filas)
+    dias = np.linspace(0, 365 * ANIOS, filas)
+
+    #Ciclos anual y diario con fase propia del parámetro, más ruido
+    fase = generador.uniform(0, 2 * np.pi)
+    valores = (centro
+               + 0.8 * amplitud * np.sin(2 * np.pi * dias / 365.25 + fase)
+               + 0.2 * amplitud * np.sin(2 * np.pi * dias)
+               + 0.15 * amplitud * generador.standard_normal(filas))
+
+    #Atípicos: lecturas muy por encima o por debajo del rango
+    atipicos = generador.random(filas) < FRACCION_ATIPICOS
+    valores[atipicos] = centro + generador.choice([-1, 1], atipicos.sum()) * amplitud * generador.uniform(3, 10, atipicos.sum())
+
+    #Huecos: tramos sin lecturas (sensor fuera de servicio)
+    conservar = np.ones(filas, dtype=bool)
+    for _ in range(HUECOS):
+        largo = int(generador.uniform(0, LARGO_MAXIMO_HUECO) * filas)
+        comienzo = generador.integers(0, max(filas - largo, 1))
+        conservar[comienzo:comienzo + largo] = False
+
+    #Los parámetros que no pueden ser negativos se recortan en cero
+    if minimo >= 0:
+        np.maximum(valores, 0, out=valores)
+    return pd.DataFrame({"Fecha": fechas[conservar], "Valor": valores[conservar]})
+
+def generarCuerpos(rutaBase, cuerpos, filas, reportes=50, semilla=0):
+    #Crea los cuerpos de agua en rutaBase/CuerposDeAgua. filas es el total de lecturas
+    #de cada cuerpo, repartidas entre sus parámetros. Retorna las rutas de los cuerpos
+    generador = np.random.default_rng(semilla)
+    filasParametro = max(filas // len(PARAMETROS_CALIDAD), 2)
+    rutas = []
+    for numero in range(1, cuerpos + 1):
+        rutaCuerpo = Path(rutaBase) / "CuerposDeAgua" / f"Cuerpo {numero:04d}"
+        rutaDatos = rutaCuerpo / "Datos"
+        for parametro in PARAMETROS_CALIDAD:
+            df = generarSerie(parametro, filasParametro, generador)
+            ingesta.guardarSerie(rutaDatos / almacenamiento.formatearNombreArchivo(parametro), df)
+
+        rutaReportes = rutaCuerpo / "Reportes"
+        rutaReportes.mkdir(parents=True, exist_ok=True)
+        for i in range(reportes):
+            fecha = (pd.Timestamp("2025-06-01") - pd.Timedelta(days=i)).strftime("%d-%m-%y_%H-%M-%S")
+            (rutaReportes / f"Reporte_Muestreo {i}_{fecha}.txt").write_text(
+                f"Muestreo {i}\nInforme sintético de muestreo número {i} del cuerpo {numero}.", encoding="utf-8")
+        rutas.append(rutaCuerpo)
+    return rutas
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Genera cuerpos de agua sintéticos para los benchmarks")
+    parser.add_argument("--ruta", required=True, help="Carpeta en la que se crea CuerposDeAgua/")
+    parser.add_argument("--cuerpos", type=int, default=1)
+    parser.add_argument("--filas", type=int, default=10000, help="Lecturas por cuerpo (entre todos los parámetros)")
+    parser.add_argument("--reportes", type=int, default=50, help="Reportes de texto por cuerpo")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argumentos)
+
+    rutas = generarCuerpos(args.ruta, args.cuerpos, args.filas, args.reportes, args.semilla)
+    print(f"Se generaron {len(rutas)} cuerpos de agua en {Path(args.ruta) / 'CuerposDeAgua'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
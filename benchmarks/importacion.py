@@ -0,0 +1,87 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Benchmark: Tiempo de Importación y de Arranque del Menú
+
+Ejecuta el menú en un proceso nuevo con `python -X importtime` y reporta:
+  - el tiempo hasta mostrar el menú principal,
+  - los módulos que más tiempo de importación acumulan,
+  - si pandas, numpy o matplotlib se cargaron (no deberían).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/importacion.py [--repeticiones 5] [--top 15] [--salida resultados.json]
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+#========================
+#Fin de las importaciones (sys, json, time, argparse, subprocess, pathlib)
+
+#Carpeta con el código de la aplicación
+RUTA_APP = Path(__file__).resolve().parent.parent / "Calidad del agua"
+
+#Código que se mide: importar el menú principal y mostrarlo
+CODIGO_MENU = "import main, menu; main.mostrarMenuPrincipal()"
+
+#Librerías pesadas que no deberían cargarse para mostrar el menú
+LIBRERIAS_PESADAS = ["pandas", "numpy", "matplotlib"]
+
+
+def medirArranque(repeticiones):
+    #Tiempo de pared (en ms) de un proceso que solo muestra el menú; se toma la mediana
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", CODIGO_MENU], cwd=RUTA_APP,
+                       stdout=subprocess.DEVNULL, check=True)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2], tiempos
+
+def medirImportaciones(codigo=CODIGO_MENU):
+    #Ejecuta el código con -X importtime y retorna [(modulo, propio_us, acumulado_us)]
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], cwd=RUTA_APP,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    modulos = []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos.append((nombre.strip(), int(propio), int(acumulado)))
+    return modulos
+
+def generarReporte(repeticiones=5, top=15, codigo=CODIGO_MENU):
+    #Arma el reporte de arranque e importaciones como diccionario serializable
+    mediana, tiempos = medirArranque(repeticiones)
+    modulos = medirImportaciones(codigo)
+    cargados = {nombre for nombre, _, _ in modulos}
+    return {
+        "codigo": codigo,
+        "arranqueMedianaMs": round(mediana, 1),
+        "arranqueMs": [round(t, 1) for t in tiempos],
+        "importacionTotalMs": round(sum(propio for _, propio, _ in modulos) / 1000, 1),
+        "libreriasPesadasCargadas": [lib for lib in LIBRERIAS_PESADAS if lib in cargados],
+        "modulosMasLentos": [
+            {"modulo": nombre, "propioMs": propio / 1000, "acumuladoMs": acumulado / 1000}
+            for nombre, propio, acumulado in sorted(modulos, key=lambda m: m[2], reverse=True)[:top]
+        ]
+    }
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Mide el tiempo de importación y de arranque del menú")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Cantidad de módulos más lentos a mostrar")
+    parser.add_argument("--salida", help="Archivo JSON en el que guardar el reporte")
+    args = parser.parse_args(argumentos)
+
+    reporte = generarReporte(args.repeticiones, args.top)
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.salida:
+        Path(args.salida).write_text(texto, encoding="utf-8")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Benchmark: Rendimiento de las Rutas Principales
+
+Para cada tamaño pedido genera cuerpos de agua sintéticos (datosSinteticos.py)
+en una carpeta temporal y mide, con la mediana de varias repeticiones:
+
+    carga             leer las 10 series de un cuerpo desde disco (caché vacía)
+    obtenerValores    última lectura de cada parámetro (option1.obtenerValores)
+    ica               ICA de las últimas lecturas
+    historialICA      ICA de todas las fechas de muestreo (caché vacía y sin tabla ancha guardada)
+    tablaGuardada     tabla ancha del cuerpo desde su archivo guardado (caché vacía)
+    correlaciones     correlación entre parámetros sobre la tabla ancha
+    pareto            impactos negativos y parámetros principales
+    predicciones      predicción de cada parámetro desde el índice de resumen
+    estadisticas      estadísticas móviles (7, 30 y 365 días) de toda la serie de un parámetro
+    anomalias         detección de anomalías sobre toda la serie de un parámetro
+    alertas           alertas por rango normal sobre toda la serie de un parámetro
+    crearGrafica      gráfica de línea de un parámetro con el backend Agg
+    listarReportes    listado de la carpeta de reportes (option3)
+    buscarReportes    búsqueda por palabras en los reportes de todos los cuerpos
+    lote              ICA de todos los cuerpos (solo con --cuerpos mayor que 1)
+
+El tamaño es la cantidad de lecturas de cada cuerpo, repartidas entre sus 10
+parámetros. Los resultados se imprimen y se pueden guardar en JSON para
+comparar corridas. Con --memoria cada operación se ejecuta una vez más bajo
+tracemalloc para informar su pico de memoria (aparte, porque tracemalloc hace
+más lenta la ejecución).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/rendimiento.py [--filas 1000 100000 10000000] [--cuerpos 1] [--memoria] [--salida resultados.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+#========================
+#Fin de las importaciones (os, sys, json, time, shutil, argparse, platform, tempfile, tracemalloc, pathlib, datetime, matplotlib, numpy, pandas)
+
+import datosSinteticos
+from config import config
+from cache import cacheSeries
+import almacenamiento
+import resumen
+import ica
+import prediccion
+import option1
+import option2
+import option3
+import lote
+import busqueda
+import estadisticasMoviles
+import anomalias
+import alertas
+import tablaAncha
+
+#Tamaños por defecto: lecturas por cuerpo
+FILAS_POR_DEFECTO = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def medir(funcion, repeticiones, preparar=None):
+    #Ejecuta la función varias veces y retorna los tiempos en segundos.
+    #preparar se llama antes de cada repetición, fuera de la medición
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+def medirMemoria(funcion, preparar=None):
+    #Pico de memoria en bytes (tracemalloc) de una ejecución de la función
+    if preparar:
+        preparar()
+    tracemalloc.start()
+    try:
+        funcion()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def operaciones(rutaCuerpo, rutaGraficas, cuerpos):
+    #Operaciones a medir sobre un cuerpo: nombre -> (función, preparación)
+    rutaDatos = rutaCuerpo / config.data_folder
+    archivos = almacenamiento.listarArchivos(rutaDatos)
+    primero = rutaDatos / archivos[0]
+
+    def carga():
+        for archivo in archivos:
+            almacenamiento.leerSerie(rutaDatos / archivo)
+
+    def predicciones():
+        for parametro, datos in resumen.obtenerResumenes(rutaDatos, archivos).items():
+            prediccion.prediccionesDesdeResumen(datos, 3, 12)
+
+    def grafica():
+        df = almacenamiento.leerSerie(primero)
+        #Sin la caché de render: a partir de la segunda repetición solo se mediría la búsqueda
+        option2.generarGrafica(df, primero.stem, 3, False, rutaGraficas, reutilizar=False)
+
+    def revisarAnomalias():
+        df = almacenamiento.leerSerie(primero)
+        anomalias.detectar(anomalias.estadoInicial(), df["Fecha"].to_numpy(), df["Valor"].to_numpy(),
+                           anomalias.cambioMaximo(almacenamiento.obtenerNombreParametro(primero.name)))
+
+    def evaluarAlertas():
+        df = almacenamiento.leerSerie(primero)
+        _, datos = alertas.datosParametro(almacenamiento.obtenerNombreParametro(primero.name))
+        alertas.evaluar(alertas.estadoInicial(), df["Fecha"].to_numpy(), df["Valor"].to_numpy(), datos["rango_normal"])
+
+    def borrarTabla():
+        cacheSeries.invalidar()
+        tablaAncha.rutaTabla(rutaDatos, f"{config.ica_tolerance_days}D").unlink(missing_ok=True)
+
+    def pareto():
+        impactos = ica.calcularImpactosNegativos(option1.obtenerValores(rutaDatos, archivos))
+        ica.principalesPareto(impactos)
+
+    lista = {
+        "carga": (carga, cacheSeries.invalidar),
+        "obtenerValores": (lambda: option1.obtenerValores(rutaDatos, archivos), None),
+        "ica": (lambda: ica.evaluarUltimasLecturas(option1.obtenerValores(rutaDatos, archivos)), None),
+        "historialICA": (lambda: ica.calcularHistorialICA(rutaDatos), borrarTabla),
+        "tablaGuardada": (lambda: tablaAncha.obtenerTabla(rutaDatos), cacheSeries.invalidar),
+        "correlaciones": (lambda: tablaAncha.correlaciones(tablaAncha.obtenerTabla(rutaDatos)), None),
+        "pareto": (pareto, None),
+        "predicciones": (predicciones, None),
+        "estadisticas": (lambda: estadisticasMoviles.calcularEstadisticas(almacenamiento.leerSerie(primero)), None),
+        "anomalias": (revisarAnomalias, None),
+        "alertas": (evaluarAlertas, None),
+        "crearGrafica": (grafica, None),
+        "listarReportes": (option3.listarArchivosDisponibles, None),
+        "buscarReportes": (lambda: busqueda.buscarReportes("informe muestreo", desde=datetime(2025, 3, 1)), None),
+    }
+    if cuerpos > 1:
+        lista["lote"] = (lambda: lote.evaluarTodos(rutaCuerpo.parent), None)
+    return lista
+
+def medirTamano(filas, cuerpos, repeticiones, rutaTemporal, memoria=False):
+    #Genera los datos de un tamaño, mide todas las operaciones y retorna las filas del reporte
+    inicio = time.perf_counter()
+    rutas = datosSinteticos.generarCuerpos(rutaTemporal, cuerpos, filas)
+    generacion = time.perf_counter() - inicio
+    print(f"\n{filas:,} lecturas x {cuerpos} cuerpo(s) (generadas en {generacion:.1f} s)")
+
+    #La aplicación trabaja con rutas relativas a la carpeta que contiene CuerposDeAgua
+    directorioAnterior = os.getcwd()
+    os.chdir(rutaTemporal)
+    try:
+        rutaCuerpo = Path("CuerposDeAgua") / rutas[0].name
+        config.activeWaterBody = rutaCuerpo.name
+        resultados = []
+        for nombre, (funcion, preparar) in operaciones(rutaCuerpo, Path(rutaTemporal) / "Graficas", cuerpos).items():
+            tiempos = medir(funcion, repeticiones, preparar)
+            mediana = float(np.median(tiempos))
+            pico = medirMemoria(funcion, preparar) if memoria else None
+            print(f"  {nombre:16} {mediana * 1000:10.2f} ms" + (f" {pico / 2**20:10.1f} MB" if memoria else ""))
+            resultados.append({
+                "filas": filas,
+                "cuerpos": cuerpos,
+                "operacion": nombre,
+                "medianaS": mediana,
+                "tiemposS": tiempos,
+                "picoMemoriaBytes": pico
+            })
+    finally:
+        os.chdir(directorioAnterior)
+        config.activeWaterBody = None
+        cacheSeries.invalidar()
+    return resultados
+
+def entorno():
+    #Datos de la máquina y de las librerías, para poder comparar corridas
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesadores": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "backend": config.storage_backend
+    }
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Mide las rutas principales con datos sintéticos de varios tamaños")
+    parser.add_argument("--filas", type=int, nargs="+", default=FILAS_POR_DEFECTO, help="Lecturas por cuerpo")
+    parser.add_argument("--cuerpos", type=int, default=1)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--memoria", action="store_true", help="Mide también el pico de memoria de cada operación")
+    parser.add_argument("--salida", help="Archivo JSON en el que guardar el reporte")
+    args = parser.parse_args(argumentos)
+
+    reporte = {"entorno": entorno(), "resultados": []}
+    for filas in args.filas:
+        rutaTemporal = tempfile.mkdtemp(prefix="bench_calidad_")
+        try:
+            reporte["resultados"] += medirTamano(filas, args.cuerpos, args.repeticiones, rutaTemporal, args.memoria)
+        finally:
+            shutil.rmtree(rutaTemporal, ignore_errors=True)
+
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(reporte, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nReporte guardado en: {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Configuración Común
+
+Los módulos de la aplicación se importan entre sí por su nombre, así que la
+carpeta "Calidad del agua" se agrega a sys.path. Cada prueba parte de la
+configuración por defecto y de la caché de series vacía.
+"""
+import sys
+from pathlib import Path
+import pytest
+#========================
+#Fin de las importaciones (sys, pathlib, pytest)
+
+RUTA_APP = Path(__file__).resolve().parent.parent / "Calidad del agua"
+if str(RUTA_APP) not in sys.path:
+    sys.path.insert(0, str(RUTA_APP))
+
+from config import config
+from cache import cacheSeries
+
+
+@pytest.fixture(autouse=True)
+def configuracionLimpia():
+    #Restaura la configuración que una prueba haya cambiado y vacía la caché
+    original = dict(vars(config))
+    cacheSeries.invalidar()
+    yield config
+    vars(config).clear()
+    vars(config).update(original)
+    cacheSeries.invalidar()
@@ -0,0 +1,74 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Alertas por Rango Normal
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import alertas
+import ingesta
+#========================
+#Fin de las importaciones (numpy, pandas, pytest)
+
+#Rango de prueba: con alert_hysteresis 0.05 el margen es 0.5
+RANGO = (0.0, 10.0)
+
+
+def horas(*desplazamientos, inicio="2025-01-01"):
+    return np.datetime64(inicio, "ns") + (np.array(desplazamientos) * 3600e9).astype("timedelta64[ns]")
+
+def evaluar(valores, tiempos=None, estado=None):
+    tiempos = horas(*range(len(valores))) if tiempos is None else tiempos
+    return alertas.evaluar(estado or alertas.estadoInicial(), tiempos, valores, RANGO)
+
+def test_histeresisNoReabreEnElLimite():
+    #9.8 está dentro del rango pero no del margen: la excursión sigue; 9.0 la cierra
+    eventos, estado = evaluar([5, 11, 11, 11, 9.8, 11, 9.0])
+    assert [evento["evento"] for evento in eventos] == ["apertura", "cierre"]
+    apertura, cierre = eventos
+    assert apertura["inicio"] == cierre["inicio"] == horas(1)[0].astype("int64")
+    assert apertura["fecha"] == horas(2)[0].astype("int64")
+    assert cierre["fin"] == horas(6)[0].astype("int64")
+    assert cierre["valor"] == 11 and cierre["lecturas"] == 5
+    assert estado["alertas"] == 1 and estado["excursion"] is None
+
+def test_excursionCortaSeDescarta():
+    eventos, estado = evaluar([5, 11, 5, 5])
+    assert eventos == []
+    assert estado["descartadas"] == 1 and estado["alertas"] == 0
+
+def test_excursionPorDebajo():
+    eventos, estado = evaluar([5, -1, -2, -3])
+    assert [(evento["evento"], evento["direccion"]) for evento in eventos] == [("apertura", alertas.DEBAJO)]
+    assert estado["excursion"]["confirmada"] and estado["excursion"]["extremo"] == -3
+
+def test_porBloquesIgualQueDeUnaVez():
+    generador = np.random.default_rng(5)
+    valores = np.clip(np.cumsum(generador.normal(0, 1.5, 2000)) % 16 - 3, -5, 15)
+    tiempos = horas(*np.arange(2000) * 0.25)
+    completos, final = evaluar(valores, tiempos)
+    eventos, estado = [], alertas.estadoInicial()
+    for inicio in range(0, 2000, 137):
+        nuevos, estado = evaluar(valores[inicio:inicio + 137], tiempos[inicio:inicio + 137], estado)
+        eventos += nuevos
+    assert eventos == completos
+    assert estado == final
+
+def test_lecturasDesordenadasSeOrdenan():
+    #Cuatro lecturas fuera del rango durante 3 horas, en desorden
+    eventos, _ = evaluar([20, 20, 20, 20], horas(3, 0, 1, 2))
+    assert [evento["evento"] for evento in eventos] == ["apertura"]
+
+def test_lecturasAnterioresALaUltimaEvaluada():
+    _, estado = evaluar([5, 5], horas(5, 6))
+    with pytest.raises(ValueError):
+        evaluar([20], horas(1), estado)
+
+def test_anexoTardioReevaluaLaSerie(tmp_path):
+    #Una excursión que llega después de lecturas más recientes se evalúa en su lugar
+    ruta = tmp_path / "Datos" / "DATOS_pH.parquet"
+    ingesta.guardarSerie(ruta, pd.DataFrame({"Fecha": pd.date_range("2025-01-01", periods=12, freq="6h"), "Valor": 7.0}))
+    tardias = pd.DataFrame({"Fecha": pd.to_datetime(horas(4, 1, 2, 3)), "Valor": 12.0})
+    _, _, registros = ingesta.anexarDatos(ruta, tardias)
+    assert [(r["evento"], r["inicio"]) for r in registros] == [("apertura", "2025-01-01T01:00:00"),
+                                                              ("cierre", "2025-01-01T01:00:00")]
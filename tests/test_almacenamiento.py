@@ -0,0 +1,120 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Almacenamiento de Series de Parámetros
+"""
+import os
+import pandas as pd
+import pytest
+import almacenamiento
+#========================
+#Fin de las importaciones (os, pandas, pytest)
+
+
+def serie(inicio, lecturas, valor=0.0, frecuencia="h"):
+    #Serie de prueba con valores consecutivos a partir de valor
+    return pd.DataFrame({"Fecha": pd.date_range(inicio, periods=lecturas, freq=frecuencia),
+                         "Valor": [valor + i for i in range(lecturas)]})
+
+def archivosSerie(ruta):
+    return sorted(archivo.name for archivo in ruta.parent.iterdir())
+
+def test_excelAnexaSinRegistro(tmp_path):
+    #Un libro no puede recordar qué registro incorporó: el anexo reescribe el libro
+    ruta = tmp_path / "DATOS_pH.xlsx"
+    almacenamiento.escribirSerie(ruta, serie("2025-01-01", 3))
+    assert almacenamiento.anexarSerie(ruta, serie("2025-02-01", 2, 10.0)) == 2
+    assert archivosSerie(ruta) == ["DATOS_pH.xlsx"]
+    assert almacenamiento.leerSerie(ruta)["Valor"].tolist() == [0.0, 1.0, 2.0, 10.0, 11.0]
+
+def leer(ruta):
+    return almacenamiento.leerSerie(ruta, compacta=False)
+
+def test_parquetYRegistroSeLeenComoUnaSerie(tmp_path):
+    ruta = tmp_path / "DATOS_pH.parquet"
+    almacenamiento.escribirSerie(ruta, serie("2025-01-01", 5))
+    almacenamiento.anexarSerie(ruta, serie("2025-02-01 10:30", 3, 100.0))
+    assert archivosSerie(ruta) == ["DATOS_pH.parquet", "DATOS_pH.parquet.log"]
+    df = leer(ruta)
+    esperada = pd.concat([serie("2025-01-01", 5), serie("2025-02-01 10:30", 3, 100.0)], ignore_index=True)
+    pd.testing.assert_frame_equal(df, esperada, check_dtype=False)
+    assert df["Fecha"].dtype == "datetime64[ns]"
+    assert almacenamiento.contarFilas(ruta) == 8
+    assert sum(len(bloque) for bloque in almacenamiento.iterarSerie(ruta)) == 8
+
+def test_compactarConservaLaSerie(tmp_path, configuracionLimpia):
+    #Con grupos de filas pequeños la compactación copia varios grupos y junta el último con los anexos
+    configuracionLimpia.read_chunk_rows = 4
+    ruta = tmp_path / "DATOS_pH.parquet"
+    almacenamiento.escribirSerie(ruta, serie("2025-01-01", 10))
+    almacenamiento.anexarSerie(ruta, serie("2025-02-01", 3, 100.0))
+    antes = leer(ruta)
+    almacenamiento.compactarSerie(ruta)
+    assert archivosSerie(ruta) == ["DATOS_pH.parquet"]
+    pd.testing.assert_frame_equal(leer(ruta), antes)
+    import pyarrow.parquet as pq
+    metadatos = pq.ParquetFile(ruta).metadata
+    assert [metadatos.row_group(i).num_rows for i in range(metadatos.num_row_groups)] == [4, 4, 4, 1]
+
+def test_compactacionInterrumpidaNoDuplica(tmp_path, monkeypatch):
+    #El proceso muere tras reemplazar el archivo y antes de borrar el registro apartado
+    ruta = tmp_path / "DATOS_pH.parquet"
+    almacenamiento.escribirSerie(ruta, serie("2025-01-01", 5))
+    almacenamiento.anexarSerie(ruta, serie("2025-02-01", 3, 100.0))
+    esperada = leer(ruta)
+    rutaCompactando = almacenamiento.rutaRegistro(ruta, compactando=True)
+    unlink = type(ruta).unlink
+
+    def fallar(self, *args, **kwargs):
+        if self == rutaCompactando:
+            raise KeyboardInterrupt
+        return unlink(self, *args, **kwargs)
+    monkeypatch.setattr(type(ruta), "unlink", fallar)
+    with pytest.raises(KeyboardInterrupt):
+        almacenamiento.compactarSerie(ruta)
+    monkeypatch.undo()
+    almacenamiento.cacheSeries.invalidar()
+
+    assert rutaCompactando.exists()
+    assert almacenamiento.registroIncorporado(ruta)
+    pd.testing.assert_frame_equal(leer(ruta), esperada)
+    assert almacenamiento.contarFilas(ruta) == 8
+    assert len(almacenamiento.leerSerieCompacta(ruta)) == 8
+    #La siguiente compactación elimina el registro ya incorporado
+    almacenamiento.anexarSerie(ruta, serie("2025-03-01", 1, 200.0))
+    almacenamiento.compactarSerie(ruta)
+    assert archivosSerie(ruta) == ["DATOS_pH.parquet"]
+    assert leer(ruta)["Valor"].tolist() == esperada["Valor"].tolist() + [200.0]
+
+def test_registroApartadoNoIncorporadoSeLee(tmp_path):
+    #El proceso muere antes de reemplazar el archivo: el registro apartado sigue contando
+    ruta = tmp_path / "DATOS_pH.parquet"
+    almacenamiento.escribirSerie(ruta, serie("2025-01-01", 5))
+    almacenamiento.anexarSerie(ruta, serie("2025-02-01", 3, 100.0))
+    os.replace(almacenamiento.rutaRegistro(ruta), almacenamiento.rutaRegistro(ruta, compactando=True))
+    assert not almacenamiento.registroIncorporado(ruta)
+    assert len(leer(ruta)) == 8
+    almacenamiento.compactarSerie(ruta)
+    assert archivosSerie(ruta) == ["DATOS_pH.parquet"]
+    assert len(leer(ruta)) == 8
+
+def test_leerUltimosSinLeerLaSerie(tmp_path, configuracionLimpia):
+    configuracionLimpia.read_chunk_rows = 4
+    ruta = tmp_path / "DATOS_pH.parquet"
+    almacenamiento.escribirSerie(ruta, serie("2025-01-01", 10))
+    almacenamiento.anexarSerie(ruta, serie("2025-02-01", 3, 100.0))
+    total, ultimos = almacenamiento.leerUltimos(ruta, 5)
+    assert total == 13
+    assert ultimos["Valor"].tolist() == [8.0, 9.0, 100.0, 101.0, 102.0]
+
+def test_serieGrandeSeLeeCompacta(tmp_path, configuracionLimpia):
+    configuracionLimpia.large_series_rows = 5
+    configuracionLimpia.read_chunk_rows = 3
+    ruta = tmp_path / "DATOS_pH.parquet"
+    almacenamiento.escribirSerie(ruta, serie("2025-01-01", 8))
+    almacenamiento.anexarSerie(ruta, serie("2025-02-01", 2, 100.0))
+    df = almacenamiento.leerSerie(ruta)
+    assert df["Valor"].dtype == "float32"
+    assert df["Valor"].tolist() == leer(ruta)["Valor"].tolist()
+    configuracionLimpia.memory_limit_bytes = 10
+    with pytest.raises(almacenamiento.LimiteMemoriaExcedido):
+        almacenamiento.leerSerieCompacta(ruta)
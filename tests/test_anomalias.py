@@ -0,0 +1,62 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Detección de Anomalías en la Ingesta
+"""
+import numpy as np
+import pandas as pd
+import anomalias
+#========================
+#Fin de las importaciones (numpy, pandas)
+
+
+def serieSensor(n=5000, semilla=1):
+    generador = np.random.default_rng(semilla)
+    tiempos = np.datetime64("2025-01-01", "ns") + np.arange(n) * np.timedelta64(10, "m")
+    valores = 7 + 0.1 * np.sin(np.arange(n) / 50) + generador.normal(0, 0.02, n)
+    return tiempos, valores
+
+def test_picosMarcados():
+    tiempos, valores = serieSensor()
+    valores[[1500, 1700]] += 5
+    motivos, estado = anomalias.detectar(anomalias.estadoInicial(), tiempos, valores, 0.5)
+    assert np.flatnonzero(motivos).tolist() == [1500, 1700]
+    assert estado["marcadas"] == 2
+
+def test_porBloquesIgualQueDeUnaVez():
+    tiempos, valores = serieSensor()
+    valores[[800, 2600]] -= 3
+    completos, final = anomalias.detectar(anomalias.estadoInicial(), tiempos, valores, 0.5)
+    partes, estado = [], anomalias.estadoInicial()
+    for inicio in range(0, len(valores), 777):
+        motivos, estado = anomalias.detectar(estado, tiempos[inicio:inicio + 777], valores[inicio:inicio + 777], 0.5)
+        partes.append(motivos)
+    assert np.array_equal(np.concatenate(partes), completos)
+    assert estado["media"] == final["media"]
+
+def test_lecturaMarcadaNoMueveLaMediaExponencial():
+    #Un pico que solo detecta la prueba EWMA no entra en la media ni en la varianza
+    tiempos, valores = serieSensor(200)
+    _, sinPico = anomalias.detectar(anomalias.estadoInicial(), tiempos[:-1], valores[:-1])
+    conPico = valores.copy()
+    conPico[-1] = 100.0
+    motivos, estado = anomalias.detectar(anomalias.estadoInicial(), tiempos, conPico)
+    assert motivos[-1] & anomalias.DESVIACION_EWMA
+    assert estado["media"] == sinPico["media"] and estado["varianza"] == sinPico["varianza"]
+
+def test_filtroConservaLecturasValidasDelMismoDia():
+    #Capturas sin hora: varias lecturas comparten la fecha del día
+    df = pd.DataFrame({"Fecha": pd.to_datetime(["2025-01-01"] * 3 + ["2025-01-02"] * 2),
+                       "Valor": [7.0, 30.0, 7.1, 7.0, 7.0]})
+    marcas = pd.DataFrame({"Fecha": pd.to_datetime(["2025-01-01", "2025-01-02"]), "Valor": [30.0, 7.0],
+                           "Motivos": [1, 1]})
+    filtrar = anomalias.filtroAnomalias(marcas)
+    assert filtrar(df)["Valor"].tolist() == [7.0, 7.1, 7.0]
+
+def test_filtroPorBloquesYEnFloat32():
+    #Cada marca quita una sola lectura aunque la serie llegue en varios bloques y en formato compacto
+    df = pd.DataFrame({"Fecha": pd.to_datetime(["2025-01-01"] * 4), "Valor": [7.3, 7.3, 7.3, 9.1]})
+    marcas = pd.DataFrame({"Fecha": pd.to_datetime(["2025-01-01"] * 2), "Valor": [7.3, 7.3], "Motivos": [1, 1]})
+    filtrar = anomalias.filtroAnomalias(marcas)
+    compacta = df.astype({"Valor": "float32"})
+    assert len(filtrar(compacta.iloc[:1])) == 0
+    assert filtrar(compacta.iloc[1:])["Valor"].tolist() == [np.float32(7.3), np.float32(9.1)]
@@ -0,0 +1,88 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Búsqueda en Reportes
+"""
+import pytest
+import busqueda
+#========================
+#Fin de las importaciones (pytest)
+
+
+@pytest.mark.parametrize("singular, plural", [
+    ("reporte", "reportes"),
+    ("fuente", "fuentes"),
+    ("nitrato", "nitratos"),
+    ("metal", "metales"),
+    ("nivel", "niveles"),
+    ("base", "bases"),
+    ("alerta", "alertas"),
+])
+def test_singularYPluralMismaRaiz(singular, plural):
+    assert busqueda.tokenizar(singular) == busqueda.tokenizar(plural)
+
+def escribirReporte(rutaBase, cuerpo, titulo, texto, fecha="01-02-25_10-00-00"):
+    ruta = rutaBase / cuerpo / "Reportes" / f"Reporte_{titulo}_{fecha}.txt"
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(f"{titulo}\n{texto}", encoding="utf-8")
+    return ruta
+
+def test_buscarEncuentraElPlural(tmp_path):
+    escribirReporte(tmp_path, "Lago", "Muestreo", "Se revisaron los reportes de las fuentes.")
+    resultados = busqueda.IndiceReportes(tmp_path).buscar("reporte fuente")
+    assert [r["archivo"] for r in resultados] == ["Reporte_Muestreo_01-02-25_10-00-00.txt"]
+
+def test_guardarReporteLoIndexaSinRevisarLaCarpeta(tmp_path):
+    import option3
+    escribirReporte(tmp_path, "Lago", "Muestreo", "Turbidez normal.")
+    indice = busqueda.obtenerIndice(tmp_path)
+    assert len(indice.buscar("turbidez")) == 1
+    option3.guardarReporte("Visita", "Turbidez elevada tras la lluvia.", tmp_path / "Lago" / "Reportes")
+    #El reporte ya está en el índice: la consulta siguiente no tiene nada que reindexar
+    assert indice.refrescar() == (0, 0)
+    assert len(indice.buscar("turbidez", actualizar=False)) == 2
+
+def test_refrescarSoloRecorreCarpetasCambiadas(tmp_path, monkeypatch):
+    escribirReporte(tmp_path, "Lago", "Muestreo", "Nitratos altos.")
+    escribirReporte(tmp_path, "Rio", "Muestreo", "Nitratos bajos.")
+    indice = busqueda.IndiceReportes(tmp_path)
+    indice.actualizar()
+    recorridos = []
+    original = indice._archivosEnDisco
+    monkeypatch.setattr(indice, "_archivosEnDisco", lambda cuerpos: recorridos.append(set(cuerpos)) or original(cuerpos))
+    assert indice.refrescar() == (0, 0)
+    assert recorridos == []
+    #Un reporte copiado por fuera del sistema cambia solo la carpeta de su cuerpo
+    escribirReporte(tmp_path, "Rio", "Visita", "Nitratos normales.", fecha="02-02-25_10-00-00")
+    assert indice.refrescar() == (1, 0)
+    assert recorridos == [{"Rio"}]
+    assert len(indice.buscar("nitrato")) == 3
+
+def test_reporteVigiladoSeReindexaAlEditarlo(tmp_path):
+    ruta = escribirReporte(tmp_path, "Lago", "Muestreo", "Sin novedades.")
+    indice = busqueda.obtenerIndice(tmp_path)
+    indice.actualizar()
+    busqueda.vigilarReporte(ruta)
+    ruta.write_text("Muestreo\nColiformes fecales elevados.", encoding="utf-8")
+    assert [r["archivo"] for r in indice.buscar("coliformes")] == [ruta.name]
+
+def test_rankingBM25(tmp_path):
+    escribirReporte(tmp_path, "Lago", "Visita", "Turbidez alta. La turbidez sigue alta, turbidez.", "01-01-25_10-00-00")
+    escribirReporte(tmp_path, "Lago", "Visita", "Turbidez normal y pH estable.", "02-01-25_10-00-00")
+    escribirReporte(tmp_path, "Lago", "Turbidez", "Muestreo de rutina.", "03-01-25_10-00-00")
+    escribirReporte(tmp_path, "Rio", "Visita", "Sin novedades.", "04-01-25_10-00-00")
+    indice = busqueda.IndiceReportes(tmp_path)
+    resultados = indice.buscar("turbidez")
+    #El título pesa PESO_TITULO veces; después, más apariciones puntúan más
+    assert [r["archivo"][-21:-13] for r in resultados] == ["03-01-25", "01-01-25", "02-01-25"]
+    assert resultados[0]["puntaje"] > resultados[1]["puntaje"] > resultados[2]["puntaje"] > 0
+
+def test_filtrosPorCuerpoYFecha(tmp_path):
+    from datetime import datetime
+    escribirReporte(tmp_path, "Lago", "Visita", "pH estable.", "01-01-25_10-00-00")
+    escribirReporte(tmp_path, "Lago", "Visita", "pH estable.", "05-01-25_10-00-00")
+    escribirReporte(tmp_path, "Rio", "Visita", "pH estable.", "05-01-25_12-00-00")
+    indice = busqueda.IndiceReportes(tmp_path)
+    assert len(indice.buscar("ph", cuerpo="Lago")) == 2
+    #hasta sin hora incluye todo el día
+    resultados = indice.buscar("", desde=datetime(2025, 1, 5), hasta=datetime(2025, 1, 5))
+    assert [r["cuerpo"] for r in resultados] == ["Rio", "Lago"]
@@ -0,0 +1,60 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Motor Vectorizado del ICA
+"""
+import numpy as np
+import pytest
+import ica
+from parametros import PARAMETROS_CALIDAD
+#========================
+#Fin de las importaciones (numpy, pytest)
+
+
+def subindiceFila(parametro, valor):
+    #Cálculo por lectura del menú anterior: 100 dentro del rango y 10 puntos menos por
+    #unidad de exceso sobre el extremo más cercano
+    minimo, maximo = PARAMETROS_CALIDAD[parametro]["rango_normal"]
+    if minimo <= valor <= maximo:
+        return 100
+    exceso = minimo - valor if valor < minimo else valor - maximo
+    return max(0, 100 - exceso * 10)
+
+def icaFila(valores):
+    return sum(subindiceFila(parametro, valor) * PARAMETROS_CALIDAD[parametro]["ponderacion"]
+               for parametro, valor in valores.items() if not np.isnan(valor))
+
+def test_puntuarMatrizIgualAlCalculoPorFila():
+    parametros = list(PARAMETROS_CALIDAD)
+    generador = np.random.default_rng(3)
+    minimos = np.array([PARAMETROS_CALIDAD[p]["rango_normal"][0] for p in parametros])
+    maximos = np.array([PARAMETROS_CALIDAD[p]["rango_normal"][1] for p in parametros])
+    ancho = maximos - minimos
+    matriz = minimos + generador.uniform(-1, 2, (200, len(parametros))) * ancho
+    matriz[generador.random(matriz.shape) < 0.1] = np.nan
+    subindices, icas, impactos = ica.puntuarMatriz(matriz, ica.REGISTRO.columnas(parametros))
+    for fila in range(len(matriz)):
+        valores = dict(zip(parametros, matriz[fila]))
+        assert icas[fila] == pytest.approx(icaFila(valores))
+        for columna, parametro in enumerate(parametros):
+            if np.isnan(matriz[fila, columna]):
+                assert np.isnan(subindices[fila, columna])
+            else:
+                assert subindices[fila, columna] == pytest.approx(subindiceFila(parametro, matriz[fila, columna]))
+                assert impactos[fila, columna] == pytest.approx(100 - subindices[fila, columna])
+
+def test_parametroNoReconocidoNoSuma():
+    subindices, icas, _ = ica.puntuarMatriz([[7.0, 123.0]], ica.REGISTRO.columnas(["pH", "Desconocido"]))
+    assert np.isnan(subindices[0, 1])
+    assert icas[0] == pytest.approx(100 * PARAMETROS_CALIDAD["pH"]["ponderacion"])
+
+def test_pesosSumanUno():
+    assert ica.REGISTRO.pesos.sum() == pytest.approx(1.0)
+
+def test_nombresDeArchivoSeReconocen():
+    #El nombre derivado del archivo no tiene paréntesis
+    assert ica.REGISTRO.indice("Demanda Bioquímica de Oxígeno DBO") >= 0
+
+@pytest.mark.parametrize("valor, nivel", [(0, "Muy mala"), (26, "Mala"), (51, "Aceptable"), (71, "Buena"),
+                                          (90.9, "Buena"), (91, "Excelente")])
+def test_clasificarICA(valor, nivel):
+    assert ica.clasificarICA(valor) == nivel
@@ -0,0 +1,43 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Reducción de Puntos para Gráficas
+"""
+import numpy as np
+import reduccion
+#========================
+#Fin de las importaciones (numpy)
+
+
+def serieConPico(n=10_000, pico=4321):
+    fechas = np.datetime64("2025-01-01", "ns") + np.arange(n) * np.timedelta64(1, "h")
+    valores = np.sin(np.arange(n) / 200.0)
+    valores[pico] = 50.0
+    return fechas, valores
+
+def test_lttbConservaExtremosYPico():
+    fechas, valores = serieConPico()
+    indices = reduccion.lttb(fechas, valores, 300)
+    assert len(indices) == 300
+    assert indices[0] == 0 and indices[-1] == len(valores) - 1
+    assert (np.diff(indices) > 0).all()
+    assert 4321 in indices
+
+def test_lttbSinReduccion():
+    fechas, valores = serieConPico(50, pico=10)
+    assert np.array_equal(reduccion.lttb(fechas, valores, 100), np.arange(50))
+    assert np.array_equal(reduccion.lttb(fechas, valores, 2), np.arange(50))
+
+def test_minMaxCubetasConservaExtremos():
+    _, valores = serieConPico()
+    valores[77] = -50.0
+    indices = reduccion.minMaxCubetas(valores, 200)
+    assert len(indices) <= 200
+    assert (np.diff(indices) > 0).all()
+    assert {77, 4321} <= set(indices.tolist())
+
+def test_reducirSerie():
+    fechas, valores = serieConPico()
+    reducidasF, reducidasV = reduccion.reducirSerie(fechas, valores, 500)
+    assert len(reducidasV) == 500
+    assert reducidasF[0] == fechas[0] and reducidasF[-1] == fechas[-1]
+    assert reducidasV.max() == 50.0
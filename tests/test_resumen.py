@@ -0,0 +1,68 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Índice de Resumen y Estadísticas de la Regresión
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import resumen
+import regresion
+#========================
+#Fin de las importaciones (numpy, pandas, pytest)
+
+
+@pytest.fixture
+def serie():
+    generador = np.random.default_rng(7)
+    return pd.DataFrame({"Fecha": pd.date_range("2024-01-01", periods=500, freq="13h"),
+                         "Valor": generador.normal(7, 0.5, 500)})
+
+def partes(df, cortes=(0, 1, 120, 121, 380)):
+    #Trozos consecutivos de la serie, con uno de una sola lectura
+    limites = list(cortes) + [len(df)]
+    return [df.iloc[inicio:fin] for inicio, fin in zip(limites[:-1], limites[1:])]
+
+def assertIguales(combinado, completo):
+    for clave, valor in completo.items():
+        if isinstance(valor, dict):
+            assertIguales(combinado[clave], valor)
+        elif isinstance(valor, float):
+            assert combinado[clave] == pytest.approx(valor, rel=1e-9, abs=1e-9), clave
+        else:
+            assert combinado[clave] == valor, clave
+
+def test_combinarResumenIgualAlCompleto(serie):
+    combinado = None
+    for parte in partes(serie):
+        combinado = resumen.combinarResumen(combinado, parte)
+    assertIguales(combinado, resumen.calcularResumen(serie))
+
+def test_combinarResumenConParteVacia(serie):
+    completo = resumen.calcularResumen(serie)
+    assert resumen.combinarResumen(completo, serie.iloc[:0]) == completo
+    assert resumen.combinarResumen(None, serie) == completo
+
+def test_combinarEstadisticasIgualAlCompleto(serie):
+    combinadas = None
+    for parte in partes(serie):
+        combinadas = regresion.combinarEstadisticas(combinadas, regresion.calcularEstadisticas(parte))
+    assertIguales(combinadas, regresion.calcularEstadisticas(serie))
+    assert regresion.ajustarRecta(combinadas) == pytest.approx(regresion.ajustarRecta(regresion.calcularEstadisticas(serie)))
+
+def test_combinarPonderadasIgualAlCompleto(serie):
+    combinadas = None
+    for parte in partes(serie):
+        combinadas = regresion.combinarPonderadas(combinadas, regresion.calcularPonderadas(parte, 90))
+    assertIguales(combinadas, regresion.calcularPonderadas(serie, 90))
+
+def test_saltoMaximoEntrePartes(serie):
+    #El hueco entre dos anexos cuenta como salto de la serie
+    anteriores = regresion.calcularEstadisticas(serie.iloc[:10])
+    nuevas = regresion.calcularEstadisticas(serie.iloc[10:20].assign(Fecha=serie["Fecha"].iloc[10:20] + pd.Timedelta(days=30)))
+    combinadas = regresion.combinarEstadisticas(anteriores, nuevas)
+    assert combinadas["saltoMaximo"] == pytest.approx(nuevas["xMinimo"] - anteriores["xMaximo"])
+
+def test_rectaSinFechasDistintas():
+    df = pd.DataFrame({"Fecha": pd.to_datetime(["2025-01-01"] * 3), "Valor": [1.0, 2.0, 3.0]})
+    with pytest.raises(ValueError):
+        regresion.ajustarRecta(regresion.calcularEstadisticas(df))
@@ -0,0 +1,34 @@
+"""
+Sistema de Gestión de Calidad del Agua
+Pruebas: Tabla Ancha de Parámetros
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import almacenamiento
+import tablaAncha
+#========================
+#Fin de las importaciones (numpy, pandas, pytest)
+
+
+@pytest.fixture
+def rutaDatos(tmp_path):
+    #Dos parámetros medidos con un día de desfase
+    ruta = tmp_path / "Lago" / "Datos"
+    fechas = pd.date_range("2025-01-01", periods=5, freq="2D")
+    almacenamiento.escribirSerie(ruta / "DATOS_pH.parquet", pd.DataFrame({"Fecha": fechas, "Valor": 7.0}))
+    almacenamiento.escribirSerie(ruta / "DATOS_Turbidez.parquet",
+                                 pd.DataFrame({"Fecha": fechas + pd.Timedelta(days=1), "Valor": 3.0}))
+    return ruta
+
+@pytest.mark.parametrize("tolerancia", [0, "0D", pd.Timedelta(0)])
+def test_toleranciaCeroNoUsaLaPorDefecto(rutaDatos, tolerancia):
+    #Con tolerancia 0 cada fila solo tiene el parámetro medido ese día
+    tabla = tablaAncha.obtenerTabla(rutaDatos, tolerancia)
+    assert len(tabla) == 10
+    assert (tabla[["pH", "Turbidez"]].notna().sum(axis=1) == 1).all()
+
+def test_toleranciaPorDefecto(rutaDatos):
+    tabla = tablaAncha.obtenerTabla(rutaDatos)
+    assert np.isnan(tabla["Turbidez"].iloc[0])
+    assert tabla[["pH", "Turbidez"]].iloc[1:].notna().all().all()